@@ -1,11 +1,20 @@
+import sys
+
+from misc.startup_profile import StartupProfile
+
+# Created first, so the milestones count from the very start
+startup_profile: StartupProfile | None = None
+if "--startup-profile" in sys.argv:
+    startup_profile = StartupProfile()
+
 import logging
 import os
 
 import pyglet
 from dotenv import load_dotenv
 
+from misc import asset_pack
 from misc.config import AppConfig
-from views.main_view import MainView
 
 import arcade
 
@@ -19,11 +28,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info(f"Запуск приложения")
 
-arcade.resources.add_resource_handle("data", f"{os.getcwd()}/data")
-
 app_config = AppConfig()
 logger.debug(f"app config: {app_config.__dict__}")
 
+# Builds ship the pack instead of the data directory
+asset_pack.setup_data(app_config.ASSET_PACK, f"{os.getcwd()}/data")
+
 app_config.load_fonts()
 
 logger.debug(f"Запуск приложения")
@@ -39,14 +49,23 @@ window = arcade.Window(
     fullscreen=app_config.FULLSCREEN,
     vsync=app_config.VSYNC,
     antialiasing=app_config.ANTIALIASING,
-    samples=app_config.SAMPLES
+    samples=app_config.SAMPLES,
+    update_rate=1 / app_config.FRAME_RATE,
+    draw_rate=1 / app_config.FRAME_RATE
 )
 
+if startup_profile is not None:
+    startup_profile.mark("window")
+    startup_profile.attach(window)
+
 logger.info(f"windows size: {app_config.WINDOW_WIDTH} X {app_config.WINDOW_HEIGHT}")
 logger.info(f"sprite image size: {app_config.SPRITE_IMAGE_SIZE}")
 logger.info(f"scaling: {app_config.SPRITE_SCALING_TILES}")
 logger.debug(f"pyglet.options: {pyglet.options.__dict__}")
 
+# Views are imported once the window is up, the game ones only when needed
+from views.main_view import MainView
+
 view = MainView()
 window.show_view(view)
 arcade.run()
\ No newline at end of file
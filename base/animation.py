@@ -0,0 +1,85 @@
+import math
+from typing import Generic, Iterable, Sequence, TypeVar
+
+from arcade import Sprite, Texture
+
+T = TypeVar("T")
+
+
+class Clip(Generic[T]):
+    """Frames of an animation, each one shown for frame_duration seconds"""
+    def __init__(self, frames: Sequence[T], frame_duration: float, loop: bool = True):
+        self.frames = frames
+        self.frame_duration = frame_duration
+        self.loop = loop
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) * self.frame_duration
+
+    def index_at(self, time: float) -> int:
+        index = math.floor(time / self.frame_duration)
+        if self.loop:
+            return index % len(self.frames)
+        return max(0, min(index, len(self.frames) - 1))
+
+    def frame_at(self, time: float) -> T:
+        return self.frames[self.index_at(time)]
+
+
+class AnimationGroup:
+    """
+    Sprites playing one clip in step. The frame is worked out once for the group and
+    the sprites get the texture only when it changes.
+    """
+    def __init__(self, clip: Clip[Texture], sprites: Iterable[Sprite], start: float = 0.0):
+        self.clip = clip
+        self.sprites = sprites
+        self.start = start
+        self.index: int | None = None
+        # Times the textures were reassigned
+        self.changes: int = 0
+
+    def update(self, time: float) -> None:
+        index = self.clip.index_at(time - self.start)
+        if index == self.index:
+            return
+        self.index = index
+        self.changes += 1
+        texture = self.clip.frames[index]
+        for sprite in self.sprites:
+            sprite.texture = texture
+
+    def refresh(self) -> None:
+        """Put the current frame on the sprites that joined the group since it changed"""
+        if self.index is None:
+            return
+        texture = self.clip.frames[self.index]
+        for sprite in self.sprites:
+            if sprite.texture is not texture:
+                sprite.texture = texture
+
+
+class Animator:
+    """Game time of a level and the animation groups played by it"""
+    def __init__(self):
+        self.time: float = 0.0
+        self.groups: list[AnimationGroup] = []
+
+    def add(self, clip: Clip[Texture], sprites: Iterable[Sprite]) -> AnimationGroup:
+        group = AnimationGroup(clip, sprites, self.time)
+        group.update(self.time)
+        self.groups.append(group)
+        return group
+
+    def remove(self, group: AnimationGroup) -> None:
+        self.groups.remove(group)
+
+    def update(self, delta_time: float) -> None:
+        self.time += delta_time
+        for group in self.groups:
+            group.update(self.time)
+
+    def refresh(self) -> None:
+        for group in self.groups:
+            group.refresh()
@@ -0,0 +1,117 @@
+"""
+Runs headless simulations of levels x input scripts on all cores and writes the
+results as JSON. Needs no display or GPU.
+
+    python -m base.batch [--levels 1,2] [--scripts benchmarks/scripts/*.json]
+                         [--seconds N] [--workers N] [--out results.json]
+"""
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from base.prefetch import map_exists
+from base.simulation import InputScript, Simulation
+from misc import asset_pack
+from misc.config import AppConfig
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCRIPTS = "benchmarks/scripts/*.json"
+
+
+def setup_resources() -> None:
+    """Same data the game uses: the asset pack when there is one, data/ otherwise"""
+    asset_pack.setup_data(app_config.ASSET_PACK, f"{os.getcwd()}/data")
+
+
+def init_worker() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    setup_resources()
+
+
+def simulate(lvl: int, script_path: str, seconds: float) -> dict:
+    """One job of the pool, a failing simulation is reported instead of stopping the batch"""
+    try:
+        return Simulation(lvl, InputScript.load(script_path)).run(seconds)
+    except Exception as e:
+        logger.exception(f"level {lvl}, script {script_path} failed")
+        return {"level": lvl, "script": script_path, "error": repr(e)}
+
+
+def get_levels() -> list[int]:
+    levels = []
+    while map_exists(len(levels) + 1):
+        levels.append(len(levels) + 1)
+    return levels
+
+
+def run_batch(levels: list[int], scripts: list[str], seconds: float, workers: int | None = None) -> dict:
+    start = perf_counter()
+    # spawn: workers don't inherit anything from this process, the same on every platform
+    with ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"), init_worker) as pool:
+        futures = [pool.submit(simulate, lvl, script, seconds) for lvl in levels for script in scripts]
+        results = [future.result() for future in futures]
+    wall_time = perf_counter() - start
+
+    done = [result for result in results if "error" not in result]
+    game_time = sum(result["game_time"] for result in done)
+    return {
+        "config": {
+            "tick_rate": app_config.PHYSICS_TICK_RATE,
+            "substeps": app_config.PHYSICS_SUBSTEPS,
+            "max_seconds": seconds,
+            "workers": workers or os.cpu_count(),
+        },
+        "summary": {
+            "runs": len(results),
+            "errors": len(results) - len(done),
+            "finished": sum(result["finished"] for result in done),
+            "game_over": sum(result["game_over"] for result in done),
+            "game_time": game_time,
+            "wall_time": wall_time,
+            "speedup": game_time / wall_time if wall_time else 0.0,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate levels with input scripts, without a window")
+    parser.add_argument("--levels", help="comma separated level numbers, all levels by default")
+    parser.add_argument("--scripts", nargs="+", default=[DEFAULT_SCRIPTS], help="input script files or globs")
+    parser.add_argument("--seconds", type=float, default=120, help="game time limit of a run")
+    parser.add_argument("--workers", type=int, help="processes, one per core by default")
+    parser.add_argument("--out", default="-", help="JSON file to write, - for stdout")
+    args = parser.parse_args()
+
+    setup_resources()
+    levels = [int(lvl) for lvl in args.levels.split(",")] if args.levels else get_levels()
+    scripts = sorted(path for pattern in args.scripts for path in glob.glob(pattern))
+    if not scripts:
+        parser.error(f"no input scripts match {args.scripts}")
+
+    report = run_batch(levels, scripts, args.seconds, args.workers)
+    output = json.dumps(report, indent=2)
+    if args.out == "-":
+        print(output)
+    else:
+        with open(args.out, "w") as file:
+            file.write(output)
+        summary = report["summary"]
+        print(
+            f"{summary['runs']} runs, {summary['finished']} finished, {summary['game_over']} game over, "
+            f"{summary['errors']} errors: {summary['game_time']:.0f} s of game in {summary['wall_time']:.1f} s "
+            f"({summary['speedup']:.0f}x)",
+            file=sys.stderr
+        )
+
+
+if __name__ == "__main__":
+    main()
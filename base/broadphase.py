@@ -0,0 +1,124 @@
+"""
+Broadphase of the pymunk space: the default bounding box tree or a spatial hash
+sized from the tiles and the shapes of the level. "auto" steps a copy of the level
+with either and keeps the faster one, once per level and run.
+"""
+import logging
+import statistics
+from time import perf_counter
+from typing import Iterable
+
+import pymunk
+
+logger = logging.getLogger(__name__)
+
+TREE = "tree"
+HASH = "hash"
+AUTO = "auto"
+# Cells of the spatial hash per shape, Chipmunk suggests about ten times the number of objects
+HASH_CELLS_PER_SHAPE = 10
+MIN_HASH_CELLS = 1000
+WARMUP_STEPS = 60
+
+# What auto picked, by level
+auto_choices: dict[int, str] = {}
+
+
+def get_hash_cells(shape_count: int) -> int:
+    return max(MIN_HASH_CELLS, HASH_CELLS_PER_SHAPE * shape_count)
+
+
+def copy_shape(shape: pymunk.Shape, body: pymunk.Body) -> pymunk.Shape | None:
+    """The shape on a body of the scratch space, static shapes in world coordinates"""
+    if isinstance(shape, pymunk.Poly):
+        vertices = shape.get_vertices()
+        if body.body_type == pymunk.Body.STATIC:
+            vertices = [shape.body.local_to_world(vertex) for vertex in vertices]
+        copy = pymunk.Poly(body, vertices, radius=shape.radius)
+    elif isinstance(shape, pymunk.Segment):
+        a, b = shape.a, shape.b
+        if body.body_type == pymunk.Body.STATIC:
+            a, b = shape.body.local_to_world(a), shape.body.local_to_world(b)
+        copy = pymunk.Segment(body, a, b, shape.radius)
+    elif isinstance(shape, pymunk.Circle):
+        offset = shape.offset
+        if body.body_type == pymunk.Body.STATIC:
+            offset = shape.body.local_to_world(offset)
+        copy = pymunk.Circle(body, shape.radius, offset)
+    else:
+        return None
+    copy.sensor = shape.sensor
+    copy.filter = shape.filter
+    copy.friction = shape.friction
+    copy.elasticity = shape.elasticity
+    return copy
+
+
+def copy_space(shapes: Iterable[pymunk.Shape], gravity: tuple[float, float], damping: float) -> pymunk.Space:
+    """Bodies and shapes without collision handlers, enough to time the steps"""
+    space = pymunk.Space()
+    space.gravity = gravity
+    space.damping = damping
+    bodies: dict[pymunk.Body, pymunk.Body] = {}
+    copies = []
+    for shape in shapes:
+        body = shape.body
+        if body.body_type == pymunk.Body.STATIC:
+            copy = copy_shape(shape, space.static_body)
+        else:
+            if body not in bodies:
+                bodies[body] = pymunk.Body(body.mass, body.moment, body.body_type)
+                bodies[body].position = body.position
+                bodies[body].velocity = body.velocity
+                space.add(bodies[body])
+            copy = copy_shape(shape, bodies[body])
+        if copy is not None:
+            copies.append(copy)
+    space.add(*copies)
+    return space
+
+
+def time_steps(space: pymunk.Space, delta_time: float, steps: int) -> float:
+    times = []
+    for _ in range(steps):
+        start = perf_counter()
+        space.step(delta_time)
+        times.append(perf_counter() - start)
+    return statistics.median(times)
+
+
+def measure(
+        shapes: list[pymunk.Shape],
+        gravity: tuple[float, float],
+        damping: float,
+        cell_size: float,
+        delta_time: float,
+        steps: int = WARMUP_STEPS
+) -> dict[str, float]:
+    """Median step time of a copy of the shapes with each broadphase"""
+    results = {}
+    for broadphase in (TREE, HASH):
+        space = copy_space(shapes, gravity, damping)
+        if broadphase == HASH:
+            space.use_spatial_hash(cell_size, get_hash_cells(len(shapes)))
+        results[broadphase] = time_steps(space, delta_time, steps)
+    return results
+
+
+def choose(
+        lvl: int,
+        shapes: list[pymunk.Shape],
+        gravity: tuple[float, float],
+        damping: float,
+        cell_size: float,
+        delta_time: float
+) -> str:
+    """The faster broadphase for the level, measured the first time it is asked"""
+    if lvl not in auto_choices:
+        results = measure(shapes, gravity, damping, cell_size, delta_time)
+        auto_choices[lvl] = min(results, key=results.get)
+        logger.info(
+            f"broadphase of level {lvl}: {auto_choices[lvl]} "
+            f"(tree {results[TREE] * 1e6:.0f} us, hash {results[HASH] * 1e6:.0f} us per step)"
+        )
+    return auto_choices[lvl]
@@ -5,6 +5,36 @@ import arcade
 app_config = AppConfig()
 
 
+def follow(
+        position: tuple[float, float],
+        map_size: tuple[float, float],
+        view_size: tuple[float, float]
+) -> tuple[float, float]:
+    """Center of the view on the position, kept inside the map"""
+    camera_min_x = view_size[0] // 2
+    camera_max_x = map_size[0] - (view_size[0] // 2)
+    camera_min_y = view_size[1] // 2
+    camera_max_y = map_size[1] - (view_size[1] // 2)
+
+    player_x, player_y = position
+
+    if player_x < camera_min_x:
+        camera_x = camera_min_x
+    elif camera_min_x < player_x < camera_max_x:
+        camera_x = player_x
+    else:
+        camera_x = camera_max_x
+
+    if player_y < camera_min_y:
+        camera_y = camera_min_y
+    elif camera_min_y < player_y < camera_max_y:
+        camera_y = player_y
+    else:
+        camera_y = camera_max_y
+
+    return camera_x, camera_y
+
+
 class PlayerCamera(arcade.Camera2D):
     def __init__(
             self,
@@ -14,32 +44,13 @@ class PlayerCamera(arcade.Camera2D):
     ):
         super().__init__()
 
-        self.camera_min_x = app_config.WINDOW_WIDTH // 2
-        self.camera_max_x = map_width - (app_config.WINDOW_WIDTH // 2)
-        self.camera_min_y = app_config.WINDOW_HEIGHT // 2
-        self.camera_max_y = map_height - (app_config.WINDOW_HEIGHT // 2)
+        self.map_size = map_width, map_height
 
         self.player_sprite = player_sprite
 
     def set_position(self):
-        camera_x: int
-        camera_y: int
-
-        player_x = self.player_sprite.position[0]
-        player_y = self.player_sprite.position[1]
-
-        if player_x < self.camera_min_x:
-            camera_x = self.camera_min_x
-        elif self.camera_min_x < player_x < self.camera_max_x:
-            camera_x = player_x
-        else:
-            camera_x = self.camera_max_x
-
-        if player_y < self.camera_min_y:
-            camera_y = self.camera_min_y
-        elif self.camera_min_y < player_y < self.camera_max_y:
-            camera_y = player_y
-        else:
-            camera_y = self.camera_max_y
-
-        self.position = camera_x, camera_y
\ No newline at end of file
+        self.position = follow(
+            self.player_sprite.position,
+            self.map_size,
+            (app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT)
+        )
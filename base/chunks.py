@@ -0,0 +1,267 @@
+import logging
+import math
+from typing import Iterable
+
+from base.engine import PhysicsEngine
+from misc.config import AppConfig
+
+import pymunk
+from arcade import Sprite, SpriteList
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+ChunkKey = tuple[int, int]
+
+
+class Chunk:
+    """Sprites and static shapes of one square of the map"""
+    def __init__(self, key: ChunkKey):
+        self.key = key
+        self.active: bool = False
+        # Sprites of layers that don't move, by the chunk they were placed in
+        self.sprites: dict[SpriteList, list[Sprite]] = {}
+        # Static collision shapes, in the space only while the chunk is active
+        self.shapes: dict[SpriteList, list[pymunk.Shape]] = {}
+        # Dynamic and kinematic bodies taken out of the space when the chunk was deactivated
+        self.frozen: list[Sprite] = []
+        # Sensors of the collectibles placed in the chunk, in the space only while it is active
+        self.sensors: list[pymunk.Shape] = []
+
+
+class ChunkManager:
+    """
+    Splits the level into square chunks and keeps live only the ones around the camera.
+
+    Every layer gets an active SpriteList with the sprites of active chunks, it is
+    what gets drawn and checked for pickups. Skipped layers have no active
+    list (the player, layers drawn by the tile shader), static ones still get shapes. Static collision shapes are
+    built per chunk and added to the space on activation. Bodies of dynamic items and
+    moving platforms are live only in the chunks within radius of the camera, one that
+    leaves them is frozen in the chunk it is in. Static chunks stay active one chunk
+    beyond, so a live body at the border always has the shapes it may stand on.
+    Sensors of collectibles come and go with their chunk like static shapes.
+    """
+    def __init__(
+            self,
+            layers: Iterable[SpriteList],
+            physics_engine: PhysicsEngine,
+            static_layers: dict[SpriteList, tuple[float, str, str]],
+            dynamic_layers: list[SpriteList],
+            skip_layers: list[SpriteList],
+            map_size: tuple[float, float],
+            chunk_size: float,
+            radius: int
+    ):
+        self.physics_engine = physics_engine
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.columns = max(1, math.ceil(map_size[0] / chunk_size))
+        self.rows = max(1, math.ceil(map_size[1] / chunk_size))
+
+        self.chunks: dict[ChunkKey, Chunk] = {}
+        self.active_lists: dict[SpriteList, SpriteList] = {}
+        self.dynamic_layers = dynamic_layers
+        self.active_range: tuple[int, int, int, int] | None = None
+        # Chunks where dynamic bodies are live, active_range is one chunk wider
+        self.live_range: tuple[int, int, int, int] | None = None
+        self.live: set[ChunkKey] = set()
+
+        self.activations: int = 0
+        self.deactivations: int = 0
+
+        merge = bool(app_config.COLLISION_MERGE)
+
+        for sprite_list in layers:
+            skip = sprite_list in skip_layers
+            if skip and sprite_list not in static_layers:
+                continue
+            if not skip:
+                self.active_lists[sprite_list] = SpriteList(use_spatial_hash=sprite_list.spatial_hash is not None)
+            if sprite_list in dynamic_layers:
+                continue
+            by_chunk: dict[ChunkKey, list[Sprite]] = {}
+            for sprite in sprite_list:
+                by_chunk.setdefault(self.get_key(sprite.position), []).append(sprite)
+            for key, sprites in by_chunk.items():
+                chunk = self.get_chunk(key)
+                if not skip:
+                    chunk.sprites[sprite_list] = sprites
+                if sprite_list in static_layers:
+                    chunk.shapes[sprite_list] = physics_engine.build_static_shapes(
+                        sprites, *static_layers[sprite_list], merge=merge
+                    )
+
+        # Bodies start frozen, update() brings in the ones around the camera
+        frozen = [sprite for sprite_list in dynamic_layers for sprite in sprite_list]
+        physics_engine.freeze_sprites(frozen)
+        for sprite in frozen:
+            self.get_chunk(self.get_key(sprite.position)).frozen.append(sprite)
+
+        logger.info(
+            f"chunks: {self.columns} X {self.rows} of {chunk_size}px, "
+            f"{sum(len(shapes) for chunk in self.chunks.values() for shapes in chunk.shapes.values())} static shapes"
+        )
+
+    def get_key(self, position: tuple[float, float]) -> ChunkKey:
+        return int(position[0] // self.chunk_size), int(position[1] // self.chunk_size)
+
+    def get_chunk(self, key: ChunkKey) -> Chunk:
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = Chunk(key)
+        return chunk
+
+    def get_active(self, sprite_list: SpriteList) -> SpriteList:
+        """Part of the layer in active chunks, the layer itself if it is not chunked"""
+        return self.active_lists.get(sprite_list, sprite_list)
+
+    def add_sensors(self, sprite_list: SpriteList) -> None:
+        """Sensors of the collectibles in the layer leave the space with their chunks from now on"""
+        inactive = []
+        for sprite in sprite_list:
+            shape = self.physics_engine.collectible_shapes[sprite]
+            chunk = self.get_chunk(self.get_key(sprite.position))
+            chunk.sensors.append(shape)
+            if not chunk.active:
+                inactive.append(shape)
+        if inactive:
+            self.physics_engine.space.remove(*inactive)
+
+    def get_sensors(self, chunk: Chunk) -> list[pymunk.Shape]:
+        """Sensors of the chunk that weren't picked up, the others are forgotten"""
+        chunk.sensors[:] = [shape for shape in chunk.sensors if shape in self.physics_engine.collectibles]
+        return chunk.sensors
+
+    def get_inactive_shapes(self) -> list[pymunk.Shape]:
+        """Shapes out of the space now: static ones and sensors of inactive chunks and the ones of frozen bodies"""
+        shapes = []
+        for chunk in self.chunks.values():
+            if not chunk.active:
+                shapes.extend(shape for layer_shapes in chunk.shapes.values() for shape in layer_shapes)
+                shapes.extend(self.get_sensors(chunk))
+            shapes.extend(self.physics_engine.sprites[sprite].shape for sprite in chunk.frozen)
+        return shapes
+
+    def get_range(
+            self,
+            center: tuple[float, float],
+            view_size: tuple[float, float],
+            radius: int
+    ) -> tuple[int, int, int, int]:
+        half_w, half_h = view_size[0] / 2, view_size[1] / 2
+        left, bottom = self.get_key((center[0] - half_w, center[1] - half_h))
+        right, top = self.get_key((center[0] + half_w, center[1] + half_h))
+        return (
+            max(0, left - radius),
+            max(0, bottom - radius),
+            min(self.columns - 1, right + radius),
+            min(self.rows - 1, top + radius)
+        )
+
+    @staticmethod
+    def get_keys(chunk_range: tuple[int, int, int, int]) -> set[ChunkKey]:
+        left, bottom, right, top = chunk_range
+        return {(col, row) for col in range(left, right + 1) for row in range(bottom, top + 1)}
+
+    def update(self, center: tuple[float, float], view_size: tuple[float, float]) -> None:
+        """
+        Activate chunks that came into range of the camera and deactivate the ones that
+        left it. When the live chunks change, the bodies out of them are frozen where
+        they are then. Until that, a body that rolled out of them is still simulated,
+        with the static chunks one beyond under it.
+        """
+        active_range = self.get_range(center, view_size, self.radius + 1)
+        if active_range != self.active_range:
+            wanted = self.get_keys(active_range)
+            if self.active_range is not None:
+                for key in self.get_keys(self.active_range) - wanted:
+                    self.deactivate(self.get_chunk(key))
+            for key in wanted:
+                chunk = self.get_chunk(key)
+                if not chunk.active:
+                    self.activate(chunk)
+            self.active_range = active_range
+
+        live_range = self.get_range(center, view_size, self.radius)
+        if live_range != self.live_range:
+            live = self.get_keys(live_range)
+            self.freeze_bodies(live)
+            for key in live - self.live:
+                self.thaw_bodies(self.get_chunk(key))
+            self.live = live
+            self.live_range = live_range
+
+    def freeze_bodies(self, live: set[ChunkKey]) -> None:
+        """Bodies are frozen where they are now, they may have left the chunk they started in"""
+        frozen = []
+        for sprite_list in self.dynamic_layers:
+            active_list = self.active_lists[sprite_list]
+            for sprite in [sprite for sprite in active_list if self.get_key(sprite.position) not in live]:
+                active_list.remove(sprite)
+                self.get_chunk(self.get_key(sprite.position)).frozen.append(sprite)
+                frozen.append(sprite)
+        self.physics_engine.freeze_sprites(frozen)
+
+    def thaw_bodies(self, chunk: Chunk) -> None:
+        self.physics_engine.thaw_sprites(list(chunk.frozen))
+        for sprite in chunk.frozen:
+            for sprite_list in sprite.sprite_lists:
+                if sprite_list in self.dynamic_layers:
+                    self.active_lists[sprite_list].append(sprite)
+                    break
+        chunk.frozen.clear()
+
+    def activate(self, chunk: Chunk) -> None:
+        chunk.active = True
+        self.activations += 1
+
+        for sprite_list, sprites in chunk.sprites.items():
+            # Drop the sprites that were picked up since the chunk was active last time
+            sprites[:] = [sprite for sprite in sprites if sprite_list in sprite.sprite_lists]
+            self.active_lists[sprite_list].extend(sprites)
+
+        shapes = [shape for layer_shapes in chunk.shapes.values() for shape in layer_shapes]
+        shapes.extend(self.get_sensors(chunk))
+        if shapes:
+            self.physics_engine.space.add(*shapes)
+
+    def deactivate(self, chunk: Chunk) -> None:
+        chunk.active = False
+        self.deactivations += 1
+
+        for sprite_list, sprites in chunk.sprites.items():
+            active_list = self.active_lists[sprite_list]
+            for sprite in sprites:
+                if active_list in sprite.sprite_lists:
+                    active_list.remove(sprite)
+
+        shapes = [shape for layer_shapes in chunk.shapes.values() for shape in layer_shapes]
+        shapes.extend(self.get_sensors(chunk))
+        if shapes:
+            self.physics_engine.space.remove(*shapes)
+
+
+    def remove_layer(self, sprite_list: SpriteList) -> None:
+        """Forget the layer: its shapes leave the space and it isn't drawn anymore"""
+        for chunk in self.chunks.values():
+            shapes = chunk.shapes.pop(sprite_list, [])
+            if chunk.active and shapes:
+                self.physics_engine.space.remove(*shapes)
+            chunk.sprites.pop(sprite_list, None)
+        active_list = self.active_lists.pop(sprite_list, None)
+        if active_list is not None:
+            active_list.clear()
+
+    def draw_sprite_list(self, sprite_list: SpriteList) -> None:
+        if sprite_list.visible:
+            self.get_active(sprite_list).draw()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "active": sum(1 for chunk in self.chunks.values() if chunk.active),
+            "total": self.columns * self.rows,
+            "activations": self.activations,
+            "deactivations": self.deactivations,
+        }
@@ -0,0 +1,95 @@
+import logging
+
+import numpy as np
+
+import arcade
+
+logger = logging.getLogger(__name__)
+
+
+class TileRect:
+    """Rectangle of merged tiles in world coordinates"""
+    def __init__(self, left: float, bottom: float, width: float, height: float):
+        self.left = left
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+
+    @property
+    def vertices(self) -> list[tuple[float, float]]:
+        right = self.left + self.width
+        top = self.bottom + self.height
+        return [(self.left, self.bottom), (right, self.bottom), (right, top), (self.left, top)]
+
+    def __repr__(self):
+        return f"TileRect({self.left}, {self.bottom}, {self.width}, {self.height})"
+
+
+def is_solid_tile(sprite: arcade.Sprite) -> bool:
+    """True when the sprite's hit box covers the whole tile, so it can be merged with neighbours"""
+    points = sprite.hit_box.points
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    half_w = sprite.texture.width / 2
+    half_h = sprite.texture.height / 2
+    return min(xs) <= -half_w and max(xs) >= half_w and min(ys) <= -half_h and max(ys) >= half_h
+
+
+def merge_cells(cells: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Greedy meshing of a boolean grid into maximal rectangles.
+    Rows grow along the first axis. Returns (col, row, width, height) tuples.
+    """
+    todo = cells.copy()
+    rows, cols = todo.shape
+    rects = []
+    for row in range(rows):
+        for col in np.flatnonzero(todo[row]).tolist():
+            if not todo[row, col]:
+                continue
+            width = 1
+            while col + width < cols and todo[row, col + width]:
+                width += 1
+            height = 1
+            while row + height < rows and todo[row + height, col:col + width].all():
+                height += 1
+            todo[row:row + height, col:col + width] = False
+            rects.append((col, row, width, height))
+    return rects
+
+
+def build_tile_rects(
+        sprite_list: arcade.SpriteList,
+        tile_size: float
+) -> tuple[list[TileRect], list[arcade.Sprite]]:
+    """
+    Split the tile layer into merged rectangles of solid tiles and
+    the rest of the sprites, which keep their own hit boxes.
+    """
+    solid = []
+    rest = []
+    for sprite in sprite_list:
+        if sprite.angle == 0 and is_solid_tile(sprite) and \
+                abs(sprite.width - tile_size) < 0.5 and abs(sprite.height - tile_size) < 0.5:
+            solid.append(sprite)
+        else:
+            rest.append(sprite)
+
+    if not solid:
+        return [], rest
+
+    cols = [round(sprite.left / tile_size) for sprite in solid]
+    rows = [round(sprite.bottom / tile_size) for sprite in solid]
+    min_col, min_row = min(cols), min(rows)
+
+    cells = np.zeros((max(rows) - min_row + 1, max(cols) - min_col + 1), dtype=bool)
+    cells[np.array(rows) - min_row, np.array(cols) - min_col] = True
+
+    rects = [
+        TileRect((col + min_col) * tile_size, (row + min_row) * tile_size, width * tile_size, height * tile_size)
+        for col, row, width, height in merge_cells(cells)
+    ]
+
+    logger.debug(f"{len(solid)} solid tiles merged into {len(rects)} rects, {len(rest)} tiles left as is")
+
+    return rects, rest
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import Iterable
+
+import pymunk
+
+# Collision categories, a shape is in the one of its layer
+PLAYER = "player"
+ITEM = "item"
+MOVING = "moving"
+PLATFORM = "platform"
+EDGE = "edge"
+LVL_WALL = "lvl_wall"
+COLLECTIBLE = "collectible"
+CATEGORIES = (PLAYER, ITEM, MOVING, PLATFORM, EDGE, LVL_WALL, COLLECTIBLE)
+
+# Categories each category collides with. A pair collides only when both sides list each
+# other, the others are dropped by the broadphase before any narrowphase test. Pairs of
+# static and kinematic shapes never collide anyway, collectibles are sensors for the player.
+COLLISION_MATRIX: dict[str, tuple[str, ...]] = {
+    PLAYER: (ITEM, MOVING, PLATFORM, EDGE, LVL_WALL, COLLECTIBLE),
+    ITEM: (PLAYER, ITEM, MOVING, PLATFORM, EDGE, LVL_WALL),
+    MOVING: (PLAYER, ITEM),
+    PLATFORM: (PLAYER, ITEM),
+    EDGE: (PLAYER, ITEM),
+    LVL_WALL: (PLAYER, ITEM),
+    COLLECTIBLE: (PLAYER,),
+}
+
+
+def parse_pairs(value: str) -> list[tuple[str, str]]:
+    """Pairs of categories from "item:edge,item:lvl_wall" """
+    pairs = []
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+        a, _, b = pair.partition(":")
+        a, b = a.strip(), b.strip()
+        for category in (a, b):
+            if category not in CATEGORIES:
+                raise ValueError(f"unknown collision category {category!r} in {value!r}, one of {', '.join(CATEGORIES)}")
+        pairs.append((a, b))
+    return pairs
+
+
+class CollisionMatrix:
+    """ShapeFilter of every category from COLLISION_MATRIX without the ignored pairs"""
+    def __init__(
+            self,
+            ignored: Iterable[tuple[str, str]] = (),
+            matrix: dict[str, tuple[str, ...]] = COLLISION_MATRIX
+    ):
+        self.bits: dict[str, int] = {category: 1 << i for i, category in enumerate(CATEGORIES)}
+        self.names: dict[int, str] = {bit: category for category, bit in self.bits.items()}
+        self.collides_with: dict[str, set[str]] = {category: set(matrix[category]) for category in CATEGORIES}
+        for a, b in ignored:
+            self.collides_with[a].discard(b)
+            self.collides_with[b].discard(a)
+        self.filters: dict[str, pymunk.ShapeFilter] = {
+            category: pymunk.ShapeFilter(
+                categories=self.bits[category],
+                mask=sum(self.bits[other] for other in self.collides_with[category])
+            )
+            for category in CATEGORIES
+        }
+
+    def get_filter(self, category: str) -> pymunk.ShapeFilter:
+        return self.filters[category]
+
+    def collides(self, a: str, b: str) -> bool:
+        return b in self.collides_with[a] and a in self.collides_with[b]
+
+    def get_category(self, shape: pymunk.Shape) -> str | None:
+        return self.names.get(shape.filter.categories)
+
+
+class ContactCounter:
+    """
+    Contacts by pair of categories, summed over the steps since it was attached.
+    Every pair in contact counts once a step, sensor overlaps included. Counting
+    costs a Python call per contact, it is meant for checking the matrix.
+    """
+    def __init__(self, matrix: CollisionMatrix):
+        self.matrix = matrix
+        self.counts: dict[tuple[str, str], int] = defaultdict(int)
+        self.handled: set[int] = set()
+
+    def attach(self, space: pymunk.Space, collision_types: Iterable[int]) -> None:
+        for collision_type in collision_types:
+            if collision_type not in self.handled:
+                self.handled.add(collision_type)
+                space.add_wildcard_collision_handler(collision_type).pre_solve = self.pre_solve
+
+    def pre_solve(self, arbiter: pymunk.Arbiter, space: pymunk.Space, data) -> bool:
+        # Both shapes' wildcard handlers see the pair, the second one with the shapes swapped
+        a, b = arbiter.shapes
+        if a.collision_type < b.collision_type or a.collision_type == b.collision_type and id(a) < id(b):
+            pair = sorted((self.matrix.get_category(a), self.matrix.get_category(b)), key=str)
+            self.counts[pair[0], pair[1]] += 1
+        return True
+
+    def reset(self) -> None:
+        self.counts.clear()
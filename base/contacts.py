@@ -0,0 +1,87 @@
+import pymunk
+from pymunk import Vec2d
+
+# Surface of static shapes by collision type, anything else is NORMAL
+NORMAL = "normal"
+SURFACES = ("ice", "sand")
+
+
+class GroundContact:
+    """What a body stood on in the step it was last seen on the ground"""
+    def __init__(self):
+        self.step: int = -1
+        self.normal: Vec2d = Vec2d.zero()
+        self.body: pymunk.Body | None = None
+        self.shape: pymunk.Shape | None = None
+
+
+class ContactTracker:
+    """
+    Ground state of tracked bodies, kept by post_solve handlers while the space
+    steps instead of walking the arbiters of a body every time it is asked.
+
+    A contact counts as ground when its normal is within maximum_incline of the
+    gravity, as in PymunkPhysicsEngine.check_grounding. start_step() runs before
+    every space step, a body is on the ground when a contact of the last step
+    said so. A sleeping body gets no contacts solved, it stays on what it
+    stood on last.
+    """
+    def __init__(self, space: pymunk.Space, maximum_incline: float, collision_types: list[str]):
+        self.space = space
+        self.maximum_incline = maximum_incline
+        # Names of the collision type ids, shared with the engine
+        self.collision_types = collision_types
+        self.grounds: dict[pymunk.Body, GroundContact] = {}
+        self.handled: set[int] = set()
+        self.steps: int = 0
+        self.gravity_unit: Vec2d = Vec2d(0, -1)
+
+    def track(self, body: pymunk.Body, collision_type: int) -> GroundContact:
+        if collision_type not in self.handled:
+            self.handled.add(collision_type)
+            handler = self.space.add_wildcard_collision_handler(collision_type)
+            handler.post_solve = self.post_solve
+        ground = self.grounds[body] = GroundContact()
+        return ground
+
+    def reset(self, body: pymunk.Body) -> None:
+        """The body was moved, it is in the air until a step says otherwise"""
+        self.grounds[body] = GroundContact()
+
+    def untrack(self, body: pymunk.Body) -> None:
+        self.grounds.pop(body, None)
+
+    def start_step(self) -> None:
+        self.steps += 1
+        self.gravity_unit = Vec2d(1, 0).rotated(self.space.gravity.angle)
+
+    def post_solve(self, arbiter: pymunk.Arbiter, space: pymunk.Space, data) -> None:
+        # The shape of the handled collision type comes first
+        shape, other = arbiter.shapes
+        ground = self.grounds.get(shape.body)
+        if ground is None:
+            return
+        normal = arbiter.normal
+        gravity, incline = self.gravity_unit, self.maximum_incline
+        if gravity.x + incline > normal.x > gravity.x - incline and gravity.y + incline > normal.y > gravity.y - incline:
+            ground.step = self.steps
+            ground.normal = normal
+            ground.body = other.body
+            ground.shape = other
+
+    def on_ground(self, body: pymunk.Body) -> bool:
+        return self.get_ground(body) is not None
+
+    def get_ground(self, body: pymunk.Body) -> GroundContact | None:
+        ground = self.grounds[body]
+        if ground.step == self.steps or body.is_sleeping and ground.body is not None:
+            return ground
+        return None
+
+    def get_surface(self, body: pymunk.Body) -> str | None:
+        """ice, sand or normal under the body, None in the air"""
+        ground = self.get_ground(body)
+        if ground is None:
+            return None
+        name = self.collision_types[ground.shape.collision_type]
+        return name if name in SURFACES else NORMAL
@@ -1,14 +1,39 @@
-from typing import Tuple
+import functools
+from typing import Callable, Iterable, Tuple
 
+import numpy as np
+
+from base.broadphase import HASH, TREE, get_hash_cells
+from base.collision import build_tile_rects
+from base.collision_matrix import (
+    COLLECTIBLE, EDGE, ITEM, LVL_WALL, MOVING, PLATFORM, PLAYER, CollisionMatrix, ContactCounter, parse_pairs
+)
+from base.contacts import ContactTracker, GroundContact
+from base.moving import MovingPlatforms
 from misc.config import AppConfig
 from controllers.controller import GameController
 from misc.sound_player import SoundPlayer
 
 import arcade
-from arcade import PymunkPhysicsEngine, Sprite
+import pymunk
+from arcade import PymunkPhysicsEngine, Sprite, SpriteList
 
 app_config = AppConfig()
 
+# Sleep time threshold that lets bodies be put to sleep without any falling asleep by themselves
+FORCED_SLEEP_ONLY = 1e9
+
+
+def after_step(method: Callable) -> Callable:
+    """Calls made while the space steps, from a collision handler, wait until the step is over"""
+    @functools.wraps(method)
+    def wrapper(self: "PhysicsEngine", *args, **kwargs) -> None:
+        if self.stepping:
+            self.deferred.append(functools.partial(method, self, *args, **kwargs))
+        else:
+            method(self, *args, **kwargs)
+    return wrapper
+
 
 class PhysicsEngine(PymunkPhysicsEngine):
     """
@@ -17,7 +42,8 @@ class PhysicsEngine(PymunkPhysicsEngine):
     def __init__(
             self,
             damping: float,
-            gravity: Tuple[int, float]
+            gravity: Tuple[int, float],
+            sound_player: "SoundPlayer | None" = None
     ):
         super().__init__(
             damping=damping,
@@ -26,15 +52,56 @@ class PhysicsEngine(PymunkPhysicsEngine):
 
         self.main_controller = GameController()
 
-        self.sound_player = SoundPlayer()
+        # Bodies put to sleep by PhysicsLOD need sleeping on even when idle ones stay awake
+        if app_config.PHYSICS_SLEEP_TIME:
+            self.space.sleep_time_threshold = app_config.PHYSICS_SLEEP_TIME
+        elif app_config.PHYSICS_LOD_DISTANCE:
+            self.space.sleep_time_threshold = FORCED_SLEEP_ONLY
+        self.space.idle_speed_threshold = app_config.PHYSICS_IDLE_SPEED
+
+        self.sound_player = sound_player or SoundPlayer()
 
         self.player_sprite: arcade.Sprite | None = None
         self.platform_list = None
         self.item_list = None
         self.moving_sprites_list = None
+        self.moving_platforms: MovingPlatforms | None = None
         self.edge_list = None
         self.lvl_walls = None
 
+        # Merged static shapes of tile layers
+        self.static_shapes: dict[SpriteList, list[pymunk.Shape]] = {}
+
+        # Sensor shapes of collectibles and the sprites they stand for
+        self.collectibles: dict[pymunk.Shape, Sprite] = {}
+        self.collectible_shapes: dict[Sprite, pymunk.Shape] = {}
+        # Collectibles the player overlaps now, by collision type
+        self.touching: dict[str, set[Sprite]] = {}
+
+        # Ground state of the player and other tracked bodies, kept up to date by the steps
+        self.contacts = ContactTracker(self.space, self.maximum_incline_on_ground, self.collision_types)
+
+        # Force move_player pushes the player with, the space drops forces after every step
+        self.player_force: tuple[float, float] = (0, 0)
+        # Ticks run so far
+        self.ticks: int = 0
+
+        # Mutations asked for during a step, applied once it is over
+        self.deferred: list[Callable[[], None]] = []
+        self.stepping: bool = False
+
+        self.broadphase: str = TREE
+
+        # Which layers collide with which, every shape gets the ShapeFilter of its category
+        self.collision_matrix = CollisionMatrix(parse_pairs(app_config.COLLISION_IGNORE))
+        self.contact_counter: ContactCounter | None = None
+
+    def use_broadphase(self, broadphase: str, cell_size: float, shape_count: int) -> None:
+        """A spatial hash for HASH with cells for shape_count shapes, the space keeps its tree otherwise"""
+        if broadphase == HASH and self.broadphase != HASH:
+            self.space.use_spatial_hash(cell_size, get_hash_cells(shape_count))
+        self.broadphase = broadphase
+
     def add_player(
             self,
             sprite: Sprite
@@ -49,33 +116,266 @@ class PhysicsEngine(PymunkPhysicsEngine):
             max_horizontal_velocity=app_config.PLAYER_MAX_HORIZONTAL_SPEED,
             max_vertical_velocity=app_config.PLAYER_MAX_VERTICAL_SPEED,
         )
+        self.set_category([sprite], PLAYER)
+        self.track_contacts(sprite)
+
+    def set_category(self, sprites: Iterable[Sprite], category: str) -> None:
+        shape_filter = self.collision_matrix.get_filter(category)
+        for sprite in sprites:
+            self.sprites[sprite].shape.filter = shape_filter
+
+    def count_contacts(self) -> ContactCounter:
+        """Start counting contacts by pair of categories, the counter stays on for the level"""
+        if self.contact_counter is None:
+            self.contact_counter = ContactCounter(self.collision_matrix)
+        self.contact_counter.attach(self.space, range(len(self.collision_types)))
+        return self.contact_counter
+
+    def track_contacts(self, sprite: Sprite) -> None:
+        """Keep the ground state of a dynamic sprite, is_on_ground reads it from then on"""
+        shape = self.sprites[sprite].shape
+        self.contacts.track(shape.body, shape.collision_type)
+
+    @after_step
+    def remove_sprite(self, sprite: Sprite) -> None:
+        self.contacts.untrack(self.sprites[sprite].body)
+        super().remove_sprite(sprite)
+
+    @after_step
+    def remove_sprites(self, sprites: Iterable[Sprite]) -> None:
+        """remove_sprite for many sprites with a single call into the space"""
+        removed = set()
+        objects = []
+        for sprite in sprites:
+            physics_object = self.sprites.pop(sprite)
+            self.contacts.untrack(physics_object.body)
+            objects += physics_object.body, physics_object.shape
+            removed.add(sprite)
+        if objects:
+            self.space.remove(*objects)
+            self.non_static_sprite_list[:] = [sprite for sprite in self.non_static_sprite_list if sprite not in removed]
+
+    @after_step
+    def reset_body(self, sprite: Sprite, position: tuple[float, float] | None = None) -> None:
+        """
+        Teleport the body to position, where the sprite is by default, at rest. It keeps
+        its body and shape, the ground state starts over.
+        """
+        body = self.sprites[sprite].body
+        if position is None:
+            position = sprite.position
+        body.position = sprite.position = position
+        body.velocity = (0, 0)
+        body.angular_velocity = 0
+        body.force = (0, 0)
+        if body.space is not None:
+            if body.is_sleeping:
+                body.activate()
+            self.space.reindex_shapes_for_body(body)
+        if body in self.contacts.grounds:
+            self.contacts.reset(body)
+
+    def apply_deferred(self) -> None:
+        deferred, self.deferred = self.deferred, []
+        for mutation in deferred:
+            mutation()
+
+    def is_on_ground(self, sprite: Sprite) -> bool:
+        body = self.sprites[sprite].body
+        if body in self.contacts.grounds:
+            return self.contacts.on_ground(body)
+        return super().is_on_ground(sprite)
+
+    def get_ground(self, sprite: Sprite) -> GroundContact | None:
+        """Normal, body and shape the tracked sprite stands on, None in the air"""
+        return self.contacts.get_ground(self.sprites[sprite].body)
+
+    def get_surface(self, sprite: Sprite) -> str | None:
+        return self.contacts.get_surface(self.sprites[sprite].body)
+
+    def get_collision_type_id(self, collision_type: str) -> int:
+        if collision_type not in self.collision_types:
+            self.collision_types.append(collision_type)
+        return self.collision_types.index(collision_type)
+
+    def build_static_shapes(
+            self,
+            sprites: Iterable[Sprite],
+            friction: float,
+            collision_type: str = "wall",
+            category: str = PLATFORM,
+            merge: bool = True
+    ) -> list[pymunk.Shape]:
+        """
+        Shapes of static tiles on the static body, not added to the space.
+        With merge=True contiguous solid tiles become one rectangle.
+        """
+        if merge:
+            rects, rest = build_tile_rects(sprites, app_config.SPRITE_SIZE)
+        else:
+            rects, rest = [], sprites
+        collision_type_id = self.get_collision_type_id(collision_type)
+        shape_filter = self.collision_matrix.get_filter(category)
+
+        polys = [rect.vertices for rect in rects]
+        polys.extend(sprite.hit_box.get_adjusted_points() for sprite in rest)
+
+        shapes = []
+        for vertices in polys:
+            shape = pymunk.Poly(self.space.static_body, vertices)
+            shape.friction = friction
+            shape.collision_type = collision_type_id
+            shape.filter = shape_filter
+            shapes.append(shape)
+        return shapes
+
+    def add_static_tiles(
+            self,
+            sprite_list: SpriteList,
+            friction: float,
+            collision_type: str = "wall",
+            category: str = PLATFORM
+    ) -> None:
+        """
+        Register a static tile layer. Contiguous solid tiles are merged into
+        rectangles on the static body, the other tiles keep their own hit boxes.
+        """
+        if not app_config.COLLISION_MERGE:
+            super().add_sprite_list(
+                sprite_list,
+                friction=friction,
+                collision_type=collision_type,
+                body_type=arcade.PymunkPhysicsEngine.STATIC,
+            )
+            self.set_category(sprite_list, category)
+            return
+
+        shapes = self.build_static_shapes(sprite_list, friction, collision_type, category)
+        if shapes:
+            self.space.add(*shapes)
+        self.static_shapes.setdefault(sprite_list, []).extend(shapes)
+
+    def remove_static_tiles(
+            self,
+            sprite_list: SpriteList
+    ) -> None:
+        shapes = self.static_shapes.pop(sprite_list, [])
+        if shapes:
+            self.space.remove(*shapes)
+        self.remove_sprites([sprite for sprite in sprite_list if sprite in self.sprites])
+
+    def add_collectibles(
+            self,
+            sprite_list: SpriteList,
+            collision_type: str
+    ) -> None:
+        """
+        Sensor shapes on the static body for the sprites: they don't push anything, the
+        player touching them lands the sprite in touching[collision_type] until they
+        separate or it is removed.
+        """
+        collision_type_id = self.get_collision_type_id(collision_type)
+        touching = self.touching.setdefault(collision_type, set())
+        shape_filter = self.collision_matrix.get_filter(COLLECTIBLE)
+
+        shapes = []
+        for sprite in sprite_list:
+            shape = pymunk.Poly(self.space.static_body, sprite.hit_box.get_adjusted_points())
+            shape.sensor = True
+            shape.collision_type = collision_type_id
+            shape.filter = shape_filter
+            self.collectibles[shape] = sprite
+            self.collectible_shapes[sprite] = shape
+            shapes.append(shape)
+        if shapes:
+            self.space.add(*shapes)
+
+        def begin(arbiter: pymunk.Arbiter, space: pymunk.Space, data) -> bool:
+            touching.add(self.collectibles[arbiter.shapes[1]])
+            return True
+
+        def separate(arbiter: pymunk.Arbiter, space: pymunk.Space, data) -> None:
+            sprite = self.collectibles.get(arbiter.shapes[1])
+            if sprite is not None:
+                touching.discard(sprite)
+
+        handler = self.space.add_collision_handler(self.get_collision_type_id("player"), collision_type_id)
+        handler.begin = begin
+        handler.separate = separate
+
+    @after_step
+    def remove_collectibles(
+            self,
+            sprites: Iterable[Sprite]
+    ) -> None:
+        """Takes the sensors out of the space in one go"""
+        shapes = []
+        for sprite in sprites:
+            shape = self.collectible_shapes.pop(sprite)
+            del self.collectibles[shape]
+            # Out of the space already when its chunk isn't active
+            if shape.space is not None:
+                shapes.append(shape)
+            for touching in self.touching.values():
+                touching.discard(sprite)
+        if shapes:
+            self.space.remove(*shapes)
+
+    def freeze_sprite(self, sprite: Sprite) -> None:
+        """Take the body out of the simulation, keeping its state"""
+        self.freeze_sprites([sprite])
+
+    def thaw_sprite(self, sprite: Sprite) -> None:
+        self.thaw_sprites([sprite])
+
+    @after_step
+    def freeze_sprites(self, sprites: list[Sprite]) -> None:
+        if not sprites:
+            return
+        objects = []
+        for sprite in sprites:
+            physics_object = self.sprites[sprite]
+            objects += physics_object.body, physics_object.shape
+        self.space.remove(*objects)
+        frozen = set(sprites)
+        self.non_static_sprite_list[:] = [sprite for sprite in self.non_static_sprite_list if sprite not in frozen]
+        if self.moving_platforms:
+            for sprite in sprites:
+                if sprite in self.moving_platforms.index:
+                    self.moving_platforms.freeze(sprite)
+
+    @after_step
+    def thaw_sprites(self, sprites: list[Sprite]) -> None:
+        if not sprites:
+            return
+        objects = []
+        for sprite in sprites:
+            physics_object = self.sprites[sprite]
+            objects += physics_object.body, physics_object.shape
+        self.space.add(*objects)
+        self.non_static_sprite_list.extend(sprites)
+        if self.moving_platforms:
+            for sprite in sprites:
+                if sprite in self.moving_platforms.index:
+                    self.moving_platforms.thaw(sprite, self.space)
 
     def add_edges(
             self,
             sprite_list
     ) -> None:
-        super().add_sprite_list(
-            sprite_list,
-            friction=app_config.WALL_FRICTION,
-            collision_type="wall",
-            body_type=arcade.PymunkPhysicsEngine.STATIC,
-        )
+        self.add_static_tiles(sprite_list, app_config.WALL_FRICTION, category=EDGE)
 
         self.edge_list = sprite_list
 
     def add_platforms(
             self,
             sprite_list,
-            friction: float | None = None
+            friction: float | None = None,
+            collision_type: str = "wall"
     ) -> None:
         if friction is None:
             friction = app_config.WALL_FRICTION
-        super().add_sprite_list(
-            sprite_list,
-            friction=friction,
-            collision_type="wall",
-            body_type=arcade.PymunkPhysicsEngine.STATIC,
-        )
+        self.add_static_tiles(sprite_list, friction, collision_type, PLATFORM)
 
         self.platform_list = sprite_list
 
@@ -83,15 +383,13 @@ class PhysicsEngine(PymunkPhysicsEngine):
             self,
             sprite_list
     ):
-        super().add_sprite_list(
-            sprite_list,
-            friction=app_config.WALL_FRICTION,
-            collision_type="wall",
-            body_type=arcade.PymunkPhysicsEngine.STATIC,
-        )
+        self.add_static_tiles(sprite_list, app_config.WALL_FRICTION, category=LVL_WALL)
 
         self.lvl_walls = sprite_list
 
+    def remove_lvl_walls(self) -> None:
+        self.remove_static_tiles(self.lvl_walls)
+
     def add_items(
             self,
             sprite_list
@@ -101,21 +399,51 @@ class PhysicsEngine(PymunkPhysicsEngine):
             friction=app_config.DYNAMIC_ITEM_FRICTION,
             collision_type="item"
         )
+        self.set_category(sprite_list, ITEM)
 
         self.item_list = sprite_list
 
     def add_moving_sprites(
             self,
-            sprite_list
+            sprite_list,
+            paths: dict[str, tuple[np.ndarray, bool]] | None = None,
+            scaling: float = 1.0
     ) -> None:
+        """Kinematic platforms, the ones with a "path" property follow that path of the map"""
         super().add_sprite_list(
             sprite_list,
             friction=app_config.WALL_FRICTION,
             collision_type="wall",
             body_type=arcade.PymunkPhysicsEngine.KINEMATIC
         )
+        self.set_category(sprite_list, MOVING)
 
         self.moving_sprites_list = sprite_list
+        self.moving_platforms = MovingPlatforms(
+            list(sprite_list),
+            [self.sprites[sprite].body for sprite in sprite_list],
+            paths or {},
+            scaling,
+            1 / app_config.PHYSICS_TICK_RATE
+        )
+
+    def count_bodies(self) -> dict[str, int]:
+        """Dynamic and kinematic bodies: simulated, sleeping, coarse platforms and out of the space"""
+        counts = {"active": 0, "sleeping": 0, "coarse": 0, "frozen": 0}
+        platforms = self.moving_platforms
+        for sprite, physics_object in self.sprites.items():
+            body = physics_object.body
+            if body.body_type == pymunk.Body.STATIC:
+                continue
+            if body.space is None:
+                counts["frozen"] += 1
+            elif body.is_sleeping:
+                counts["sleeping"] += 1
+            elif platforms is not None and sprite in platforms.index and platforms.coarse[platforms.index[sprite]]:
+                counts["coarse"] += 1
+            else:
+                counts["active"] += 1
+        return counts
 
     def move_player(
             self
@@ -127,48 +455,60 @@ class PhysicsEngine(PymunkPhysicsEngine):
                 force = (-app_config.PLAYER_MOVE_FORCE_ON_GROUND, 0)
             else:
                 force = (-app_config.PLAYER_MOVE_FORCE_IN_AIR, 0)
-            self.apply_force(self.player_sprite, force)
+            self.player_force = force
             self.set_friction(self.player_sprite, 0)
         elif self.main_controller.controls["right"] and not self.main_controller.controls["left"]:
             if is_on_ground:
                 force = (app_config.PLAYER_MOVE_FORCE_ON_GROUND, 0)
             else:
                 force = (app_config.PLAYER_MOVE_FORCE_IN_AIR, 0)
-            self.apply_force(self.player_sprite, force)
+            self.player_force = force
             self.set_friction(self.player_sprite, 0)
         else:
+            self.player_force = (0, 0)
             self.set_friction(self.player_sprite, 1.0)
+        self.apply_force(self.player_sprite, self.player_force)
 
         if self.main_controller.controls["up"]:
-            if self.is_on_ground(self.player_sprite):
+            if is_on_ground:
                 impulse = (0, app_config.PLAYER_JUMP_IMPULSE)
                 self.apply_impulse(self.player_sprite, impulse)
                 self.sound_player.sound_jump()
         elif self.main_controller.controls["middle_up"]:
-            if self.is_on_ground(self.player_sprite):
+            if is_on_ground:
                 impulse = (0, app_config.PLAYER_JUMP_IMPULSE//7)
                 self.apply_impulse(self.player_sprite, impulse)
                 self.sound_player.sound_jump()
 
+    def step(
+            self,
+            delta_time: float = 1 / 60.0,
+            resync_sprites: bool = True
+    ) -> None:
+        self.contacts.start_step()
+        self.stepping = True
+        try:
+            super().step(delta_time, resync_sprites)
+        finally:
+            # A callback that raised must not leave every later mutation queued for good
+            self.stepping = False
+        self.apply_deferred()
+
+    def tick(
+            self,
+            delta_time: float,
+            substeps: int = 1
+    ) -> None:
+        """One fixed step of the game: player controls, the space in substeps, then platform velocities"""
+        self.move_player()
+        substep = delta_time / substeps
+        for i in range(substeps):
+            if i > 0:
+                self.apply_force(self.player_sprite, self.player_force)
+            self.step(substep, resync_sprites=i == substeps - 1)
+        self.rotate_moving(delta_time)
+        self.ticks += 1
 
     def rotate_moving(self, delta_time):
-        for moving_sprite in self.moving_sprites_list:
-            if moving_sprite.boundary_right and \
-                    moving_sprite.change_x > 0 and \
-                    moving_sprite.right > moving_sprite.boundary_right:
-                moving_sprite.change_x *= -1
-            elif moving_sprite.boundary_left and \
-                    moving_sprite.change_x < 0 and \
-                    moving_sprite.left < moving_sprite.boundary_left:
-                moving_sprite.change_x *= -1
-            if moving_sprite.boundary_top and \
-                    moving_sprite.change_y > 0 and \
-                    moving_sprite.top > moving_sprite.boundary_top:
-                moving_sprite.change_y *= -1
-            elif moving_sprite.boundary_bottom and \
-                    moving_sprite.change_y < 0 and \
-                    moving_sprite.bottom < moving_sprite.boundary_bottom:
-                moving_sprite.change_y *= -1
-
-            velocity = (moving_sprite.change_x * 1 / delta_time, moving_sprite.change_y * 1 / delta_time)
-            self.set_velocity(moving_sprite, velocity)
+        """Turns platforms around at their boundaries and moves the others along their paths"""
+        self.moving_platforms.update(delta_time)
@@ -1,14 +1,24 @@
 import logging
 import pprint
+from time import perf_counter
 from typing import Tuple
 
+from base.animation import Animator
+from base.broadphase import AUTO, choose
+from base.chunks import ChunkManager
+from base.collision_matrix import EDGE, LVL_WALL, PLATFORM
 from base.engine import PhysicsEngine
+from base.level_cache import LAYER_OPTIONS, CompiledMap, get_layer_names, get_paths, get_sprite_lists, load_scene
+from base.lod import PhysicsLOD
+from base.prefetch import LevelPrefetcher, get_map_path
+from base.tile_renderer import TileMapRenderer
 from entities.sprites import PlayerSprite
 from misc.sound_player import SoundPlayer
 from entities.fruit import FruitList
 from entities.coin import CoinList
 from entities.heart import HeartList
 from misc.timer import SimpleTimer
+from misc.texture_registry import TextureRegistry
 from entities.minimap import MiniMap
 from misc.config import AppConfig
 from views.game_over_view import GameOverView
@@ -19,18 +29,10 @@ from arcade import SpriteList, TileMap, Scene
 app_config = AppConfig()
 logger = logging.getLogger(__name__)
 
-LAYER_OPTIONS = {
-    "Platforms": {
-        "use_spatial_hash": True
-    },
-    "Water": {
-        "use_spatial_hash": True
-    }
-}
 
 
 class Level:
-    def __init__(self, window: arcade.Window, main_menu, game_view):
+    def __init__(self, window: arcade.Window, main_menu, game_view, sound_player: "SoundPlayer | None" = None):
 
         self.window = window
         self.main_menu_view = main_menu
@@ -63,11 +65,29 @@ class Level:
         self.physics_engine: PhysicsEngine | None = None
 
         self.music_is_playing: bool = False
-        self.sound_player: SoundPlayer = SoundPlayer()
+        self.sound_player: SoundPlayer = sound_player or SoundPlayer()
 
         self.scene: arcade.Scene | None = None
+        # Sprite lists of the scene by name, in draw order
+        self.layers: dict[str, SpriteList] = {}
+        self.tile_map: TileMap | CompiledMap | None = None
+        # Named polylines of the map the moving platforms follow
+        self.paths: dict = {}
         self.end_of_map = None
 
+        # Owner of the map textures is the tile map they were loaded for
+        self.texture_registry: TextureRegistry = TextureRegistry()
+
+        # Shader based drawing of static tile layers
+        self.tile_renderer: TileMapRenderer | None = None
+
+        # Chunks of the level live around the camera
+        self.chunks: ChunkManager | None = None
+        self.physics_lod: PhysicsLOD | None = None
+
+        # Bumped whenever a layer goes away or changes, so cached renders of the map know to redo it
+        self.layers_version: int = 0
+
         # Score
         self.score: int = 0
 
@@ -102,6 +122,9 @@ class Level:
 
         self.heart_list: HeartList | None = None
 
+        # Clips of the level are played by its game time
+        self.animator: Animator | None = None
+
         self.lvl: int = app_config.BASE_LVL
         self.level_text: str | None = None
 
@@ -114,21 +137,42 @@ class Level:
 
         self.timer: SimpleTimer | None = None
         self.timer_text: arcade.Text
+        # The tile shader needs a GL context and the timer runs on the wall clock, headless levels use neither
+        self.gpu_tilemap: bool = True
+        self.wall_clock: bool = True
+
+        # Background loading of the next level
+        self.prefetcher: LevelPrefetcher = LevelPrefetcher()
+        self.prefetch_requested: bool = False
 
     def setup(self):
         logger.debug(f"enter Level method setup")
+        setup_start = perf_counter()
 
-        self.player_list = arcade.SpriteList()
-
-        map_path = f":data:/maps/map_{self.lvl}.tmx"
+        map_path = get_map_path(self.lvl)
 
         logger.info(f"map_path: {map_path}")
 
-        tile_map: TileMap = arcade.load_tilemap(
-            map_path,
-            scaling=app_config.SPRITE_SCALING_TILES,
-            layer_options=LAYER_OPTIONS
-        )
+        tile_map: TileMap | CompiledMap
+        prepared = self.prefetcher.take(self.lvl)
+        if prepared is not None:
+            prepared.initialize()
+            tile_map, scene = prepared.tile_map, prepared.scene
+        else:
+            tile_map, scene = load_scene(map_path, app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS)
+
+        self.build(tile_map, scene)
+
+        if not self.sound_player.is_playing:
+            self.sound_player.play_music()
+
+        self.prefetch_requested = False
+        self.prefetcher.record_transition(perf_counter() - setup_start)
+        logger.info(f"textures: {self.texture_registry.stats}")
+
+    def build(self, tile_map: TileMap | CompiledMap, scene: Scene):
+        """Set the level up from the loaded map and its scene"""
+        self.player_list = arcade.SpriteList()
 
         self.ui_text_color = tile_map.properties["text_color"]
 
@@ -137,7 +181,7 @@ class Level:
         self.end_of_map = (tile_map.width * tile_map.tile_width) * tile_map.scaling
 
         # Pull the sprite layers out of the tile map
-        self.scene: Scene = arcade.Scene.from_tilemap(tile_map)
+        self.scene: Scene = scene
 
         logger.debug(f"scene: {self.scene.__dict__}")
 
@@ -161,30 +205,93 @@ class Level:
         self.player_list.append(self.player_sprite)
         self.scene.add_sprite_list_before("Player", "Foreground")
         self.scene.add_sprite("Player", self.player_sprite)
+        names = get_layer_names(tile_map)
+        names.insert(names.index("Foreground"), "Player")
+        self.layers = get_sprite_lists(self.scene, names)
+
+        self.tile_renderer = None
+        if app_config.GPU_TILEMAP and self.gpu_tilemap and isinstance(tile_map, CompiledMap):
+            self.tile_renderer = TileMapRenderer(tile_map, self.scene, app_config.STATIC_LAYERS)
 
         self.lvl_wall_list = self.scene["Lvl Wall"]
+        self.paths = get_paths(tile_map)
         self.setup_engine()
 
         self.timer = SimpleTimer()
         self.timer.start()
         self.timer.set_seconds(tile_map.properties["seconds"])
 
-        self.coin_list = CoinList(self.scene["Coins"])
+        self.animator = Animator()
+        self.coin_list = CoinList(self.scene["Coins"], self.get_active("Coins"), self.animator)
         self.coin_total = len(self.coin_list.obj)
         self.coin_count = 0
-        self.fruit_list = FruitList(self.scene["Fruits"])
+        self.fruit_list = FruitList(self.scene["Fruits"], self.get_active("Fruits"))
         self.fruit_total = len(self.fruit_list.obj)
         self.fruit_count = 0
-        self.heart_list = HeartList(self.scene["Hearts"])
+        self.heart_list = HeartList(self.scene["Hearts"], self.get_active("Hearts"))
+        for gatherable in (self.coin_list, self.fruit_list, self.heart_list):
+            self.physics_engine.add_collectibles(gatherable.obj, gatherable.collision_type)
+            if self.chunks is not None:
+                self.chunks.add_sensors(gatherable.obj)
+        self.setup_broadphase(tile_map.properties.get("broadphase", app_config.PHYSICS_BROADPHASE))
 
         self.reset_score = True
 
-        if not self.sound_player.is_playing:
-            self.sound_player.play_music()
+        # Textures shared with the previous map were picked up again above
+        if self.tile_map is not tile_map:
+            self.release_textures()
+        self.tile_map = tile_map
+
+    def release_textures(self):
+        if self.tile_map is not None:
+            self.texture_registry.release(self.tile_map)
 
     def player_spawn(self):
         pass
 
+    def draw(self):
+        for sprite_list in self.layers.values():
+            self.draw_layer(sprite_list)
+
+    def draw_layer(self, sprite_list: SpriteList):
+        if self.tile_renderer is not None and self.tile_renderer.draw_sprite_list(sprite_list):
+            return
+        if self.chunks is not None:
+            self.chunks.draw_sprite_list(sprite_list)
+        else:
+            sprite_list.draw()
+
+    def get_active(self, name: str) -> SpriteList:
+        """Part of the layer that is live now"""
+        if self.chunks is None:
+            return self.scene[name]
+        return self.chunks.get_active(self.scene[name])
+
+    def update_chunks(self, center: tuple[float, float]):
+        """Live chunks and physics level of detail around the camera"""
+        view_size = (app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT)
+        if self.chunks is not None:
+            activations = self.chunks.activations
+            self.chunks.update(center, view_size)
+            # Coins of chunks that became active are still on the frame they left with
+            if self.chunks.activations != activations:
+                self.animator.refresh()
+        if self.physics_lod is not None:
+            self.physics_lod.update(center, view_size)
+
+    def get_static_layers(self) -> dict[str, tuple[float, str, str]]:
+        """
+        Static collision layers, their friction, collision type (the surface the player
+        stands on) and collision category
+        """
+        return {
+            "Platforms": (app_config.WALL_FRICTION, "wall", PLATFORM),
+            "Ice": (app_config.ICE_FRICTION, "ice", PLATFORM),
+            "Sand": (app_config.SAND_FRICTION, "sand", PLATFORM),
+            "Edge": (app_config.WALL_FRICTION, "wall", EDGE),
+            "Lvl Wall": (app_config.WALL_FRICTION, "wall", LVL_WALL),
+        }
+
     def setup_engine(self):
         # Pymunk Physics Engine Setup
         damping = app_config.DEFAULT_DUMPING
@@ -192,26 +299,81 @@ class Level:
 
         self.physics_engine = PhysicsEngine(
             damping=damping,
-            gravity=gravity
+            gravity=gravity,
+            sound_player=self.sound_player
         )
 
         self.physics_engine.add_player(
             self.player_sprite
         )
 
+        if not app_config.CHUNKS:
+            self.add_static_layers()
+
+        self.physics_engine.add_items(
+            self.scene["Dynamic Items"],
+        )
+
+        self.physics_engine.add_moving_sprites(
+            self.scene["Moving Sprites"],
+            self.paths,
+            app_config.SPRITE_SCALING_TILES
+        )
+
+        self.chunks = None
+        if app_config.CHUNKS:
+            # Static layers get into the space chunk by chunk
+            self.chunks = ChunkManager(
+                self.layers.values(),
+                self.physics_engine,
+                {self.scene[name]: layer for name, layer in self.get_static_layers().items() if name in self.scene},
+                [self.scene["Dynamic Items"], self.scene["Moving Sprites"]],
+                [self.scene["Player"], *(self.tile_renderer.layers if self.tile_renderer else ())],
+                (self.map_width, self.map_height),
+                app_config.CHUNK_SIZE * app_config.SPRITE_SIZE,
+                app_config.CHUNK_RADIUS
+            )
+
+        self.physics_lod = None
+        if app_config.PHYSICS_LOD_DISTANCE:
+            self.physics_lod = PhysicsLOD(
+                self.physics_engine,
+                self.scene["Dynamic Items"],
+                app_config.PHYSICS_LOD_DISTANCE * app_config.SPRITE_SIZE,
+                app_config.PHYSICS_LOD_INTERVAL
+            )
+
+    def setup_broadphase(self, broadphase: str):
+        """Tree or spatial hash for the space, auto measures both on all shapes of the level"""
+        engine = self.physics_engine
+        shapes = list(engine.space.shapes)
+        if self.chunks is not None:
+            shapes.extend(self.chunks.get_inactive_shapes())
+        if broadphase == AUTO:
+            broadphase = choose(
+                self.lvl,
+                shapes,
+                engine.space.gravity,
+                engine.space.damping,
+                app_config.SPRITE_SIZE,
+                1 / app_config.PHYSICS_TICK_RATE
+            )
+        engine.use_broadphase(broadphase, app_config.SPRITE_SIZE, len(shapes))
+
+    def add_static_layers(self):
         self.physics_engine.add_platforms(
             self.scene["Platforms"],
         )
 
         if "Ice" in self.scene:
             self.physics_engine.add_platforms(
-                self.scene["Ice"], friction=app_config.ICE_FRICTION
+                self.scene["Ice"], friction=app_config.ICE_FRICTION, collision_type="ice"
             )
             logger.debug(f"Ice platforms added. ICE_FRICTION={app_config.ICE_FRICTION}")
 
         if "Sand" in self.scene:
             self.physics_engine.add_platforms(
-                self.scene["Sand"], friction=app_config.SAND_FRICTION
+                self.scene["Sand"], friction=app_config.SAND_FRICTION, collision_type="sand"
             )
             logger.debug(f"Sand platforms added. SAND_FRICTION={app_config.SAND_FRICTION}")
 
@@ -223,13 +385,31 @@ class Level:
             self.scene["Lvl Wall"]
         )
 
-        self.physics_engine.add_items(
-            self.scene["Dynamic Items"],
-        )
+    def collect_pickups(self):
+        """Collectibles the player touched during the last physics step"""
+        touching = self.physics_engine.touching
+        picked = []
 
-        self.physics_engine.add_moving_sprites(
-            self.scene["Moving Sprites"],
-        )
+        coins = list(touching[self.coin_list.collision_type])
+        delta_coin_score, need_coin_to_find, delta_coin_count = self.coin_list.collect(coins)
+        self.score += delta_coin_score
+        self.coin_count += delta_coin_count
+        picked += coins
+
+        fruits = list(touching[self.fruit_list.collision_type])
+        delta_fruit_score, need_fruit_to_find, delta_fruit_count = self.fruit_list.collect(fruits)
+        self.score += delta_fruit_score
+        self.fruit_count += delta_fruit_count
+        picked += fruits
+
+        # Hearts stay where they are while the player has all the lives
+        if self.life_points < self.max_life_points:
+            hearts = list(touching[self.heart_list.collision_type])
+            _, _, delta_life_points = self.heart_list.collect(hearts)
+            self.life_points += delta_life_points
+            picked += hearts
+
+        self.physics_engine.remove_collectibles(picked)
 
     def _game_over(self):
         view = GameOverView(self.main_menu_view)
@@ -238,7 +418,7 @@ class Level:
         self.window.show_view(view)
 
     def update(self, delta_time):
-        if app_config.TIMER_ON and not self.timer.timer_on:
+        if self.wall_clock and app_config.TIMER_ON and not self.timer.timer_on:
             self.timer.start()
 
         if self.player_sprite.center_y < 16:
@@ -246,37 +426,36 @@ class Level:
             if self.life_points <= 0:
                 self._game_over()
             self.life_points -= 1
-            self.physics_engine.remove_sprite(self.player_sprite)
             self.player_sprite.move_to_default_location(self.player_default_position)
-            self.physics_engine.add_player(self.player_sprite)
+            self.physics_engine.reset_body(self.player_sprite)
 
-        if self.timer.is_up():
+        if self.wall_clock and self.timer.is_up():
             self._game_over()
 
+        if not self.prefetch_requested and \
+                self.player_sprite.center_x >= self.end_of_map * app_config.LEVEL_PREFETCH_AT:
+            self.prefetcher.request(self.lvl + 1)
+            self.prefetch_requested = True
+
         if self.player_sprite.center_x >= self.end_of_map:
             self.lvl += 1
             self.game_view.setup()
 
-        delta_coin_score, need_coin_to_find, delta_coin_count = self.coin_list.remove_touched(self.player_sprite)
-        self.score += delta_coin_score
-        self.coin_count += delta_coin_count
-
-        delta_fruit_score, need_fruit_to_find, delta_fruit_count = self.fruit_list.remove_touched(self.player_sprite)
-        self.score += delta_fruit_score
-        self.fruit_count += delta_fruit_count
-
-        if self.life_points < self.max_life_points:
-            _, _, delta_life_points = self.heart_list.remove_touched(self.player_sprite)
-            if self.life_points < self.max_life_points:
-                self.life_points += delta_life_points
+        self.collect_pickups()
 
-        self.coin_list.check_or_update_pic()
+        self.animator.update(delta_time)
+        self.player_sprite.update_animation(delta_time)
 
         if "Lvl Wall" in self.scene and self.fruit_count >= self.fruit_total and len(self.lvl_wall_list.sprite_list) > 0:
             logger.debug(f"{pprint.pprint(self.scene.__dict__)}")
             logger.info("Lvl Wall removed !")
-            for _ in range(len(self.lvl_wall_list.sprite_list)):
-                self.physics_engine.remove_sprite(self.lvl_wall_list.sprite_list.pop())
+            if self.chunks is not None:
+                self.chunks.remove_layer(self.lvl_wall_list)
+            else:
+                self.physics_engine.remove_lvl_walls()
+            self.lvl_wall_list.clear()
             self.scene.remove_sprite_list_by_object(self.lvl_wall_list)
+            del self.layers["Lvl Wall"]
+            self.layers_version += 1
             logger.debug(f"{pprint.pprint(self.scene.__dict__)}")
             self.scene.update(delta_time)
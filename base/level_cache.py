@@ -0,0 +1,600 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any
+from xml.etree import ElementTree
+
+import numpy as np
+
+from misc import asset_pack
+from misc.config import AppConfig
+from misc.texture_registry import TextureRegistry
+
+import arcade
+from arcade import Scene, SpriteList, Sprite, TileMap
+from arcade.math import rotate_point
+from arcade.types import Color
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+
+FLIPPED_HORIZONTALLY_FLAG = 0x80000000
+FLIPPED_VERTICALLY_FLAG = 0x40000000
+FLIPPED_DIAGONALLY_FLAG = 0x20000000
+GID_MASK = 0x1FFFFFFF
+
+# Object record columns: gid, x, y, width, height, rotation
+OBJECT_FIELDS = 6
+
+LAYER_OPTIONS = {
+    "Platforms": {
+        "use_spatial_hash": True
+    },
+    "Water": {
+        "use_spatial_hash": True
+    }
+}
+
+
+class CompiledMap:
+    """
+    Compact, pre-decoded representation of a Tiled map.
+
+    Tile layers are stored as numpy gid grids, object layers as numpy records plus
+    a JSON list with object properties. The instance mimics the attributes of
+    arcade.TileMap that Level relies on (width, height, tile_width, tile_height,
+    scaling, properties).
+    """
+    def __init__(
+            self,
+            meta: dict[str, Any],
+            arrays: dict[str, np.ndarray],
+            map_dir: Path
+    ):
+        self.meta = meta
+        self.arrays = arrays
+        self.map_dir = map_dir
+
+        self.width: int = meta["width"]
+        self.height: int = meta["height"]
+        self.tile_width: int = meta["tile_width"]
+        self.tile_height: int = meta["tile_height"]
+        self.scaling: float = 1.0
+        self.properties: dict[str, Any] = convert_properties(meta["properties"])
+
+    @property
+    def layers(self) -> list[dict[str, Any]]:
+        return self.meta["layers"]
+
+    def layer_array(self, index: int) -> np.ndarray:
+        return self.arrays[f"layer_{index}"]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file of its own, the prefetch worker and the main thread may compile the same map at once
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp", delete=False) as file:
+            tmp_path = file.name
+            try:
+                np.savez_compressed(
+                    file,
+                    meta=np.frombuffer(json.dumps(self.meta).encode("utf-8"), dtype=np.uint8),
+                    **self.arrays
+                )
+            except BaseException:
+                file.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, map_dir: Path) -> "CompiledMap":
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            arrays = {key: data[key] for key in data.files if key != "meta"}
+        return cls(meta, arrays, map_dir)
+
+
+def parse_color(value: str) -> tuple[int, int, int, int]:
+    """Tiled color (#RRGGBB or #AARRGGBB) to RGBA tuple"""
+    value = value.lstrip("#")
+    if len(value) == 6:
+        return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16), 255
+    return int(value[2:4], 16), int(value[4:6], 16), int(value[6:8], 16), int(value[0:2], 16)
+
+
+def read_properties(element: ElementTree.Element | None) -> list[list[str]]:
+    """Raw [name, type, value] triples, converted on load by convert_properties"""
+    if element is None:
+        return []
+    properties = element.find("properties")
+    if properties is None:
+        return []
+    return [
+        [prop.get("name"), prop.get("type", "string"), prop.get("value", prop.text or "")]
+        for prop in properties.findall("property")
+    ]
+
+
+def convert_properties(raw: list[list[str]]) -> dict[str, Any]:
+    result = {}
+    for name, prop_type, value in raw:
+        if prop_type == "int":
+            result[name] = int(value)
+        elif prop_type == "float":
+            result[name] = float(value)
+        elif prop_type == "bool":
+            result[name] = value == "true"
+        elif prop_type == "color":
+            result[name] = Color(*parse_color(value))
+        else:
+            result[name] = value
+    return result
+
+
+def decode_layer_data(data: ElementTree.Element, width: int, height: int) -> np.ndarray:
+    encoding = data.get("encoding")
+    compression = data.get("compression")
+    if encoding == "csv":
+        gids = np.array([int(v) for v in data.text.replace("\n", "").split(",") if v.strip()], dtype=np.uint32)
+    elif encoding == "base64":
+        raw = base64.b64decode(data.text.strip())
+        if compression == "zlib" or compression == "gzip":
+            raw = zlib.decompress(raw, zlib.MAX_WBITS | 32)
+        elif compression:
+            raise ValueError(f"unsupported layer compression: {compression}")
+        gids = np.frombuffer(raw, dtype="<u4").astype(np.uint32)
+    else:
+        raise ValueError(f"unsupported layer encoding: {encoding}")
+    return gids.reshape(height, width)
+
+
+def read_tileset(element: ElementTree.Element, map_dir: Path) -> tuple[dict[str, Any], Path | None]:
+    tileset = {"firstgid": int(element.get("firstgid"))}
+    source_path = None
+    source = element.get("source")
+    if source is not None:
+        source_path = asset_pack.resolve(map_dir / source)
+        element = ElementTree.parse(asset_pack.open_binary(source_path)).getroot()
+        base_dir = source_path.parent
+    else:
+        base_dir = map_dir
+
+    tileset["tile_width"] = int(element.get("tilewidth"))
+    tileset["tile_height"] = int(element.get("tileheight"))
+    tileset["tile_count"] = int(element.get("tilecount", 0))
+    tileset["columns"] = int(element.get("columns", 0))
+    tileset["margin"] = int(element.get("margin", 0))
+    tileset["spacing"] = int(element.get("spacing", 0))
+
+    image = element.find("image")
+    tileset["image"] = os.path.relpath(base_dir / image.get("source"), map_dir) if image is not None else None
+
+    tiles = {}
+    for tile in element.findall("tile"):
+        tile_info: dict[str, Any] = {"properties": read_properties(tile)}
+        tile_image = tile.find("image")
+        if tile_image is not None:
+            tile_info["image"] = os.path.relpath(base_dir / tile_image.get("source"), map_dir)
+            tile_info["width"] = int(tile_image.get("width"))
+            tile_info["height"] = int(tile_image.get("height"))
+        tiles[tile.get("id")] = tile_info
+    tileset["tiles"] = tiles
+
+    return tileset, source_path
+
+
+def compile_map(map_file: Path) -> tuple[CompiledMap, list[Path]]:
+    """
+    Parse a .tmx map and referenced .tsx tilesets into CompiledMap.
+    Returns the compiled map and the list of source files it depends on.
+    """
+    map_dir = map_file.parent
+    root = ElementTree.parse(asset_pack.open_binary(map_file)).getroot()
+
+    if root.get("infinite") == "1":
+        raise ValueError(f"infinite maps are not supported: {map_file}")
+
+    width = int(root.get("width"))
+    height = int(root.get("height"))
+
+    sources = [map_file]
+    tilesets = []
+    for element in root.findall("tileset"):
+        tileset, source_path = read_tileset(element, map_dir)
+        tilesets.append(tileset)
+        if source_path is not None:
+            sources.append(source_path)
+
+    layers = []
+    arrays = {}
+    # Named polylines and polygons of object layers, moving platforms follow them
+    paths = {}
+
+    def walk(parent: ElementTree.Element):
+        for element in parent:
+            if element.tag not in ("layer", "objectgroup", "group"):
+                continue
+            if element.tag == "group":
+                walk(element)
+                continue
+            layer = {
+                "name": element.get("name"),
+                "visible": element.get("visible", "1") != "0",
+                "opacity": float(element.get("opacity", 1)),
+                "tint_color": parse_color(element.get("tintcolor")) if element.get("tintcolor") else None,
+                "properties": read_properties(element),
+            }
+            index = len(layers)
+            if element.tag == "layer":
+                layer["kind"] = "tile"
+                arrays[f"layer_{index}"] = decode_layer_data(element.find("data"), width, height)
+            else:
+                layer["kind"] = "object"
+                records = []
+                objects = []
+                for obj in element.findall("object"):
+                    if obj.get("gid") is None:
+                        read_path(obj, paths)
+                        continue
+                    records.append((
+                        int(obj.get("gid")),
+                        float(obj.get("x", 0)),
+                        float(obj.get("y", 0)),
+                        float(obj.get("width", 0)),
+                        float(obj.get("height", 0)),
+                        float(obj.get("rotation", 0)),
+                    ))
+                    objects.append({
+                        "name": obj.get("name"),
+                        "class": obj.get("type") or obj.get("class"),
+                        "properties": read_properties(obj),
+                    })
+                layer["objects"] = objects
+                arrays[f"layer_{index}"] = np.array(records, dtype=np.float64).reshape(-1, OBJECT_FIELDS)
+            layers.append(layer)
+
+    walk(root)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "width": width,
+        "height": height,
+        "tile_width": int(root.get("tilewidth")),
+        "tile_height": int(root.get("tileheight")),
+        "properties": read_properties(root),
+        "tilesets": tilesets,
+        "layers": layers,
+        "paths": paths,
+    }
+
+    return CompiledMap(meta, arrays, map_dir), sources
+
+
+def read_path(obj: ElementTree.Element, paths: dict[str, dict[str, Any]]) -> None:
+    """Points of a named polyline or polygon object in map pixels, y down as in Tiled"""
+    for tag, closed in (("polyline", False), ("polygon", True)):
+        shape = obj.find(tag)
+        if shape is None or not obj.get("name"):
+            continue
+        x, y = float(obj.get("x", 0)), float(obj.get("y", 0))
+        points = [[x + float(px), y + float(py)] for px, py in (point.split(",") for point in shape.get("points").split())]
+        paths[obj.get("name")] = {"points": points, "closed": closed}
+
+
+def get_paths(tile_map: TileMap | CompiledMap) -> dict[str, tuple[np.ndarray, bool]]:
+    """
+    Named polylines and polygons of the map in world coordinates: (points, closed).
+    arcade.TileMap keeps no shape type, its paths are all open.
+    """
+    scaling = tile_map.scaling
+    map_height_px = tile_map.height * tile_map.tile_height
+    if isinstance(tile_map, CompiledMap):
+        paths = {}
+        for name, path in tile_map.meta["paths"].items():
+            points = np.array(path["points"], dtype=np.float64)
+            points[:, 1] = map_height_px - points[:, 1]
+            paths[name] = (points * scaling, path["closed"])
+        return paths
+
+    return {
+        obj.name: (np.array(obj.shape, dtype=np.float64) * scaling, False)
+        for objects in tile_map.object_lists.values() for obj in objects
+        if obj.name and isinstance(obj.shape, list) and len(obj.shape) > 1
+    }
+
+
+def get_stamp(sources: list[Path], map_dir: Path) -> list[list]:
+    return [
+        [os.path.relpath(path, map_dir), *asset_pack.stat(path)]
+        for path in sources
+    ]
+
+
+def get_hash(sources: list[Path]) -> str:
+    sha = hashlib.sha1()
+    for path in sources:
+        sha.update(asset_pack.read_bytes(path))
+    return sha.hexdigest()
+
+
+def get_cache_path(map_file: Path) -> Path:
+    return Path(app_config.LEVEL_CACHE_DIR) / f"{map_file.stem}.npz"
+
+
+def load_compiled_map(map_path: str | Path) -> CompiledMap:
+    """
+    Return CompiledMap for map_path from the cache, recompiling it when any
+    source file (tmx or tsx) changed. Sources are checked by mtime and size
+    first, the content hash is only computed when the stamps differ.
+    """
+    map_file = asset_pack.resolve(map_path)
+    cache_path = get_cache_path(map_file)
+
+    if cache_path.exists():
+        try:
+            compiled = CompiledMap.load(cache_path, map_file.parent)
+            cache = compiled.meta.get("cache", {})
+            sources = [map_file.parent / stamp[0] for stamp in cache.get("stamp", [])]
+            if compiled.meta.get("version") == CACHE_VERSION and sources and all(asset_pack.exists(path) for path in sources):
+                stamp = get_stamp(sources, map_file.parent)
+                if stamp == cache["stamp"]:
+                    return compiled
+                if get_hash(sources) == cache["hash"]:
+                    cache["stamp"] = stamp
+                    compiled.save(cache_path)
+                    return compiled
+        except Exception as e:
+            logger.warning(f"level cache {cache_path} is broken: {e}")
+
+    logger.info(f"compiling {map_file} -> {cache_path}")
+    compiled, sources = compile_map(map_file)
+    compiled.meta["cache"] = {"stamp": get_stamp(sources, map_file.parent), "hash": get_hash(sources)}
+    try:
+        compiled.save(cache_path)
+    except OSError as e:
+        logger.warning(f"can't write level cache {cache_path}: {e}")
+    return compiled
+
+
+class TextureLookup:
+    """
+    gid -> arcade.Texture resolver over the compiled tilesets.
+    Textures come from TextureRegistry and are held by the compiled map.
+    """
+    def __init__(self, compiled: CompiledMap):
+        self.compiled = compiled
+        self.registry = TextureRegistry()
+        self.tilesets = sorted(compiled.meta["tilesets"], key=lambda t: t["firstgid"], reverse=True)
+        self.textures: dict[int, arcade.Texture] = {}
+
+    def find(self, gid: int) -> tuple[dict[str, Any], int]:
+        for tileset in self.tilesets:
+            if gid >= tileset["firstgid"]:
+                return tileset, gid - tileset["firstgid"]
+        raise ValueError(f"tile with gid not found: {gid}")
+
+    def get_tile_properties(self, gid: int) -> dict[str, Any]:
+        tileset, tile_id = self.find(gid & GID_MASK)
+        tile = tileset["tiles"].get(str(tile_id))
+        properties = convert_properties(tile["properties"]) if tile else {}
+        properties["tile_id"] = tile_id
+        return properties
+
+    def get_texture(self, gid: int) -> arcade.Texture:
+        texture = self.textures.get(gid)
+        if texture is not None:
+            return texture
+
+        # Same order arcade applies the flags in
+        transforms = tuple(
+            name for flag, name in (
+                (FLIPPED_DIAGONALLY_FLAG, "flip_diagonally"),
+                (FLIPPED_HORIZONTALLY_FLAG, "flip_horizontally"),
+                (FLIPPED_VERTICALLY_FLAG, "flip_vertically"),
+            ) if gid & flag
+        )
+
+        tileset, tile_id = self.find(gid & GID_MASK)
+        tile = tileset["tiles"].get(str(tile_id))
+        if tile and "image" in tile:
+            texture = self.registry.get(
+                self.compiled.map_dir / tile["image"],
+                self.compiled,
+                transforms=transforms
+            )
+        else:
+            row, col = divmod(tile_id, tileset["columns"])
+            texture = self.registry.get(
+                self.compiled.map_dir / tileset["image"],
+                self.compiled,
+                region=(
+                    tileset["margin"] + col * (tileset["tile_width"] + tileset["spacing"]),
+                    tileset["margin"] + row * (tileset["tile_height"] + tileset["spacing"]),
+                    tileset["tile_width"],
+                    tileset["tile_height"],
+                ),
+                transforms=transforms
+            )
+
+        self.textures[gid] = texture
+        return texture
+
+
+def get_layer_color(layer: dict[str, Any]) -> Color | None:
+    """Tint and opacity of the layer as one sprite color, None when the sprite default fits"""
+    if not layer["tint_color"] and layer["opacity"] == 1:
+        return None
+    r, g, b, a = layer["tint_color"] or (255, 255, 255, 255)
+    # A layer of opacity 0 is invisible
+    return Color(r, g, b, int(a * layer["opacity"]))
+
+
+def build_tile_layer(
+        compiled: CompiledMap,
+        index: int,
+        lookup: TextureLookup,
+        scaling: float,
+        use_spatial_hash: bool,
+        lazy: bool = False
+) -> SpriteList:
+    layer = compiled.layers[index]
+    grid = compiled.layer_array(index)
+    sprite_list = SpriteList(use_spatial_hash=use_spatial_hash, lazy=lazy)
+    color = get_layer_color(layer)
+
+    rows, cols = np.nonzero(grid)
+    gids = grid[rows, cols].tolist()
+    left = (cols * (compiled.tile_width * scaling)).tolist()
+    bottom = ((compiled.height - rows - 1) * (compiled.tile_height * scaling)).tolist()
+    properties_cache: dict[int, dict[str, Any]] = {}
+
+    for gid, x, y in zip(gids, left, bottom):
+        texture = lookup.get_texture(gid)
+        sprite = Sprite(
+            texture,
+            scale=scaling,
+            center_x=x + texture.width * scaling / 2,
+            center_y=y + texture.height * scaling / 2
+        )
+        if gid not in properties_cache:
+            properties_cache[gid] = lookup.get_tile_properties(gid)
+        sprite.properties.update(properties_cache[gid])
+        if color is not None:
+            sprite.color = color
+        sprite_list.append(sprite)
+
+    sprite_list.visible = layer["visible"]
+    if layer["properties"]:
+        sprite_list.properties = convert_properties(layer["properties"])
+    return sprite_list
+
+
+def build_object_layer(
+        compiled: CompiledMap,
+        index: int,
+        lookup: TextureLookup,
+        scaling: float,
+        use_spatial_hash: bool,
+        lazy: bool = False
+) -> SpriteList | None:
+    layer = compiled.layers[index]
+    records = compiled.layer_array(index)
+    if not len(records):
+        return None
+
+    sprite_list = SpriteList(use_spatial_hash=use_spatial_hash, lazy=lazy)
+    color = get_layer_color(layer)
+    map_height_px = compiled.height * compiled.tile_height
+
+    for record, obj in zip(records.tolist(), layer["objects"]):
+        gid, x, y, width, height, rotation = record
+        gid = int(gid)
+        sprite = Sprite(lookup.get_texture(gid), scale=scaling)
+        sprite.properties.update(lookup.get_tile_properties(gid))
+
+        x = x * scaling
+        y = (map_height_px - y) * scaling
+        sprite.width = width = width * scaling
+        sprite.height = height = height * scaling
+        angle = rotation or 0
+        rotated_x, rotated_y = rotate_point(width / 2, height / 2, 0, 0, angle)
+        sprite.position = (x + rotated_x, y + rotated_y)
+        sprite.angle = angle
+        if color is not None:
+            sprite.color = color
+
+        properties = convert_properties(obj["properties"])
+        for name in ("change_x", "change_y", "boundary_bottom", "boundary_top", "boundary_left", "boundary_right"):
+            if name in properties:
+                setattr(sprite, name, float(properties[name]))
+        sprite.properties.update(properties)
+        if obj["class"]:
+            sprite.properties["class"] = obj["class"]
+        if obj["name"]:
+            sprite.properties["name"] = obj["name"]
+
+        sprite_list.append(sprite)
+
+    sprite_list.visible = layer["visible"]
+    return sprite_list
+
+
+def build_scene(
+        compiled: CompiledMap,
+        scaling: float,
+        layer_options: dict[str, dict[str, Any]] | None = None,
+        lazy: bool = False
+) -> Scene:
+    """
+    Build arcade.Scene from CompiledMap the same way arcade.Scene.from_tilemap does.
+    With lazy=True no OpenGL resources are created, so it is safe to call off the main thread.
+    """
+    if layer_options is None:
+        layer_options = {}
+
+    compiled.scaling = scaling
+    lookup = TextureLookup(compiled)
+    scene = Scene()
+
+    for index, layer in enumerate(compiled.layers):
+        if layer["name"] in scene:
+            raise AttributeError(f"duplicate layer name '{layer['name']}'")
+        use_spatial_hash = layer_options.get(layer["name"], {}).get("use_spatial_hash", False)
+        if layer["kind"] == "tile":
+            sprite_list = build_tile_layer(compiled, index, lookup, scaling, use_spatial_hash, lazy)
+        else:
+            sprite_list = build_object_layer(compiled, index, lookup, scaling, use_spatial_hash, lazy)
+        if sprite_list is not None:
+            scene.add_sprite_list(layer["name"], sprite_list=sprite_list)
+
+    return scene
+
+
+def get_layer_names(tile_map: TileMap | CompiledMap) -> list[str]:
+    """Names of the layers the scene of the map is built from, in draw order"""
+    if isinstance(tile_map, CompiledMap):
+        return [layer["name"] for layer in tile_map.layers]
+    return list(tile_map.sprite_lists)
+
+
+def get_sprite_lists(scene: Scene, names: list[str]) -> dict[str, SpriteList]:
+    """Sprite lists of the scene by name in the order of names, arcade.Scene has no public way to list them"""
+    return {name: scene.get_sprite_list(name) for name in names if name in scene}
+
+
+def load_scene(
+        map_path: str | Path,
+        scaling: float,
+        layer_options: dict[str, dict[str, Any]] | None = None,
+        lazy: bool = False
+) -> tuple[TileMap | CompiledMap, Scene]:
+    """Load map and its scene through the level cache, or with arcade.load_tilemap when LEVEL_CACHE is off"""
+    if app_config.LEVEL_CACHE:
+        tile_map = load_compiled_map(map_path)
+        return tile_map, build_scene(tile_map, scaling, layer_options, lazy)
+
+    tile_map = arcade.load_tilemap(
+        map_path,
+        scaling=scaling,
+        layer_options=layer_options,
+        lazy=lazy
+    )
+    return tile_map, Scene.from_tilemap(tile_map)
+
+
+def compile_all(maps_dir: str = ":data:/maps") -> None:
+    for map_file in sorted(asset_pack.resolve(maps_dir).glob("map_*.tmx")):
+        load_compiled_map(map_file)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arcade.resources.add_resource_handle("data", f"{os.getcwd()}/data")
+    compile_all()
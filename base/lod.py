@@ -0,0 +1,54 @@
+from typing import Iterable
+
+import numpy as np
+import pymunk
+from arcade import Sprite
+
+from base.engine import PhysicsEngine
+
+
+class PhysicsLOD:
+    """
+    Level of detail of the physics around the view. Every interval ticks the dynamic
+    bodies farther than distance outside the view are put to sleep, they keep their
+    velocities and wake up where they were once they are back in range. Moving
+    platforms that far move coarsely (MovingPlatforms.set_coarse). Bodies frozen by
+    chunks are left alone.
+    """
+    def __init__(self, physics_engine: PhysicsEngine, sprites: Iterable[Sprite], distance: float, interval: int):
+        self.physics_engine = physics_engine
+        self.bodies: list[pymunk.Body] = [physics_engine.sprites[sprite].body for sprite in sprites]
+        self.distance = distance
+        self.interval = interval
+        # Tick of the next check, checks go by ticks so extra updates change nothing
+        self.next_check: int = 0
+        # Bodies this put to sleep, not the ones that fell asleep by themselves
+        self.asleep: set[pymunk.Body] = set()
+
+    def get_far(self, positions: np.ndarray, center: tuple[float, float], view_size: tuple[float, float]) -> np.ndarray:
+        outside_x = np.abs(positions[:, 0] - center[0]) - view_size[0] / 2
+        outside_y = np.abs(positions[:, 1] - center[1]) - view_size[1] / 2
+        return np.maximum(outside_x, outside_y) > self.distance
+
+    def update(self, center: tuple[float, float], view_size: tuple[float, float]) -> None:
+        ticks = self.physics_engine.ticks
+        if ticks < self.next_check:
+            return
+        self.next_check = ticks + self.interval
+
+        if self.bodies:
+            positions = np.array([body.position for body in self.bodies], dtype=np.float64)
+            for body, far in zip(self.bodies, self.get_far(positions, center, view_size).tolist()):
+                if body.space is None:
+                    continue
+                if far:
+                    if not body.is_sleeping:
+                        body.sleep()
+                        self.asleep.add(body)
+                elif body in self.asleep:
+                    self.asleep.discard(body)
+                    body.activate()
+
+        platforms = self.physics_engine.moving_platforms
+        if platforms is not None and len(platforms.sprites):
+            platforms.set_coarse(self.get_far(platforms.position, center, view_size), self.physics_engine.space)
@@ -0,0 +1,388 @@
+import logging
+from bisect import bisect_right
+
+import numpy as np
+import pymunk
+from arcade import Sprite
+
+logger = logging.getLogger(__name__)
+
+PINGPONG = "pingpong"
+LOOP = "loop"
+# Platforms closer to a boundary than this, in pixels, are checked against their sprite
+BOUNDARY_MARGIN = 1.0
+# From this many platforms on they are updated as arrays, below it one by one is faster
+# (python -m benchmarks.movers, the shipped maps have 1 to 10)
+VECTOR_MIN = 40
+
+
+class PathTable:
+    """Arc-length table of a polyline, a looped one ends with its first point again"""
+    def __init__(self, points: np.ndarray, loop: bool):
+        if loop and not np.array_equal(points[0], points[-1]):
+            points = np.vstack([points, points[:1]])
+        self.points = points
+        self.loop = loop
+        self.vectors = np.diff(points, axis=0)
+        self.lengths = np.hypot(self.vectors[:, 0], self.vectors[:, 1])
+        # Distance along the path at the start of every segment, and the whole length at the end
+        self.distances = np.concatenate([[0.0], np.cumsum(self.lengths)])
+        self.length = float(self.distances[-1])
+
+
+class MovingPlatforms:
+    """
+    Kinematic platforms of a level as arrays, updated in one pass after every tick.
+
+    Bouncing platforms move by change_x / change_y a tick and turn around past
+    boundary_left / right / bottom / top (0 -> none), like they always did. Their
+    positions are tracked from the velocities the bodies were given, only the
+    platforms about to cross a boundary are checked against their sprites.
+
+    A platform with a "path" property follows the named polyline of the map:
+    "path_speed" in map pixels a second (change_x / change_y as the distance a
+    tick when missing), "path_offset" where on the path it starts and "path_mode"
+    pingpong or loop (polygons loop by default). The path moves the platform from
+    where it was placed, its position is a function of the level time, so it
+    never drifts and a platform that was frozen is put back where it would be.
+
+    Velocities are written to the bodies only when they change. Below VECTOR_MIN
+    platforms the same update runs one platform at a time, numpy costs more than
+    it saves on a few of them.
+
+    Coarse platforms (far from the view) keep moving in the arrays only, their
+    bodies stand still and are put in place by set_coarse().
+    """
+    def __init__(
+            self,
+            sprites: list[Sprite],
+            bodies: list[pymunk.Body],
+            paths: dict[str, tuple[np.ndarray, bool]],
+            scaling: float,
+            delta_time: float
+    ):
+        self.sprites = sprites
+        self.bodies = bodies
+        self.index: dict[Sprite, int] = {sprite: i for i, sprite in enumerate(sprites)}
+        self.delta_time = delta_time
+        # Level time at the end of the last tick
+        self.time: float = 0.0
+        count = len(sprites)
+
+        self.active = np.ones(count, dtype=bool)
+        self.coarse = np.zeros(count, dtype=bool)
+        self.position = np.array([body.position for body in bodies], dtype=np.float64).reshape(-1, 2)
+        # Velocity each body has now
+        self.velocity = np.array([body.velocity for body in bodies], dtype=np.float64).reshape(-1, 2)
+        # Velocity the platforms move with, the one of the body unless it is coarse
+        self.motion = self.velocity.copy()
+
+        # Bouncing, in pixels a tick
+        self.change = np.array([(sprite.change_x, sprite.change_y) for sprite in sprites], dtype=np.float64).reshape(-1, 2)
+        bounds = np.array([
+            (sprite.boundary_left, sprite.boundary_right, sprite.boundary_bottom, sprite.boundary_top)
+            for sprite in sprites
+        ], dtype=np.float64).reshape(-1, 4)
+        bounds[bounds == 0] = np.nan
+        self.bounds = bounds
+        # From the center to the left, right, bottom and top of the hit box
+        self.extents = np.array([
+            (sprite.center_x - sprite.left, sprite.right - sprite.center_x,
+             sprite.center_y - sprite.bottom, sprite.top - sprite.center_y)
+            for sprite in sprites
+        ], dtype=np.float64).reshape(-1, 4)
+
+        self.on_path = np.zeros(count, dtype=bool)
+        self.setup_paths(paths, scaling)
+        self.bouncing = ~self.on_path
+        self.vectorized = count >= VECTOR_MIN
+        # The constant arrays as lists for the update one platform at a time
+        self.bounds_list = self.bounds.tolist()
+        self.extents_list = self.extents.tolist()
+        self.mover_of: dict[int, int] = {i: mover for mover, i in enumerate(self.path_movers.tolist())}
+
+    def setup_paths(self, paths: dict[str, tuple[np.ndarray, bool]], scaling: float) -> None:
+        tables: dict[str, PathTable] = {}
+        movers = []
+        for i, sprite in enumerate(self.sprites):
+            name = sprite.properties.get("path")
+            if not name:
+                continue
+            if name not in paths:
+                logger.warning(f"moving platform at {sprite.position} follows unknown path '{name}'")
+                continue
+            points, closed = paths[name]
+            loop = sprite.properties.get("path_mode", LOOP if closed else PINGPONG) == LOOP
+            key = f"{name}/{loop}"
+            if key not in tables:
+                tables[key] = PathTable(points, loop)
+            if tables[key].length == 0:
+                continue
+            speed = sprite.properties.get("path_speed")
+            speed = float(speed) * scaling if speed is not None else float(np.hypot(*self.change[i])) / self.delta_time
+            movers.append((i, tables[key], speed, float(sprite.properties.get("path_offset", 0)) * scaling))
+
+        # All tables in one set of segment arrays, every mover knows the range of its own
+        table_list = list({id(table): table for _, table, _, _ in movers}.values())
+        first, base = {}, {}
+        starts, vectors, lengths, distances = [], [], [], []
+        segment, distance = 0, 0.0
+        for table in table_list:
+            first[id(table)], base[id(table)] = segment, distance
+            starts.append(table.points[:-1])
+            vectors.append(table.vectors)
+            lengths.append(table.lengths)
+            distances.append(table.distances[:-1] + distance)
+            segment += len(table.lengths)
+            distance += table.length
+        self.segment_starts = np.concatenate(starts) if starts else np.zeros((0, 2))
+        self.segment_vectors = np.concatenate(vectors) if vectors else np.zeros((0, 2))
+        self.segment_lengths = np.concatenate(lengths) if lengths else np.zeros(0)
+        self.segment_distances = np.concatenate(distances) if distances else np.zeros(0)
+
+        self.path_movers = np.array([i for i, _, _, _ in movers], dtype=np.int64)
+        self.on_path[self.path_movers] = True
+        self.path_first = np.array([first[id(table)] for _, table, _, _ in movers], dtype=np.int64)
+        self.path_last = np.array([first[id(table)] + len(table.lengths) - 1 for _, table, _, _ in movers], dtype=np.int64)
+        self.path_base = np.array([base[id(table)] for _, table, _, _ in movers], dtype=np.float64)
+        self.path_length = np.array([table.length for _, table, _, _ in movers], dtype=np.float64)
+        self.path_loop = np.array([table.loop for _, table, _, _ in movers], dtype=bool)
+        self.path_speed = np.array([speed for _, _, speed, _ in movers], dtype=np.float64)
+        self.path_offset = np.array([offset for _, _, _, offset in movers], dtype=np.float64)
+        for name in (
+                "segment_starts", "segment_vectors", "segment_lengths", "segment_distances", "path_first",
+                "path_last", "path_base", "path_length", "path_loop", "path_speed", "path_offset"
+        ):
+            setattr(self, f"{name}_list", getattr(self, name).tolist())
+        # The path moves the platform from where it was placed
+        self.path_anchor = np.zeros((len(movers), 2))
+        if len(movers):
+            self.path_anchor = self.position[self.path_movers] - self.path_points(np.arange(len(movers)), 0.0)[0]
+            self.set_path_velocities(np.arange(len(movers)))
+        self.path_anchor_list = self.path_anchor.tolist()
+
+    def path_points(self, movers: np.ndarray, time: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Positions on their paths of the path movers (indices into the path arrays) at
+        the time, with the segments they are on and +1 / -1 for the way they go.
+        """
+        length = self.path_length[movers]
+        loop = self.path_loop[movers]
+        period = np.where(loop, length, 2 * length)
+        distance = np.mod(self.path_offset[movers] + self.path_speed[movers] * time, period)
+        backwards = ~loop & (distance > length)
+        distance = np.where(backwards, period - distance, distance)
+        distance += self.path_base[movers]
+
+        segment = np.searchsorted(self.segment_distances, distance, side="right") - 1
+        segment = np.clip(segment, self.path_first[movers], self.path_last[movers])
+        segment_length = self.segment_lengths[segment]
+        fraction = np.divide(
+            distance - self.segment_distances[segment], segment_length,
+            out=np.zeros_like(distance), where=segment_length > 0
+        )
+        points = self.segment_starts[segment] + self.segment_vectors[segment] * fraction[:, None]
+        return points, segment, np.where(backwards, -1.0, 1.0)
+
+    def path_point(self, mover: int, time: float) -> tuple[float, float, int, float]:
+        """path_points of a single mover, with the same arithmetic"""
+        length = self.path_length_list[mover]
+        loop = self.path_loop_list[mover]
+        period = length if loop else 2 * length
+        distance = (self.path_offset_list[mover] + self.path_speed_list[mover] * time) % period
+        backwards = not loop and distance > length
+        if backwards:
+            distance = period - distance
+        distance += self.path_base_list[mover]
+
+        segment = bisect_right(self.segment_distances_list, distance) - 1
+        segment = min(max(segment, self.path_first_list[mover]), self.path_last_list[mover])
+        segment_length = self.segment_lengths_list[segment]
+        fraction = (distance - self.segment_distances_list[segment]) / segment_length if segment_length > 0 else 0.0
+        start_x, start_y = self.segment_starts_list[segment]
+        vector_x, vector_y = self.segment_vectors_list[segment]
+        return start_x + vector_x * fraction, start_y + vector_y * fraction, segment, -1.0 if backwards else 1.0
+
+    def set_path_velocities(self, movers: np.ndarray) -> None:
+        """Velocities that take the path movers to their next tick positions"""
+        now, segment, direction = self.path_points(movers, self.time)
+        then, next_segment, next_direction = self.path_points(movers, self.time + self.delta_time)
+        velocities = (then - now) / self.delta_time
+        # Along one segment the velocity is exact and stays the same tick after tick,
+        # repeated points of a path make segments of no length, those keep the difference
+        segment_length = self.segment_lengths[segment]
+        straight = (segment == next_segment) & (direction == next_direction) & (segment_length > 0)
+        speed = np.divide(
+            self.path_speed[movers] * direction, segment_length,
+            out=np.zeros_like(segment_length), where=straight
+        )
+        velocities[straight] = (self.segment_vectors[segment] * speed[:, None])[straight]
+
+        indices = self.path_movers[movers]
+        self.position[indices] = now + self.path_anchor[movers]
+        self.set_motion(indices, velocities)
+
+    def set_motion(self, indices: np.ndarray, motion: np.ndarray) -> None:
+        """Coarse platforms move in the arrays only, their bodies stand still"""
+        self.motion[indices] = motion
+        velocities = motion.copy()
+        velocities[self.coarse[indices]] = 0
+        self.write_velocities(indices, velocities)
+
+    def write_velocities(self, indices: np.ndarray, velocities: np.ndarray) -> None:
+        changed = np.any(velocities != self.velocity[indices], axis=1)
+        for i, velocity in zip(indices[changed].tolist(), velocities[changed].tolist()):
+            self.bodies[i].velocity = velocity
+        self.velocity[indices[changed]] = velocities[changed]
+
+    def update(self, delta_time: float) -> None:
+        """Called after the steps of a tick"""
+        self.delta_time = delta_time
+        self.time += delta_time
+        if not self.vectorized:
+            self.update_each(delta_time)
+            return
+        self.position[self.active] += self.motion[self.active] * delta_time
+        self.update_bouncing(delta_time)
+        if len(self.path_movers):
+            self.set_path_velocities(np.flatnonzero(self.active[self.path_movers]))
+
+    def update_bouncing(self, delta_time: float) -> None:
+        moving = self.active & self.bouncing
+        x, y = self.position[:, 0], self.position[:, 1]
+        left, right, bottom, top = self.bounds.T
+        to_left, to_right, to_bottom, to_top = self.extents.T
+        change_x, change_y = self.change[:, 0], self.change[:, 1]
+        with np.errstate(invalid="ignore"):
+            near = moving & (
+                (change_x > 0) & (x + to_right > right - BOUNDARY_MARGIN)
+                | (change_x < 0) & (x - to_left < left + BOUNDARY_MARGIN)
+                | (change_y > 0) & (y + to_top > top - BOUNDARY_MARGIN)
+                | (change_y < 0) & (y - to_bottom < bottom + BOUNDARY_MARGIN)
+            )
+
+        # Coarse platforms turn around by their tracked positions, their sprites stand still
+        coarse = near & self.coarse
+        with np.errstate(invalid="ignore"):
+            flip_x = coarse & ((change_x > 0) & (x + to_right > right) | (change_x < 0) & (x - to_left < left))
+            flip_y = coarse & ((change_y > 0) & (y + to_top > top) | (change_y < 0) & (y - to_bottom < bottom))
+        self.change[flip_x, 0] *= -1
+        self.change[flip_y, 1] *= -1
+        for i in np.flatnonzero(flip_x | flip_y).tolist():
+            self.sprites[i].change_x, self.sprites[i].change_y = self.change[i].tolist()
+
+        # The same checks on the sprites, their positions are the ones of the bodies after the step
+        for i in np.flatnonzero(near & ~self.coarse).tolist():
+            sprite = self.sprites[i]
+            self.position[i] = sprite.position
+            if sprite.boundary_right and sprite.change_x > 0 and sprite.right > sprite.boundary_right:
+                sprite.change_x *= -1
+            elif sprite.boundary_left and sprite.change_x < 0 and sprite.left < sprite.boundary_left:
+                sprite.change_x *= -1
+            if sprite.boundary_top and sprite.change_y > 0 and sprite.top > sprite.boundary_top:
+                sprite.change_y *= -1
+            elif sprite.boundary_bottom and sprite.change_y < 0 and sprite.bottom < sprite.boundary_bottom:
+                sprite.change_y *= -1
+            self.change[i] = sprite.change_x, sprite.change_y
+
+        indices = np.flatnonzero(moving)
+        self.set_motion(indices, self.change[indices] / delta_time)
+
+    def update_each(self, delta_time: float) -> None:
+        """update() one platform at a time, the arrays are read and written back once"""
+        position, motion, velocity = self.position.tolist(), self.motion.tolist(), self.velocity.tolist()
+        change = self.change.tolist()
+        coarse = self.coarse.tolist()
+        for i, active in enumerate(self.active.tolist()):
+            if not active:
+                continue
+            x, y = position[i]
+            x += motion[i][0] * delta_time
+            y += motion[i][1] * delta_time
+
+            mover = self.mover_of.get(i)
+            if mover is not None:
+                now_x, now_y, segment, direction = self.path_point(mover, self.time)
+                then_x, then_y, next_segment, next_direction = self.path_point(mover, self.time + delta_time)
+                segment_length = self.segment_lengths_list[segment]
+                if segment == next_segment and direction == next_direction and segment_length > 0:
+                    speed = self.path_speed_list[mover] * direction / segment_length
+                    vector_x, vector_y = self.segment_vectors_list[segment]
+                    motion[i] = [vector_x * speed, vector_y * speed]
+                else:
+                    motion[i] = [(then_x - now_x) / delta_time, (then_y - now_y) / delta_time]
+                anchor_x, anchor_y = self.path_anchor_list[mover]
+                x, y = now_x + anchor_x, now_y + anchor_y
+            else:
+                change_x, change_y = change[i]
+                left, right, bottom, top = self.bounds_list[i]
+                to_left, to_right, to_bottom, to_top = self.extents_list[i]
+                if coarse[i]:
+                    # Coarse platforms turn around by their tracked positions, their sprites stand still
+                    flip_x = change_x > 0 and x + to_right > right or change_x < 0 and x - to_left < left
+                    flip_y = change_y > 0 and y + to_top > top or change_y < 0 and y - to_bottom < bottom
+                    if flip_x or flip_y:
+                        change_x, change_y = change_x * (-1 if flip_x else 1), change_y * (-1 if flip_y else 1)
+                        change[i] = [change_x, change_y]
+                        self.sprites[i].change_x, self.sprites[i].change_y = change_x, change_y
+                elif (
+                        change_x > 0 and x + to_right > right - BOUNDARY_MARGIN
+                        or change_x < 0 and x - to_left < left + BOUNDARY_MARGIN
+                        or change_y > 0 and y + to_top > top - BOUNDARY_MARGIN
+                        or change_y < 0 and y - to_bottom < bottom + BOUNDARY_MARGIN
+                ):
+                    # The same checks on the sprite, its position is the one of the body after the step
+                    sprite = self.sprites[i]
+                    x, y = sprite.position
+                    if sprite.boundary_right and sprite.change_x > 0 and sprite.right > sprite.boundary_right:
+                        sprite.change_x *= -1
+                    elif sprite.boundary_left and sprite.change_x < 0 and sprite.left < sprite.boundary_left:
+                        sprite.change_x *= -1
+                    if sprite.boundary_top and sprite.change_y > 0 and sprite.top > sprite.boundary_top:
+                        sprite.change_y *= -1
+                    elif sprite.boundary_bottom and sprite.change_y < 0 and sprite.bottom < sprite.boundary_bottom:
+                        sprite.change_y *= -1
+                    change_x, change_y = change[i] = [sprite.change_x, sprite.change_y]
+                motion[i] = [change_x / delta_time, change_y / delta_time]
+            position[i] = [x, y]
+
+            new_velocity = [0.0, 0.0] if coarse[i] else motion[i]
+            if new_velocity != velocity[i]:
+                self.bodies[i].velocity = velocity[i] = new_velocity
+        self.position[:], self.motion[:], self.velocity[:] = position, motion, velocity
+        self.change[:] = change
+
+    def set_coarse(self, coarse: np.ndarray, space: pymunk.Space) -> None:
+        """
+        Switches the platforms in the mask to coarse and the others back, the bodies
+        of coarse platforms and of the ones that left that state are put where the
+        platforms are now.
+        """
+        changed = self.active & (coarse != self.coarse)
+        self.coarse[changed] = coarse[changed]
+        for i in np.flatnonzero(self.active & (self.coarse | changed)).tolist():
+            body = self.bodies[i]
+            if self.coarse[i] and tuple(body.position) == tuple(self.position[i]):
+                continue
+            body.position = self.sprites[i].position = tuple(self.position[i].tolist())
+            space.reindex_shapes_for_body(body)
+
+        # Velocities for the next tick right away: none for the coarse ones, moving on for the others
+        indices = np.flatnonzero(changed)
+        self.set_motion(indices, self.motion[indices])
+
+    def freeze(self, sprite: Sprite) -> None:
+        self.active[self.index[sprite]] = False
+
+    def thaw(self, sprite: Sprite, space: pymunk.Space) -> None:
+        """The body is back in the space, a path mover is put where its path is now"""
+        i = self.index[sprite]
+        self.active[i] = True
+        if not self.on_path[i]:
+            self.position[i] = sprite.position
+            return
+        mover = np.flatnonzero(self.path_movers == i)
+        self.set_path_velocities(mover)
+        body = self.bodies[i]
+        body.position = sprite.position = tuple(self.position[i].tolist())
+        space.reindex_shapes_for_body(body)
@@ -0,0 +1,134 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter
+
+from base.level_cache import LAYER_OPTIONS, CompiledMap, get_layer_names, get_sprite_lists, load_scene
+from misc import asset_pack
+from misc.app_utils import singleton
+from misc.config import AppConfig
+from misc.texture_registry import TextureRegistry
+
+from arcade import Scene, TileMap
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+
+def get_map_path(lvl: int) -> str:
+    return f":data:/maps/map_{lvl}.tmx"
+
+
+def map_exists(lvl: int) -> bool:
+    return asset_pack.exists(get_map_path(lvl))
+
+
+class PreparedLevel:
+    """Map and scene decoded off the main thread, waiting to be swapped in"""
+    def __init__(
+            self,
+            lvl: int,
+            tile_map: TileMap | CompiledMap,
+            scene: Scene,
+            load_time: float
+    ):
+        self.lvl = lvl
+        self.tile_map = tile_map
+        self.scene = scene
+        self.load_time = load_time
+
+    def initialize(self) -> None:
+        """Create OpenGL resources of the lazy sprite lists. Main thread only."""
+        TextureRegistry().upload_pending()
+        for sprite_list in get_sprite_lists(self.scene, get_layer_names(self.tile_map)).values():
+            sprite_list.initialize()
+
+
+@singleton
+class LevelPrefetcher:
+    """
+    Loads the next level on a worker thread while the current one is played.
+    Sprite lists are created lazily, so the worker never touches OpenGL.
+    Requests also come from the menu warm-up thread, futures is guarded by lock.
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-prefetch")
+        self.futures: dict[int, Future] = {}
+        self.lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.waits: int = 0
+        self.transition_times: list[float] = []
+
+    def request(self, lvl: int) -> None:
+        if not app_config.LEVEL_PREFETCH or not map_exists(lvl):
+            return
+        with self.lock:
+            if lvl in self.futures:
+                return
+            logger.info(f"prefetch level {lvl}")
+            self.futures[lvl] = self.executor.submit(self._prepare, lvl)
+
+    def _prepare(self, lvl: int) -> PreparedLevel:
+        t = perf_counter()
+        tile_map, scene = load_scene(
+            get_map_path(lvl),
+            app_config.SPRITE_SCALING_TILES,
+            LAYER_OPTIONS,
+            lazy=True
+        )
+        return PreparedLevel(lvl, tile_map, scene, perf_counter() - t)
+
+    def take(self, lvl: int) -> PreparedLevel | None:
+        """Prepared level or None on a miss. Waits if the worker is still busy with it."""
+        with self.lock:
+            future = self.futures.pop(lvl, None)
+        self.cancel_all()
+
+        if future is None:
+            self.misses += 1
+            logger.info(f"prefetch miss: level {lvl}")
+            return None
+
+        if not future.done():
+            self.waits += 1
+            logger.info(f"prefetch of level {lvl} is not ready yet, waiting")
+
+        try:
+            prepared = future.result()
+        except Exception as e:
+            self.misses += 1
+            logger.warning(f"prefetch of level {lvl} failed: {e}")
+            return None
+
+        self.hits += 1
+        logger.info(f"prefetch hit: level {lvl}, loaded in background for {prepared.load_time:.3f}s")
+        return prepared
+
+    def cancel_all(self) -> None:
+        with self.lock:
+            futures, self.futures = self.futures, {}
+        for future in futures.values():
+            if not future.cancel():
+                future.add_done_callback(self._discard)
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """Let go of the textures of a level that was loaded but won't be played"""
+        if future.exception() is None:
+            TextureRegistry().release(future.result().tile_map)
+
+    def record_transition(self, seconds: float) -> None:
+        self.transition_times.append(seconds)
+        logger.info(f"level transition took {seconds:.3f}s, prefetch stats: {self.stats}")
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "last_transition": self.transition_times[-1] if self.transition_times else 0.0,
+            "avg_transition": sum(self.transition_times) / len(self.transition_times) if self.transition_times else 0.0,
+        }
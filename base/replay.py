@@ -0,0 +1,312 @@
+"""
+Recorded play sessions. The recorder samples the controls of GameController once
+per fixed tick and keeps only the changes, a replay feeds them back into the same
+dict in a headless simulation and checks the state of the level against checksums
+taken while recording.
+
+    python -m base.replay info <file>
+    python -m base.replay verify <file>
+
+File: MAGIC, u32 header length, JSON header (level, start state, tick rate, config),
+varint change count, (varint ticks since the previous change, varint controls bitmask)
+pairs, u32 checksum count, u32 checksums.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from misc.config import AppConfig
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SONYRPL1"
+# Controls that reach the level, menu controls are handled by the views
+CONTROLS = ("left", "right", "up", "down", "middle_up")
+# Ticks between state checksums
+CHECKPOINT_INTERVAL = 60
+
+
+def write_varint(stream: BinaryIO, value: int) -> None:
+    while value >= 0x80:
+        stream.write(bytes((value & 0x7F | 0x80,)))
+        value >>= 7
+    stream.write(bytes((value,)))
+
+
+def read_varint(stream: BinaryIO) -> int:
+    value = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise ValueError("replay is truncated")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def get_config_snapshot() -> dict:
+    return {
+        name: value for name, value in app_config.__dict__.items()
+        if name.isupper() and isinstance(value, (bool, int, float, str, list, tuple))
+    }
+
+
+def state_checksum(level) -> int:
+    """Player body and counters of the level after a tick"""
+    body = level.physics_engine.get_physics_object(level.player_sprite).body
+    data = struct.pack(
+        "<6d4i",
+        *body.position, *body.velocity, body.angle, body.angular_velocity,
+        level.score, level.life_points, level.coin_count, level.fruit_count
+    )
+    return zlib.crc32(data)
+
+
+class Replay:
+    """Control changes of one level attempt by tick, with the state it started from"""
+    def __init__(self, header: dict, changes: list[tuple[int, int]], checksums: list[int]):
+        self.header = header
+        # (tick, bitmask of CONTROLS held from that tick on)
+        self.changes = changes
+        self.checksums = checksums
+
+    @property
+    def lvl(self) -> int:
+        return self.header["level"]
+
+    @property
+    def ticks(self) -> int:
+        return self.header["ticks"]
+
+    def to_bytes(self) -> bytes:
+        stream = io.BytesIO()
+        header = json.dumps(self.header).encode()
+        stream.write(MAGIC)
+        stream.write(struct.pack("<I", len(header)))
+        stream.write(header)
+        write_varint(stream, len(self.changes))
+        previous = 0
+        for tick, mask in self.changes:
+            write_varint(stream, tick - previous)
+            write_varint(stream, mask)
+            previous = tick
+        stream.write(struct.pack(f"<I{len(self.checksums)}I", len(self.checksums), *self.checksums))
+        return stream.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        stream = io.BytesIO(data)
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not a replay")
+        header_length, = struct.unpack("<I", stream.read(4))
+        header = json.loads(stream.read(header_length))
+        changes = []
+        tick = 0
+        for _ in range(read_varint(stream)):
+            tick += read_varint(stream)
+            changes.append((tick, read_varint(stream)))
+        count, = struct.unpack("<I", stream.read(4))
+        checksums = list(struct.unpack(f"<{count}I", stream.read(4 * count)))
+        return cls(header, changes, checksums)
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Replay":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+class Recorder:
+    """Controls and checksums of a level attempt, GameView calls it around every tick"""
+    def __init__(self, level):
+        self.header: dict = {
+            "level": level.lvl,
+            "score": level.score,
+            "life_points": level.life_points,
+            "tick_rate": app_config.PHYSICS_TICK_RATE,
+            "substeps": app_config.PHYSICS_SUBSTEPS,
+            # What auto picked, it depends on the machine
+            "broadphase": level.physics_engine.broadphase,
+            "checkpoint_interval": CHECKPOINT_INTERVAL,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "config": get_config_snapshot(),
+        }
+        self.changes: list[tuple[int, int]] = []
+        self.checksums: list[int] = []
+        self.ticks: int = 0
+        self.mask: int = 0
+        self.path: Path = Path(app_config.REPLAY_DIR) / f"level_{level.lvl}_{datetime.now():%Y%m%d_%H%M%S}.rpl"
+
+    def record(self, controls: dict[str, bool]) -> None:
+        """Controls the next tick runs with"""
+        mask = sum(1 << bit for bit, name in enumerate(CONTROLS) if controls[name])
+        if mask != self.mask or not self.changes:
+            if self.changes and self.changes[-1][0] == self.ticks:
+                self.changes[-1] = (self.ticks, mask)
+            else:
+                self.changes.append((self.ticks, mask))
+            self.mask = mask
+
+    def tick_done(self, level) -> None:
+        self.ticks += 1
+        if self.ticks % CHECKPOINT_INTERVAL == 0:
+            self.checksums.append(state_checksum(level))
+
+    def get_replay(self, outcome: str, level) -> Replay:
+        header = dict(self.header, ticks=self.ticks, outcome=outcome, final_checksum=state_checksum(level))
+        # A tick the level ended on before it ran has its controls recorded already
+        return Replay(header, [change for change in self.changes if change[0] < self.ticks], list(self.checksums))
+
+    def save(self, outcome: str, level) -> Path:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        replay = self.get_replay(outcome, level)
+        replay.save(self.path)
+        logger.info(f"replay of level {replay.lvl}, {self.ticks} ticks, {outcome}: {self.path}")
+        prune_replays(self.path.parent, app_config.REPLAY_KEEP)
+        return self.path
+
+
+def prune_replays(directory: Path, keep: int) -> None:
+    """Delete all but the keep latest replays of the directory"""
+    replays = sorted(directory.glob("*.rpl"), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in replays[keep:]:
+        path.unlink(missing_ok=True)
+
+
+class ReplayInput:
+    """Feeds a replay to the controls in place of an input script"""
+    def __init__(self, replay: Replay):
+        self.replay = replay
+        self.name = f"replay of level {replay.lvl}"
+        self.tick_rate: int = replay.header["tick_rate"]
+        self.next: int = 0
+
+    def rewind(self) -> None:
+        self.next = 0
+
+    def apply(self, time: float, controls: dict[str, bool]) -> None:
+        tick = round(time * self.tick_rate)
+        changes = self.replay.changes
+        while self.next < len(changes) and changes[self.next][0] <= tick:
+            mask = changes[self.next][1]
+            for bit, name in enumerate(CONTROLS):
+                controls[name] = bool(mask >> bit & 1)
+            self.next += 1
+
+
+def apply_config(replay: Replay) -> dict[str, Any]:
+    """Puts the recorded config in place, returns the previous values of the ones that differed"""
+    previous = {}
+    for name, value in replay.header["config"].items():
+        current = getattr(app_config, name, None)
+        if isinstance(current, tuple) and isinstance(value, list):
+            value = tuple(value)
+        if name in app_config.__dict__ and current != value:
+            previous[name] = current
+            setattr(app_config, name, value)
+    return previous
+
+
+def restore_config(previous: dict[str, Any]) -> None:
+    for name, value in previous.items():
+        setattr(app_config, name, value)
+
+
+def verify(replay: Replay) -> dict:
+    """Plays the replay headless with its recorded config, the config is put back afterwards"""
+    from base import broadphase
+
+    header = replay.header
+    previous = apply_config(replay)
+    auto_choice = broadphase.auto_choices.get(replay.lvl)
+    if "broadphase" in header:
+        broadphase.auto_choices[replay.lvl] = header["broadphase"]
+    try:
+        result = play(replay)
+    finally:
+        # The rest of the process runs with its own config again
+        restore_config(previous)
+        if auto_choice is None:
+            broadphase.auto_choices.pop(replay.lvl, None)
+        else:
+            broadphase.auto_choices[replay.lvl] = auto_choice
+    result["config_changed"] = list(previous)
+    return result
+
+
+def play(replay: Replay) -> dict:
+    """Plays the replay headless and compares every checksum, the first mismatch ends the run"""
+    from base.simulation import Simulation
+
+    header = replay.header
+    simulation = Simulation(replay.lvl, ReplayInput(replay), header["score"], header["life_points"])
+    simulation.script.rewind()
+    interval = header["checkpoint_interval"]
+
+    diverged_at = None
+    while simulation.ticks < replay.ticks and not simulation.done:
+        simulation.tick()
+        if simulation.ticks % interval == 0:
+            index = simulation.ticks // interval - 1
+            if index < len(replay.checksums) and state_checksum(simulation.level) != replay.checksums[index]:
+                diverged_at = simulation.ticks
+                break
+
+    if diverged_at is None and simulation.ticks == replay.ticks:
+        # The update that finished the level or ended the game ran before the recording was saved
+        if header["outcome"] != "quit":
+            simulation.tick()
+        if state_checksum(simulation.level) != header["final_checksum"]:
+            diverged_at = simulation.ticks
+    level = simulation.level
+    outcome = "finished" if simulation.game_view.finished else "game_over" if level.game_over else "quit"
+    return {
+        "level": replay.lvl,
+        "ticks": replay.ticks,
+        "played_ticks": simulation.ticks,
+        "outcome": header["outcome"],
+        "played_outcome": outcome,
+        "deterministic": diverged_at is None and simulation.ticks == replay.ticks,
+        "diverged_at": diverged_at,
+        "score": level.score,
+        "position": [level.player_sprite.center_x, level.player_sprite.center_y],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recorded play sessions")
+    parser.add_argument("command", choices=("info", "verify"))
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.command == "info":
+        header = {name: value for name, value in replay.header.items() if name != "config"}
+        header["changes"] = len(replay.changes)
+        header["checksums"] = len(replay.checksums)
+        header["bytes"] = os.path.getsize(args.path)
+        print(json.dumps(header, indent=2))
+        return
+
+    from base.batch import setup_resources
+
+    setup_resources()
+    result = verify(replay)
+    print(json.dumps(result, indent=2))
+    if not result["deterministic"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Level and physics without a window: no GL context, no sound, nothing drawn. The
+loop is GameView.on_update with one fixed tick per frame, so a level runs as fast
+as the CPU allows. Inputs come from a script of control changes by game time.
+"""
+import json
+import logging
+from pathlib import Path
+from time import perf_counter
+
+from base.camera import follow
+from base.level import Level
+from base.level_cache import LAYER_OPTIONS, load_scene
+from base.prefetch import get_map_path
+from controllers.controller import GameController
+from misc.config import AppConfig
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+
+class InputScript:
+    """Control changes by game time: events are [seconds, control, pressed], sorted by time"""
+    def __init__(self, name: str, events: list[tuple[float, str, bool]]):
+        self.name = name
+        self.events = sorted(events, key=lambda event: event[0])
+        self.next: int = 0
+
+    @classmethod
+    def load(cls, path: str | Path) -> "InputScript":
+        path = Path(path)
+        data = json.loads(path.read_text())
+        return cls(data.get("name", path.stem), [tuple(event) for event in data["events"]])
+
+    def rewind(self) -> None:
+        self.next = 0
+
+    def apply(self, time: float, controls: dict[str, bool]) -> None:
+        """Sets the controls of every event up to the game time"""
+        while self.next < len(self.events) and self.events[self.next][0] <= time:
+            _, control, pressed = self.events[self.next]
+            controls[control] = bool(pressed)
+            self.next += 1
+
+
+class SilentSoundPlayer:
+    """Stands in for SoundPlayer: nothing is loaded or played, jumps are counted"""
+    def __init__(self):
+        self.is_playing = False
+        self.jumps: int = 0
+
+    def play_music(self):
+        self.is_playing = True
+
+    def stop_playing_music(self):
+        self.is_playing = False
+
+    def sound_jump(self):
+        self.jumps += 1
+
+
+class HeadlessGameView:
+    """Stands in for GameView, the level calls setup() when the player gets past the end of the map"""
+    def __init__(self):
+        self.finished: bool = False
+
+    def setup(self):
+        self.finished = True
+
+
+class HeadlessLevel(Level):
+    """Level that ends the simulation on game over instead of showing the game over view"""
+    def __init__(self, game_view: HeadlessGameView, sound_player: SilentSoundPlayer):
+        super().__init__(None, None, game_view, sound_player)
+        self.game_over: bool = False
+        self.gpu_tilemap = False
+        # The time limit is checked against game time by Simulation instead
+        self.wall_clock = False
+
+    def _game_over(self):
+        self.game_over = True
+
+
+class Simulation:
+    """One level played by one input script, from the score and life points it was entered with"""
+    def __init__(self, lvl: int, script: InputScript, score: int = 0, life_points: int | None = None):
+        self.lvl = lvl
+        self.script = script
+        self.dt: float = 1 / app_config.PHYSICS_TICK_RATE
+        self.controls = GameController().controls
+
+        self.game_view = HeadlessGameView()
+        self.sound_player = SilentSoundPlayer()
+        self.level = HeadlessLevel(self.game_view, self.sound_player)
+        self.level.lvl = lvl
+        tile_map, scene = load_scene(get_map_path(lvl), app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS, lazy=True)
+        self.level.build(tile_map, scene)
+        self.level.score = score
+        if life_points is not None:
+            self.level.life_points = life_points
+        # Nothing to load the next level for
+        self.level.prefetch_requested = True
+        # Some maps store it as an untyped string
+        self.time_limit = float(tile_map.properties["seconds"])
+        self.timed_out: bool = False
+
+        self.ticks: int = 0
+        self.update_chunks()
+
+    @property
+    def time(self) -> float:
+        return self.ticks * self.dt
+
+    @property
+    def done(self) -> bool:
+        return self.game_view.finished or self.level.game_over or self.timed_out
+
+    def update_chunks(self) -> None:
+        level = self.level
+        center = follow(
+            level.player_sprite.position,
+            (level.map_width, level.map_height),
+            (app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT)
+        )
+        level.update_chunks(center)
+
+    def tick(self) -> None:
+        """What GameView.on_update does in a frame of one tick"""
+        self.script.apply(self.time, self.controls)
+        self.level.update(self.dt)
+        if self.done:
+            return
+        self.level.physics_engine.tick(self.dt, app_config.PHYSICS_SUBSTEPS)
+        self.ticks += 1
+        # Like the level timer in the game, by game time
+        if app_config.TIMER_ON and self.time >= self.time_limit:
+            self.timed_out = True
+        self.update_chunks()
+
+    def run(self, max_seconds: float) -> dict:
+        for control in self.controls:
+            self.controls[control] = False
+        self.script.rewind()
+
+        max_ticks = round(max_seconds / self.dt)
+        start = perf_counter()
+        while self.ticks < max_ticks and not self.done:
+            self.tick()
+        wall_time = perf_counter() - start
+
+        level = self.level
+        player = level.player_sprite
+        return {
+            "level": self.lvl,
+            "script": self.script.name,
+            "finished": self.game_view.finished,
+            "game_over": level.game_over,
+            "timed_out": self.timed_out,
+            "time_limit": self.time_limit,
+            "ticks": self.ticks,
+            "game_time": self.time,
+            "wall_time": wall_time,
+            "speedup": self.time / wall_time if wall_time else 0.0,
+            "score": level.score,
+            "coins": level.coin_count,
+            "coin_total": level.coin_total,
+            "fruits": level.fruit_count,
+            "fruit_total": level.fruit_total,
+            "life_points": level.life_points,
+            "jumps": self.sound_player.jumps,
+            "position": [player.center_x, player.center_y],
+        }
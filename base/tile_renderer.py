@@ -0,0 +1,197 @@
+import logging
+import math
+
+import numpy as np
+from PIL import Image
+
+from base.level_cache import CompiledMap, TextureLookup, get_layer_color, GID_MASK, \
+    FLIPPED_DIAGONALLY_FLAG, FLIPPED_HORIZONTALLY_FLAG, FLIPPED_VERTICALLY_FLAG
+from misc.config import AppConfig
+
+import arcade
+from arcade import Scene, SpriteList
+from arcade.gl import geometry
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+in vec2 in_uv;
+
+out vec2 v_uv;
+
+void main() {
+    v_uv = in_uv;
+    gl_Position = window.projection * window.view * vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+// Atlas index + 1 of every cell, 0 for an empty cell. Row 0 is the bottom of the map
+uniform usampler2D grid;
+uniform sampler2D atlas;
+uniform ivec2 grid_size;
+uniform ivec2 tile_size;
+uniform int atlas_columns;
+uniform vec4 color;
+
+in vec2 v_uv;
+
+out vec4 f_color;
+
+void main() {
+    vec2 cell_pos = v_uv * vec2(grid_size);
+    ivec2 cell = min(ivec2(cell_pos), grid_size - 1);
+    uint index = texelFetch(grid, cell, 0).r;
+    if (index == 0u) discard;
+
+    int i = int(index) - 1;
+    ivec2 atlas_cell = ivec2(i % atlas_columns, i / atlas_columns);
+    vec2 local = fract(cell_pos);
+    // Atlas rows are uploaded top to bottom, as PIL stores them
+    ivec2 texel = atlas_cell * tile_size + ivec2(
+        int(local.x * float(tile_size.x)),
+        tile_size.y - 1 - int(local.y * float(tile_size.y))
+    );
+
+    vec4 c = texelFetch(atlas, texel, 0) * color;
+    if (c.a == 0.0) discard;
+    f_color = c;
+}
+"""
+
+
+def get_tile_image(lookup: TextureLookup, gid: int) -> Image.Image:
+    """Tile image with Tiled flip flags applied in the same order as arcade does"""
+    image = lookup.get_texture(gid & GID_MASK).image.convert("RGBA")
+    if gid & FLIPPED_DIAGONALLY_FLAG:
+        image = image.transpose(Image.Transpose.TRANSPOSE)
+    if gid & FLIPPED_HORIZONTALLY_FLAG:
+        image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    if gid & FLIPPED_VERTICALLY_FLAG:
+        image = image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    return image
+
+
+class GpuTileLayer:
+    """One static tile layer drawn as a single quad"""
+    def __init__(
+            self,
+            grid_texture: arcade.gl.Texture2D,
+            quad: arcade.gl.Geometry,
+            color: tuple[float, float, float, float]
+    ):
+        self.grid_texture = grid_texture
+        self.quad = quad
+        self.color = color
+
+
+class TileMapRenderer:
+    """
+    Draws static tile layers of the level with a tile lookup shader: every layer is
+    an index texture over a shared tile atlas, rendered as one quad, so the cost
+    does not depend on the number of tiles. Layers that are not static (or can't be
+    drawn this way) are drawn by their SpriteList as before.
+    """
+    def __init__(
+            self,
+            compiled: CompiledMap,
+            scene: Scene,
+            static_layers: list[str]
+    ):
+        self.ctx = arcade.get_window().ctx
+        self.layers: dict[SpriteList, GpuTileLayer] = {}
+
+        lookup = TextureLookup(compiled)
+        tile_size = compiled.tile_width, compiled.tile_height
+
+        candidates = []
+        for index, layer in enumerate(compiled.layers):
+            if layer["kind"] != "tile" or layer["name"] not in static_layers or layer["name"] not in scene:
+                continue
+            grid = compiled.layer_array(index)
+            used = np.unique(grid[grid != 0])
+            if any(get_tile_image(lookup, int(gid)).size != tile_size for gid in used):
+                logger.info(f"layer {layer['name']} has tiles of other size, drawn by sprites")
+                continue
+            candidates.append((index, layer, grid))
+
+        if not candidates:
+            self.atlas = None
+            return
+
+        gids = np.unique(np.concatenate([grid.ravel() for _, _, grid in candidates]))
+        gids = gids[gids != 0]
+
+        self.atlas_columns = max(1, math.ceil(math.sqrt(len(gids))))
+        atlas_rows = max(1, math.ceil(len(gids) / self.atlas_columns))
+        atlas_image = Image.new("RGBA", (self.atlas_columns * tile_size[0], atlas_rows * tile_size[1]))
+        for i, gid in enumerate(gids.tolist()):
+            row, col = divmod(i, self.atlas_columns)
+            atlas_image.paste(get_tile_image(lookup, gid), (col * tile_size[0], row * tile_size[1]))
+
+        self.atlas = self.ctx.texture(
+            atlas_image.size,
+            components=4,
+            data=atlas_image.tobytes(),
+            filter=(self.ctx.NEAREST, self.ctx.NEAREST)
+        )
+        self.tile_size = tile_size
+
+        self.program = self.ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+
+        width_px = compiled.width * compiled.tile_width * compiled.scaling
+        height_px = compiled.height * compiled.tile_height * compiled.scaling
+
+        for index, layer, grid in candidates:
+            # Map gids to atlas index + 1, keep 0 for empty cells
+            indices = np.where(grid != 0, np.searchsorted(gids, grid) + 1, 0).astype(np.uint16)
+            grid_texture = self.ctx.texture(
+                (compiled.width, compiled.height),
+                components=1,
+                dtype="u2",
+                data=np.ascontiguousarray(np.flipud(indices)).tobytes(),
+                filter=(self.ctx.NEAREST, self.ctx.NEAREST)
+            )
+            quad = geometry.quad_2d(size=(width_px, height_px), pos=(width_px / 2, height_px / 2))
+            color = get_layer_color(layer) or (255, 255, 255, 255)
+            self.layers[scene[layer["name"]]] = GpuTileLayer(
+                grid_texture, quad, tuple(c / 255 for c in color)
+            )
+
+        logger.info(
+            f"gpu tilemap: {len(self.layers)} layers, {len(gids)} tiles in atlas {atlas_image.size}"
+        )
+
+    def draw_layer(self, layer: GpuTileLayer) -> None:
+        # SpriteList.draw disables blending when it is done
+        self.ctx.enable(self.ctx.BLEND)
+        self.ctx.blend_func = self.ctx.BLEND_DEFAULT
+        layer.grid_texture.use(0)
+        self.atlas.use(1)
+        self.program["grid"] = 0
+        self.program["atlas"] = 1
+        self.program["grid_size"] = layer.grid_texture.size
+        self.program["tile_size"] = self.tile_size
+        self.program["atlas_columns"] = self.atlas_columns
+        self.program["color"] = layer.color
+        layer.quad.render(self.program)
+
+    def draw_sprite_list(self, sprite_list: SpriteList) -> bool:
+        """Draw the layer through the shader, False if it is not a static layer"""
+        layer = self.layers.get(sprite_list)
+        if layer is None:
+            return False
+        if sprite_list.visible:
+            self.draw_layer(layer)
+        return True
@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from arcade import Sprite
+
+
+class FixedTimestep:
+    """
+    Turns frame times into a whole number of fixed ticks. What is left of the frame
+    stays in the accumulator for the next one, alpha is how far into the next tick
+    the frame is. After a hitch at most max_steps ticks are run and the rest of the
+    backlog is dropped, the game slows down for a moment instead of spiralling.
+    """
+    def __init__(self, tick_rate: int, max_steps: int):
+        self.dt: float = 1 / tick_rate
+        self.max_steps = max_steps
+        self.accumulator: float = 0.0
+        self.ticks: int = 0
+        # Time dropped by the catch-up cap, in seconds
+        self.dropped: float = 0.0
+
+    def advance(self, delta_time: float) -> int:
+        """Number of ticks to run for a frame of delta_time seconds"""
+        self.accumulator += delta_time
+        steps = min(int(self.accumulator / self.dt), self.max_steps)
+        self.accumulator = max(0.0, self.accumulator - steps * self.dt)
+        if steps == self.max_steps and self.accumulator >= self.dt:
+            self.dropped += self.accumulator
+            self.accumulator = 0.0
+        self.ticks += steps
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        return self.accumulator / self.dt
+
+    def reset(self) -> None:
+        self.accumulator = 0.0
+
+
+class RenderInterpolation:
+    """
+    Positions and angles of moving sprites before the last tick. Drawing puts the
+    sprites between them and where the last tick left them, then moves them back,
+    so the simulation never sees the drawn positions.
+    """
+    def __init__(self):
+        self.sprites: list[Sprite] = []
+        self.previous: list[tuple[float, float, float]] = []
+
+    def save(self, sprites: list[Sprite]) -> None:
+        """Called before every tick"""
+        self.sprites = list(sprites)
+        self.previous = [(sprite.center_x, sprite.center_y, sprite.angle) for sprite in self.sprites]
+
+    def reset(self) -> None:
+        self.sprites = []
+        self.previous = []
+
+    @contextmanager
+    def apply(self, alpha: float) -> Iterator[None]:
+        current = [(sprite.center_x, sprite.center_y, sprite.angle) for sprite in self.sprites]
+        for sprite, (x0, y0, a0), (x1, y1, a1) in zip(self.sprites, self.previous, current):
+            if x0 != x1 or y0 != y1:
+                sprite.position = x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha
+            if a0 != a1:
+                sprite.angle = a0 + (a1 - a0) * alpha
+        try:
+            yield
+        finally:
+            for sprite, (x0, y0, a0), (x1, y1, a1) in zip(self.sprites, self.previous, current):
+                if x0 != x1 or y0 != y1:
+                    sprite.position = x1, y1
+                if a0 != a1:
+                    sprite.angle = a1
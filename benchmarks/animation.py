@@ -0,0 +1,77 @@
+"""
+Coin spin cost per frame: the frame counter that sets the texture of every coin each
+frame against the clip played by game time, the coins of a group get a texture only
+when the frame changes.
+
+    python -m benchmarks.animation [--coins N] [--frames N]
+
+No window is opened, the sprite lists live without a GL context.
+"""
+import argparse
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base.animation import Animator, Clip
+from entities.coin import FRAME_DURATION, SPRITE_COUNT
+
+import arcade
+
+TICK_SCALING = 20
+
+
+def get_textures() -> list[arcade.Texture]:
+    return [
+        arcade.Texture.create_empty(f"coin_{i}", (16, 16))
+        for i in range(SPRITE_COUNT)
+    ]
+
+
+def get_coins(count: int, texture: arcade.Texture) -> arcade.SpriteList:
+    coins = arcade.SpriteList(lazy=True)
+    for i in range(count):
+        coins.append(arcade.Sprite(texture, center_x=i * 16, center_y=100))
+    return coins
+
+
+def run_before(coins: arcade.SpriteList, textures: list[arcade.Texture], frames: int) -> list[float]:
+    counter = 0
+    times = []
+    for _ in range(frames):
+        t = perf_counter()
+        counter = (counter + 1) % ((SPRITE_COUNT - 1) * TICK_SCALING + 1)
+        for coin in coins:
+            coin.texture = textures[counter // TICK_SCALING]
+        times.append(perf_counter() - t)
+    return times
+
+
+def run_clip(coins: arcade.SpriteList, textures: list[arcade.Texture], frames: int) -> tuple[list[float], int]:
+    animator = Animator()
+    group = animator.add(Clip(textures, FRAME_DURATION), coins)
+    times = []
+    for _ in range(frames):
+        t = perf_counter()
+        animator.update(1 / 60)
+        times.append(perf_counter() - t)
+    return times, group.changes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+
+    textures = get_textures()
+    before = percentiles(run_before(get_coins(args.coins, textures[0]), textures, args.frames))
+    clip_times, changes = run_clip(get_coins(args.coins, textures[0]), textures, args.frames)
+    clip = percentiles(clip_times)
+
+    print(f"{args.coins} coins, {args.frames} frames, the clip changed frame {changes} times")
+    print(f"{'':<10}{'mean, us':>10}{'p50, us':>10}{'max, us':>10}")
+    for name, result in (("before", before), ("clip", clip)):
+        print(f"{name:<10}{result['mean'] * 1e6:>10.1f}{result['p50'] * 1e6:>10.1f}{result['max'] * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
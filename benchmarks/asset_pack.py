@@ -0,0 +1,138 @@
+"""
+Loose files in data/ vs the memory-mapped asset pack: files the game reads before
+the menu and the first level (fonts, sounds, player and coin frames), then level 1
+compiled from tmx and loaded from the level cache.
+
+    python -m benchmarks.asset_pack [--rounds N] [--drop-caches]
+
+Every measurement runs in a fresh process, so nothing is cached in Python.
+--drop-caches also empties the OS page cache before each run (Linux, root only),
+otherwise the files are warm after the first round.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+BASE_LVL = 1
+
+
+def get_startup_files() -> list[str]:
+    """Files under data/ the game loads before the first level"""
+    folders = ("fonts", "sounds", "misc", "tilesets/coins", f"tilesets/{app_config.PLAYER_SPRITE}")
+    data_dir = Path("data")
+    return sorted(
+        path.relative_to(data_dir).as_posix()
+        for folder in folders
+        for path in (data_dir / folder).rglob("*")
+        if path.is_file()
+    )
+
+
+def worker(pack: str | None, cache_dir: str, files: list[str]) -> dict[str, float]:
+    t = perf_counter()
+    from misc import asset_pack
+    from misc.texture_registry import TextureRegistry
+    from base.level_cache import LAYER_OPTIONS, build_scene, load_compiled_map
+    import arcade
+    result = {"imports": perf_counter() - t}
+
+    t = perf_counter()
+    if pack:
+        asset_pack.mount("data", f"{os.getcwd()}/data", pack)
+    else:
+        arcade.resources.add_resource_handle("data", f"{os.getcwd()}/data")
+    result["mount"] = perf_counter() - t
+
+    t = perf_counter()
+    registry = TextureRegistry()
+    for name in files:
+        path = f":data:/{name}"
+        if name.endswith(".png"):
+            registry.get(path, "benchmark")
+        elif name.endswith(".ttf"):
+            asset_pack.load_font(path)
+        else:
+            # Decoding depends on the codecs installed, reading is what the pack changes
+            asset_pack.read_bytes(path)
+    result["startup"] = perf_counter() - t
+
+    app_config.LEVEL_CACHE_DIR = cache_dir
+    t = perf_counter()
+    compiled = load_compiled_map(f":data:/maps/map_{BASE_LVL}.tmx")
+    build_scene(compiled, app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS, lazy=True)
+    result["level"] = perf_counter() - t
+    return result
+
+
+def drop_caches() -> None:
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as file:
+        file.write("3\n")
+
+
+def spawn(pack: str | None, cache_dir: str, files_path: str, drop: bool) -> dict[str, float]:
+    if drop:
+        drop_caches()
+    command = [sys.executable, "-m", "benchmarks.asset_pack", "--worker", "--cache-dir", cache_dir, "--files", files_path]
+    if pack:
+        command += ["--pack", pack]
+    t = perf_counter()
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = perf_counter() - t
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--drop-caches", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--pack", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--files", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        files = json.loads(Path(args.files).read_text())
+        print(json.dumps(worker(args.pack, args.cache_dir, files)))
+        return
+
+    from misc.asset_pack import write_pack
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pack = f"{tmp}/data.pack"
+        stats = write_pack("data", pack)
+        files_path = f"{tmp}/files.json"
+        files = get_startup_files()
+        Path(files_path).write_text(json.dumps(files))
+        print(f"pack: {stats['files']} files, {stats['size'] / 1024 / 1024:.1f} MB, {len(files)} loaded at startup")
+
+        results: dict[str, list[dict[str, float]]] = {}
+        for i in range(args.rounds):
+            for name, pack_path in (("loose", None), ("pack", pack)):
+                cache_dir = f"{tmp}/cache_{name}_{i}"
+                # Empty level cache first: tmx and tsx are parsed, then the same files from the cache
+                results.setdefault(f"{name}, compile", []).append(spawn(pack_path, cache_dir, files_path, args.drop_caches))
+                results.setdefault(f"{name}, cached", []).append(spawn(pack_path, cache_dir, files_path, args.drop_caches))
+
+    columns = ("process", "imports", "mount", "startup", "level")
+    print(f"{'':<16}" + "".join(f"{column + ', ms':>14}" for column in columns))
+    for name, runs in results.items():
+        print(f"{name:<16}" + "".join(
+            f"{statistics.median(run[column] for run in runs) * 1e3:>14.1f}" for column in columns
+        ))
+
+
+if __name__ == "__main__":
+    main()
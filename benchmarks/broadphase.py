@@ -0,0 +1,87 @@
+"""
+Physics tick time of every shipped map with the bounding box tree and the spatial
+hash broadphase, and what auto picks from its warm-up on the same map.
+
+    python -m benchmarks.broadphase [--levels 1,2] [--ticks N] [--chunks 0|1]
+                                    [--script benchmarks/scripts/run_right.json]
+
+A "broadphase" map property would pin the map to one of them. Needs no window.
+"""
+import argparse
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base import broadphase
+from base.batch import get_levels, setup_resources
+from base.simulation import InputScript, Simulation
+from controllers.controller import GameController
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+DEFAULT_SCRIPT = "benchmarks/scripts/run_right.json"
+
+
+def run(lvl: int, mode: str, script: InputScript, ticks: int) -> dict:
+    app_config.PHYSICS_BROADPHASE = mode
+    broadphase.auto_choices.pop(lvl, None)
+    controls = GameController().controls
+    for control in controls:
+        controls[control] = False
+
+    start = perf_counter()
+    simulation = Simulation(lvl, script)
+    setup = perf_counter() - start
+    simulation.script.rewind()
+    level = simulation.level
+    engine = level.physics_engine
+
+    times = []
+    for _ in range(ticks):
+        simulation.script.apply(simulation.time, controls)
+        level.update(simulation.dt)
+        if simulation.done:
+            break
+        start = perf_counter()
+        engine.tick(simulation.dt, app_config.PHYSICS_SUBSTEPS)
+        times.append(perf_counter() - start)
+        simulation.ticks += 1
+        simulation.update_chunks()
+    return {
+        "setup": setup,
+        "broadphase": engine.broadphase,
+        "shapes": len(engine.space.shapes),
+        "tick": percentiles(times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tree vs spatial hash broadphase per map")
+    parser.add_argument("--levels", help="comma separated level numbers, all levels by default")
+    parser.add_argument("--ticks", type=int, default=1200)
+    parser.add_argument("--chunks", type=int, choices=(0, 1), help="CHUNKS setting, the configured one by default")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    args = parser.parse_args()
+
+    setup_resources()
+    app_config.REPLAY_RECORD = 0
+    if args.chunks is not None:
+        app_config.CHUNKS = args.chunks
+    levels = [int(lvl) for lvl in args.levels.split(",")] if args.levels else get_levels()
+    script = InputScript.load(args.script)
+
+    print(f"chunks: {app_config.CHUNKS}, script: {script.name}, tick p50 / p99 in ms")
+    print(f"{'level':<7}{'shapes':>8}{'tree':>16}{'hash':>16}{'auto picks':>12}{'auto setup, ms':>16}")
+    for lvl in levels:
+        results = {mode: run(lvl, mode, script, args.ticks) for mode in (broadphase.TREE, broadphase.HASH, broadphase.AUTO)}
+        tree, spatial_hash, auto = results[broadphase.TREE], results[broadphase.HASH], results[broadphase.AUTO]
+        print(
+            f"{lvl:<7}{tree['shapes']:>8}"
+            f"{tree['tick']['p50'] * 1e3:>9.3f} /{tree['tick']['p99'] * 1e3:>5.2f}"
+            f"{spatial_hash['tick']['p50'] * 1e3:>9.3f} /{spatial_hash['tick']['p99'] * 1e3:>5.2f}"
+            f"{auto['broadphase']:>12}{(auto['setup'] - tree['setup']) * 1e3:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Per-frame cost on map_10 and on a synthetic map made of map_10 repeated to the right,
+with the whole level live vs chunks around the camera.
+
+    python -m benchmarks.chunks [--repeat N] [--frames N] [--draw]
+
+Runs in a hidden window (set ARCADE_HEADLESS=1 without a display): pickup checks of
+long sprite lists go to the GPU. --draw renders every frame too.
+"""
+import argparse
+import copy
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.common import percentiles
+from base.batch import setup_resources
+from base.level import Level
+from base.level_cache import LAYER_OPTIONS, CompiledMap, build_scene, load_compiled_map
+from base.prefetch import get_map_path
+from misc.config import AppConfig
+
+import arcade
+
+app_config = AppConfig()
+
+BASE_LVL = 10
+BOUNDARY_X = ("boundary_left", "boundary_right")
+
+
+def make_wide_map(compiled: CompiledMap, repeat: int) -> CompiledMap:
+    """The map repeated `repeat` times along x, objects and their paths shifted with it"""
+    meta = copy.deepcopy(compiled.meta)
+    meta["width"] = compiled.width * repeat
+    arrays = {}
+    shift = compiled.width * compiled.tile_width
+
+    for index, layer in enumerate(meta["layers"]):
+        array = compiled.layer_array(index)
+        if layer["kind"] == "tile":
+            arrays[f"layer_{index}"] = np.tile(array, (1, repeat))
+            continue
+
+        records = []
+        for i in range(repeat):
+            shifted = array.copy()
+            shifted[:, 1] += i * shift
+            records.append(shifted)
+        arrays[f"layer_{index}"] = np.concatenate(records)
+
+        objects = []
+        for i in range(repeat):
+            for obj in copy.deepcopy(layer["objects"]):
+                for prop in obj["properties"]:
+                    if prop[0] in BOUNDARY_X and float(prop[2]):
+                        prop[2] = str(float(prop[2]) + i * shift)
+                objects.append(obj)
+        layer["objects"] = objects
+
+    return CompiledMap(meta, arrays, compiled.map_dir)
+
+
+def build_level(compiled: CompiledMap, chunks: bool) -> Level:
+    app_config.CHUNKS = int(chunks)
+    level = Level(None, None, None)
+    level.lvl = BASE_LVL
+    scene = build_scene(compiled, app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS)
+    level.build(compiled, scene)
+    return level
+
+
+def run(level: Level, frames: int, window: arcade.Window | None) -> list[float]:
+    """Camera sweeps the whole map left to right, the player runs right under physics"""
+    engine = level.physics_engine
+    engine.main_controller.controls["right"] = True
+    delta_time = 1 / 60
+    half_w, half_h = app_config.WINDOW_WIDTH / 2, app_config.WINDOW_HEIGHT / 2
+    camera = arcade.Camera2D() if window else None
+
+    times = []
+    for frame in range(frames):
+        center = (
+            half_w + (level.map_width - 2 * half_w) * frame / max(1, frames - 1),
+            max(half_h, min(level.player_sprite.center_y, level.map_height - half_h))
+        )
+        t = perf_counter()
+        level.update_chunks(center)
+        level.collect_pickups()
+        level.animator.update(delta_time)
+        engine.tick(delta_time)
+        if window:
+            camera.position = center
+            window.clear()
+            with camera.activate():
+                level.draw()
+            window.ctx.finish()
+        times.append(perf_counter() - t)
+
+    engine.main_controller.controls["right"] = False
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--draw", action="store_true")
+    args = parser.parse_args()
+
+    window = arcade.Window(app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT, visible=False)
+
+    setup_resources()
+    chunks_setting = app_config.CHUNKS
+
+    base = load_compiled_map(get_map_path(BASE_LVL))
+    maps = {
+        f"map_{BASE_LVL}": base,
+        f"map_{BASE_LVL} x{args.repeat}": make_wide_map(base, args.repeat),
+    }
+
+    print(f"{'map':<14}{'chunks':>8}{'shapes':>8}{'p50, ms':>10}{'p99, ms':>10}{'max, ms':>10}")
+    for name, compiled in maps.items():
+        for chunks in (False, True):
+            level = build_level(compiled, chunks)
+            result = percentiles(run(level, args.frames, window if args.draw else None))
+            print(
+                f"{name:<14}{'on' if chunks else 'off':>8}{len(level.physics_engine.space.shapes):>8}"
+                f"{result['p50'] * 1e3:>10.3f}{result['p99'] * 1e3:>10.3f}{result['max'] * 1e3:>10.3f}"
+            )
+            if level.chunks is not None:
+                print(f"{'':<14}{level.chunks.stats}")
+
+    app_config.CHUNKS = chunks_setting
+
+
+if __name__ == "__main__":
+    main()
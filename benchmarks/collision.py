@@ -0,0 +1,71 @@
+"""
+Static collision shapes per map: one shape per tile vs merged rectangles.
+
+    python -m benchmarks.collision [--steps N]
+"""
+import argparse
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base.batch import get_levels, setup_resources
+from base.level import Level
+from base.level_cache import LAYER_OPTIONS, load_scene
+from base.prefetch import get_map_path
+from entities.sprites import PlayerSprite
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+
+def build_level(lvl: int, merge: bool) -> Level:
+    app_config.COLLISION_MERGE = int(merge)
+    # Whole map in the space, not just the chunks around the camera
+    app_config.CHUNKS = 0
+    level = Level(None, None, None)
+    level.lvl = lvl
+    _, level.scene = load_scene(get_map_path(lvl), app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS)
+    level.player_sprite = PlayerSprite()
+    level.player_sprite.move_to_default_location(None)
+    level.scene.add_sprite("Player", level.player_sprite)
+    level.setup_engine()
+    return level
+
+
+def run(level: Level, steps: int) -> list[float]:
+    engine = level.physics_engine
+    engine.main_controller.controls["right"] = True
+    times = []
+    for _ in range(steps):
+        t = perf_counter()
+        engine.move_player()
+        engine.step()
+        times.append(perf_counter() - t)
+    engine.main_controller.controls["right"] = False
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=600)
+    args = parser.parse_args()
+
+    setup_resources()
+    merge_setting = app_config.COLLISION_MERGE
+
+    print(f"{'map':<8}{'shapes':>8}{'merged':>8}{'step p50, us':>14}{'merged p50, us':>16}")
+    for lvl in get_levels():
+        result = {}
+        for merge in (False, True):
+            level = build_level(lvl, merge)
+            shapes = len(level.physics_engine.space.shapes)
+            result[merge] = shapes, percentiles(run(level, args.steps))["p50"]
+        print(
+            f"map_{lvl:<4}{result[False][0]:>8}{result[True][0]:>8}"
+            f"{result[False][1] * 1e6:>14.1f}{result[True][1] * 1e6:>16.1f}"
+        )
+
+    app_config.COLLISION_MERGE = merge_setting
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Contacts by pair of collision categories and physics tick time of every shipped
+map, with the collision matrix as configured and with pairs of categories ignored.
+
+    python -m benchmarks.collision_matrix [--levels 1,2] [--ticks N] [--ignore item:edge]
+                                          [--script benchmarks/scripts/run_jump.json]
+
+Contacts are per tick, a pair in contact counts once a step. Counting slows the
+steps down, the tick times come from a second run without it. Needs no window.
+"""
+import argparse
+from collections import defaultdict
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base.batch import get_levels, setup_resources
+from base.simulation import InputScript, Simulation
+from controllers.controller import GameController
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+DEFAULT_SCRIPT = "benchmarks/scripts/run_jump.json"
+DEFAULT_IGNORE = "item:edge"
+
+
+def run(lvl: int, ignore: str, script: InputScript, ticks: int, count: bool) -> dict:
+    app_config.COLLISION_IGNORE = ignore
+    controls = GameController().controls
+    for control in controls:
+        controls[control] = False
+    simulation = Simulation(lvl, script)
+    simulation.script.rewind()
+    level = simulation.level
+    engine = level.physics_engine
+    counter = engine.count_contacts() if count else None
+
+    times = []
+    for _ in range(ticks):
+        simulation.script.apply(simulation.time, controls)
+        level.update(simulation.dt)
+        if simulation.done:
+            break
+        start = perf_counter()
+        engine.tick(simulation.dt, app_config.PHYSICS_SUBSTEPS)
+        times.append(perf_counter() - start)
+        simulation.ticks += 1
+        simulation.update_chunks()
+    contacts = {}
+    if counter is not None:
+        contacts = {pair: total / max(1, len(times)) for pair, total in counter.counts.items()}
+    return {"ticks": len(times), "tick": percentiles(times), "contacts": contacts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contacts by collision category pair and tick time")
+    parser.add_argument("--levels", help="comma separated level numbers, all levels by default")
+    parser.add_argument("--ticks", type=int, default=1800)
+    parser.add_argument("--ignore", default=DEFAULT_IGNORE, help="pairs of categories to ignore, like item:edge")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    args = parser.parse_args()
+
+    setup_resources()
+    app_config.REPLAY_RECORD = 0
+    configured = app_config.COLLISION_IGNORE
+    modes = {"configured": configured, "ignored": ",".join(filter(None, (configured, args.ignore)))}
+    levels = [int(lvl) for lvl in args.levels.split(",")] if args.levels else get_levels()
+    script = InputScript.load(args.script)
+
+    print(f"chunks: {app_config.CHUNKS}, script: {script.name}, ignored: {modes['ignored']}")
+    totals: dict[str, dict[tuple[str, str], float]] = {mode: defaultdict(float) for mode in modes}
+    print(f"{'level':<7}{'mode':<12}{'ticks':>7}{'p50, ms':>9}{'p99, ms':>9}{'contacts':>10}")
+    for lvl in levels:
+        for mode, ignore in modes.items():
+            contacts = run(lvl, ignore, script, args.ticks, count=True)["contacts"]
+            result = run(lvl, ignore, script, args.ticks, count=False)
+            for pair, count in contacts.items():
+                totals[mode][pair] += count
+            print(
+                f"{lvl:<7}{mode:<12}{result['ticks']:>7}{result['tick']['p50'] * 1e3:>9.3f}"
+                f"{result['tick']['p99'] * 1e3:>9.3f}{sum(contacts.values()):>10.1f}"
+            )
+
+    print("\ncontacts per tick summed over the levels")
+    pairs = sorted(set(totals["configured"]) | set(totals["ignored"]), key=str)
+    print(f"{'pair':<26}{'configured':>12}{'ignored':>12}")
+    for pair in pairs:
+        print(f"{' - '.join(map(str, pair)):<26}{totals['configured'][pair]:>12.2f}{totals['ignored'][pair]:>12.2f}")
+
+    app_config.COLLISION_IGNORE = configured
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import statistics
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def pick(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": pick(0.5),
+        "p90": pick(0.9),
+        "p99": pick(0.99),
+        "max": values[-1],
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """Numbers of nested results by their path, e.g. 'levels/3/phases/step/p50'"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def find_regressions(
+        results: dict,
+        baseline: dict,
+        stats: tuple[str, ...] = ("p50", "p90", "p99"),
+        threshold: float = 0.2,
+        min_delta: float = 0.0
+) -> list[tuple[str, float, float]]:
+    """
+    Times that grew by more than threshold (0.2 -> 20 %) and more than min_delta
+    seconds since the baseline: (path, baseline, now). Paths missing on one side are skipped.
+    """
+    current = flatten(results)
+    regressions = []
+    for path, before in flatten(baseline).items():
+        if path.rsplit("/", 1)[-1] not in stats or path not in current:
+            continue
+        now = current[path]
+        if now - before > min_delta and now > before * (1 + threshold):
+            regressions.append((path, before, now))
+    return regressions
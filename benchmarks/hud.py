@@ -0,0 +1,107 @@
+"""
+HUD cost per frame: text updates and drawing of GameUI. The timer changes once a
+second and the score twice, like in a level; everything else stays the same.
+
+    python -m benchmarks.hud [--frames N]
+
+before:   every text reassigned from a fresh f-string, each Text drawn on its own
+batched:  only changed texts laid out again, one pyglet batch
+cached:   batched, drawn into an offscreen texture on changes only (HUD_CACHE=1)
+
+Runs in a hidden window (set ARCADE_HEADLESS=1 without a display).
+"""
+import argparse
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base.batch import setup_resources
+from misc.config import AppConfig
+from views.components.game_ui import GameUI
+
+import arcade
+
+app_config = AppConfig()
+
+
+def get_values(frame: int) -> tuple:
+    seconds = 300 - frame // 60
+    return (
+        frame // 30 * 10,
+        3,
+        20,
+        frame // 120,
+        1,
+        "{:02d}:{:02d}".format(seconds // 60, seconds % 60),
+        5,
+        frame // 600
+    )
+
+
+def update_before(game_ui: GameUI, score, life_points, coin_total, coin_count, level, timer_left, fruit_total, fruit_count):
+    game_ui.score_text.text = f"Score: {score}"
+    game_ui.life_text.text = f"{' ♥' * life_points}"
+    game_ui.coins_to_find.text = f"{coin_count}/{coin_total}"
+    game_ui.level_text.text = f"Lvl: {level}"
+    game_ui.timer_text.text = f"{timer_left}"
+    game_ui.fruit_to_find.text = f"{fruit_count}/{fruit_total}"
+
+
+def run(window: arcade.Window, mode: str, frames: int) -> tuple[dict[str, float], dict[str, float]]:
+    app_config.HUD_CACHE = int(mode == "cached")
+    game_ui = GameUI()
+    game_ui.init(*get_values(0))
+    if mode == "before":
+        for widget in game_ui.widgets:
+            widget.batch = None
+
+    update_times = []
+    draw_times = []
+    for frame in range(frames):
+        values = get_values(frame)
+        window.clear()
+        # The clear is not part of the HUD cost
+        window.ctx.finish()
+
+        t = perf_counter()
+        if mode == "before":
+            update_before(game_ui, *values)
+        else:
+            game_ui.update(*values)
+        update_times.append(perf_counter() - t)
+
+        t = perf_counter()
+        if mode == "before":
+            for widget in game_ui.widgets:
+                widget.draw()
+        else:
+            game_ui.draw()
+        window.ctx.finish()
+        draw_times.append(perf_counter() - t)
+
+    return percentiles(update_times), percentiles(draw_times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+
+    window = arcade.Window(app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT, visible=False)
+    setup_resources()
+    app_config.load_fonts()
+    app_config.load_game_fonts()
+    hud_cache = app_config.HUD_CACHE
+
+    print(f"{'':<10}{'update p50, us':>16}{'draw p50, us':>14}{'draw p99, us':>14}{'total mean, us':>16}")
+    for mode in ("before", "batched", "cached"):
+        update, draw = run(window, mode, args.frames)
+        print(
+            f"{mode:<10}{update['p50'] * 1e6:>16.1f}{draw['p50'] * 1e6:>14.1f}{draw['p99'] * 1e6:>14.1f}"
+            f"{(update['mean'] + draw['mean']) * 1e6:>16.1f}"
+        )
+
+    app_config.HUD_CACHE = hud_cache
+
+
+if __name__ == "__main__":
+    main()
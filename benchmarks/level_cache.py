@@ -0,0 +1,75 @@
+"""
+Cold TMX parse vs compiled level cache load for every shipped map.
+
+    python -m benchmarks.level_cache [--repeat N]
+"""
+import argparse
+import os
+import statistics
+from pathlib import Path
+from time import perf_counter
+
+from misc.config import AppConfig
+from base.level import LAYER_OPTIONS
+from base.level_cache import load_compiled_map, build_scene, get_cache_path
+
+import arcade
+
+app_config = AppConfig()
+
+
+def measure(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = perf_counter()
+        func()
+        times.append(perf_counter() - t)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    arcade.resources.add_resource_handle("data", f"{os.getcwd()}/data")
+    scaling = app_config.SPRITE_SCALING_TILES
+
+    maps = sorted(
+        Path(arcade.resources.resolve(":data:/maps")).glob("map_*.tmx"),
+        key=lambda p: int(p.stem.split("_")[1])
+    )
+
+    print(f"{'map':<8}{'size':>8}{'tmx, ms':>10}{'compile, ms':>13}{'cached, ms':>12}{'speedup':>9}")
+    total_tmx = total_cached = 0.0
+    for map_file in maps:
+        def load_tmx():
+            tile_map = arcade.load_tilemap(map_file, scaling=scaling, layer_options=LAYER_OPTIONS)
+            arcade.Scene.from_tilemap(tile_map)
+
+        def compile_map():
+            cache_path = get_cache_path(map_file)
+            if cache_path.exists():
+                cache_path.unlink()
+            load_compiled_map(map_file)
+
+        def load_cached():
+            build_scene(load_compiled_map(map_file), scaling, LAYER_OPTIONS)
+
+        t_tmx = measure(load_tmx, args.repeat)
+        t_compile = measure(compile_map, 1)
+        t_cached = measure(load_cached, args.repeat)
+        total_tmx += t_tmx
+        total_cached += t_cached
+
+        compiled = load_compiled_map(map_file)
+        print(
+            f"{map_file.stem:<8}{f'{compiled.width}x{compiled.height}':>8}"
+            f"{t_tmx * 1000:>10.1f}{t_compile * 1000:>13.1f}{t_cached * 1000:>12.1f}{t_tmx / t_cached:>8.1f}x"
+        )
+
+    print(f"{'total':<16}{total_tmx * 1000:>10.1f}{'':>13}{total_cached * 1000:>12.1f}{total_tmx / total_cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
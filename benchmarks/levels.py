@@ -0,0 +1,195 @@
+"""
+Simulation cost of every shipped level: Level.setup time, then a scripted run
+through GameView.on_update with the time of each phase per frame.
+
+    python -m benchmarks.levels [--levels 1,2] [--script benchmarks/scripts/run_jump.json]
+                                [--frames N] [--out results.json]
+                                [--baseline benchmarks/baselines/levels.json] [--update-baseline]
+                                [--threshold 0.2] [--min-delta-ms 0.05]
+
+Phases: level update, HUD, minimap, move_player, step, rotate_moving and the chunk
+update, "frame" is the whole on_update. Frames are 1 / FRAME_RATE of game time and
+the run ends early on game over or at the end of the map. With a baseline the run
+fails on phases whose p50, p90 or p99 grew by more than the threshold; baselines
+are machine specific, make one with --update-baseline on the machine that checks.
+
+Runs in a hidden window (set ARCADE_HEADLESS=1 without a display). Level
+prefetching and replay recording are off.
+"""
+import argparse
+import json
+import platform
+import sys
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter
+
+from benchmarks.common import find_regressions, percentiles
+from base.batch import get_levels, setup_resources
+from base.simulation import InputScript
+from misc.config import AppConfig
+from views.game_view import GameView
+
+import arcade
+
+app_config = AppConfig()
+
+DEFAULT_SCRIPT = "benchmarks/scripts/run_jump.json"
+DEFAULT_BASELINE = "benchmarks/baselines/levels.json"
+PHASES = ("frame", "level_update", "hud", "minimap", "move_player", "step", "rotate_moving", "chunks")
+
+
+class PhaseTimer:
+    """Wraps methods of live objects to add up their time per frame"""
+    def __init__(self):
+        self.current: dict[str, float] = defaultdict(float)
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def wrap(self, obj, method: str, phase: str) -> None:
+        original = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.current[phase] += perf_counter() - start
+
+        setattr(obj, method, timed)
+
+    def end_frame(self) -> None:
+        for phase in PHASES:
+            self.samples[phase].append(self.current.pop(phase, 0.0))
+
+
+class BenchMenu(arcade.View):
+    """Stands in for the main menu the game returns to"""
+    continue_enabled = False
+
+    def save_game_state(self, game_view):
+        pass
+
+
+def run_level(window: arcade.Window, lvl: int, script: InputScript, frames: int) -> dict:
+    view = GameView(window, BenchMenu(window))
+    view.level.lvl = lvl
+    timer = PhaseTimer()
+
+    timer.wrap(view.level, "setup", "setup")
+    start = perf_counter()
+    view.setup()
+    setup_total = perf_counter() - start
+    level_setup = timer.current.pop("setup")
+    window.show_view(view)
+
+    level = view.level
+    engine = level.physics_engine
+    timer.wrap(level, "update", "level_update")
+    timer.wrap(level, "update_chunks", "chunks")
+    timer.wrap(view.game_ui, "update", "hud")
+    timer.wrap(view.minimap, "update", "minimap")
+    for method in ("move_player", "step", "rotate_moving"):
+        timer.wrap(engine, method, method)
+
+    controls = view.main_controller.controls
+    for control in controls:
+        controls[control] = False
+    script.rewind()
+    delta_time = 1 / app_config.FRAME_RATE
+    game_time = 0.0
+    played = 0
+    for played in range(1, frames + 1):
+        script.apply(game_time, controls)
+        start = perf_counter()
+        view.on_update(delta_time)
+        timer.current["frame"] = perf_counter() - start
+        timer.end_frame()
+        game_time += delta_time
+        if window.current_view is not view or level.lvl != lvl:
+            break
+
+    for control in controls:
+        controls[control] = False
+    return {
+        "setup": percentiles([level_setup]),
+        "game_view_setup": setup_total,
+        "frames": played,
+        "ended": played < frames,
+        "phases": {phase: percentiles(timer.samples[phase]) for phase in PHASES},
+    }
+
+
+def print_report(results: dict) -> None:
+    phases = PHASES[1:]
+    print(f"{'level':<7}{'setup, ms':>10}{'frames':>8}{'frame p50':>11}{'p99':>8}" + "".join(f"{p[:10]:>12}" for p in phases))
+    for lvl, result in results["levels"].items():
+        frame = result["phases"]["frame"]
+        print(
+            f"{lvl:<7}{result['setup']['p50'] * 1e3:>10.1f}{result['frames']:>8}"
+            f"{frame['p50'] * 1e3:>11.3f}{frame['p99'] * 1e3:>8.3f}"
+            + "".join(f"{result['phases'][p]['p50'] * 1e3:>12.3f}" for p in phases)
+        )
+    print("phase columns: p50, ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Setup and per-frame simulation cost of the levels")
+    parser.add_argument("--levels", help="comma separated level numbers, all levels by default")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    parser.add_argument("--frames", type=int, default=1800)
+    parser.add_argument("--out", help="JSON file for the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed growth, 0.2 -> 20 %%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="smaller growths are noise")
+    args = parser.parse_args()
+
+    window = arcade.Window(app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT, visible=False)
+    setup_resources()
+    app_config.LEVEL_PREFETCH = 0
+    app_config.REPLAY_RECORD = 0
+
+    levels = [int(lvl) for lvl in args.levels.split(",")] if args.levels else get_levels()
+    script = InputScript.load(args.script)
+    results = {
+        "config": {
+            "script": script.name,
+            "frames": args.frames,
+            "frame_rate": app_config.FRAME_RATE,
+            "tick_rate": app_config.PHYSICS_TICK_RATE,
+            "window": [app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT],
+            "chunks": app_config.CHUNKS,
+            "gpu_tilemap": app_config.GPU_TILEMAP,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "levels": {str(lvl): run_level(window, lvl, script, args.frames) for lvl in levels},
+    }
+    print_report(results)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"baseline saved: {baseline_path}")
+        return
+    if not baseline_path.is_file():
+        print(f"no baseline at {baseline_path}, nothing to compare with")
+        return
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["config"] != results["config"]:
+        print("the baseline was made with another config, compare with care")
+    regressions = find_regressions(results, baseline, threshold=args.threshold, min_delta=args.min_delta_ms / 1e3)
+    for path, before, now in regressions:
+        print(f"REGRESSION {path}: {before * 1e3:.3f} -> {now * 1e3:.3f} ms ({now / before - 1:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+CPU used by the main menu in the real event loop, drawn every frame and on demand,
+then on demand in an unfocused window. A key press moves the button focus every
+--input-every seconds, like someone going through the menu.
+
+    python -m benchmarks.menu_cpu [--seconds N] [--input-every S]
+
+CPU time is the whole process, the game warm-up threads included, so the menu is
+run once before measuring.
+"""
+import argparse
+import time
+
+import pyglet
+
+from base.batch import setup_resources
+from misc.config import AppConfig
+from misc.frame_pacer import FramePacer
+from views.main_view import MainView
+
+import arcade
+
+app_config = AppConfig()
+
+
+def press(window: arcade.Window, key: int) -> None:
+    window.dispatch_event("on_key_press", key, 0)
+    window.dispatch_event("on_key_release", key, 0)
+
+
+def run(window: arcade.Window, view: MainView, seconds: float, input_every: float, focused: bool = True) -> dict[str, float]:
+    window.show_view(view)
+    pacer = FramePacer()
+    pacer.set_state(focused=focused)
+    keys = iter((arcade.key.DOWN, arcade.key.UP) * int(seconds / input_every + 1))
+
+    def on_input(delta_time: float):
+        press(window, next(keys))
+
+    pyglet.clock.schedule_interval(on_input, input_every)
+    pyglet.clock.schedule_once(lambda delta_time: pyglet.app.exit(), seconds)
+
+    draws = pacer.draws
+    cpu, wall = time.process_time(), time.perf_counter()
+    pyglet.app.run(None)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    pyglet.clock.unschedule(on_input)
+    pacer.set_state(focused=True)
+    return {"cpu": cpu, "wall": wall, "draws": pacer.draws - draws}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--input-every", type=float, default=1)
+    args = parser.parse_args()
+
+    window = arcade.Window(app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT, vsync=app_config.VSYNC)
+    setup_resources()
+    app_config.load_fonts()
+    view = MainView(w=window)
+    render_on_demand = app_config.MENU_RENDER_ON_DEMAND
+
+    # Warm-up: game modules, fonts and the first frames
+    run(window, view, 2, args.input_every)
+
+    results = {}
+    for name, on_demand, focused in (
+            ("every frame", 0, True),
+            ("on demand", 1, True),
+            ("unfocused", 1, False)
+    ):
+        app_config.MENU_RENDER_ON_DEMAND = on_demand
+        results[name] = run(window, view, args.seconds, args.input_every, focused)
+    app_config.MENU_RENDER_ON_DEMAND = render_on_demand
+
+    print(f"{'':<14}{'CPU, %':>8}{'frames/s':>10}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['cpu'] / result['wall'] * 100:>8.1f}{result['draws'] / result['wall']:>10.1f}")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Moving platform update per tick: the loop over every sprite PhysicsEngine used to
+run vs MovingPlatforms one platform at a time ("each") and as arrays, for growing
+numbers of bouncing and path platforms.
+
+    python -m benchmarks.movers [--counts 1,2,10,20,40,80,200,800] [--ticks N]
+
+The shipped maps have 1 or 2 platforms, map_13 has 10. MovingPlatforms switches
+to arrays from VECTOR_MIN platforms on, where they get faster than "each".
+
+Synthetic platforms in an empty space, no map or window needed. "loop" only
+exists for bouncing platforms, "rotate" is the time of rotate_moving, "tick"
+adds the space step.
+"""
+import argparse
+import random
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.common import percentiles
+from base.engine import PhysicsEngine
+from misc.config import AppConfig
+
+import arcade
+
+app_config = AppConfig()
+
+PATH = np.array([[0, 0], [192, 0], [192, 96], [96, 160], [0, 96]], dtype=np.float64)
+
+
+def loop_rotate(engine: PhysicsEngine, delta_time: float) -> None:
+    """rotate_moving before the platforms were arrays"""
+    for moving_sprite in engine.moving_sprites_list:
+        if moving_sprite.boundary_right and moving_sprite.change_x > 0 and moving_sprite.right > moving_sprite.boundary_right:
+            moving_sprite.change_x *= -1
+        elif moving_sprite.boundary_left and moving_sprite.change_x < 0 and moving_sprite.left < moving_sprite.boundary_left:
+            moving_sprite.change_x *= -1
+        if moving_sprite.boundary_top and moving_sprite.change_y > 0 and moving_sprite.top > moving_sprite.boundary_top:
+            moving_sprite.change_y *= -1
+        elif moving_sprite.boundary_bottom and moving_sprite.change_y < 0 and moving_sprite.bottom < moving_sprite.boundary_bottom:
+            moving_sprite.change_y *= -1
+        engine.set_velocity(moving_sprite, (moving_sprite.change_x / delta_time, moving_sprite.change_y / delta_time))
+
+
+def build_engine(count: int, on_path: bool, vectorized: bool = True) -> PhysicsEngine:
+    rng = random.Random(count)
+    engine = PhysicsEngine(damping=1.0, gravity=(0, -app_config.GRAVITY))
+    sprites = arcade.SpriteList()
+    for i in range(count):
+        sprite = arcade.SpriteSolidColor(48, 16, color=arcade.color.GRAY)
+        sprite.position = (i % 40) * 300 + 100, (i // 40) * 300 + 100
+        speed = rng.choice((1, 2, 3))
+        if rng.random() < 0.5:
+            sprite.change_x = speed
+            sprite.boundary_left, sprite.boundary_right = sprite.left - 100, sprite.right + 100
+        else:
+            sprite.change_y = speed
+            sprite.boundary_bottom, sprite.boundary_top = sprite.bottom - 100, sprite.top + 100
+        if on_path:
+            sprite.properties["path"] = "path"
+            sprite.properties["path_offset"] = rng.uniform(0, 400)
+        sprites.append(sprite)
+    engine.add_moving_sprites(sprites, {"path": (PATH, False)})
+    engine.moving_platforms.vectorized = vectorized
+    return engine
+
+
+def run(engine: PhysicsEngine, ticks: int, rotate) -> tuple[list[float], list[float]]:
+    delta_time = 1 / app_config.PHYSICS_TICK_RATE
+    rotate_times, tick_times = [], []
+    for _ in range(ticks):
+        start = perf_counter()
+        engine.step(delta_time)
+        rotate_start = perf_counter()
+        rotate(delta_time)
+        end = perf_counter()
+        rotate_times.append(end - rotate_start)
+        tick_times.append(end - start)
+    return rotate_times, tick_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moving platform update cost")
+    parser.add_argument("--counts", default="1,2,10,20,40,80,200,800", help="comma separated platform counts")
+    parser.add_argument("--ticks", type=int, default=1200)
+    args = parser.parse_args()
+
+    print(f"{'platforms':<11}{'kind':<10}{'update':<8}{'rotate p50, us':>16}{'p99':>10}{'tick p50, us':>14}")
+    for count in (int(count) for count in args.counts.split(",")):
+        for kind, on_path in (("bouncing", False), ("path", True)):
+            updates = [("each", False, None), ("arrays", True, None)]
+            if not on_path:
+                updates.insert(0, ("loop", True, loop_rotate))
+            for name, vectorized, rotate in updates:
+                engine = build_engine(count, on_path, vectorized)
+                rotate_times, tick_times = run(
+                    engine, args.ticks,
+                    engine.rotate_moving if rotate is None else lambda delta_time: rotate(engine, delta_time)
+                )
+                rotate_stats, tick_stats = percentiles(rotate_times), percentiles(tick_times)
+                print(
+                    f"{count:<11}{kind:<10}{name:<8}{rotate_stats['p50'] * 1e6:>16.1f}"
+                    f"{rotate_stats['p99'] * 1e6:>10.1f}{tick_stats['p50'] * 1e6:>14.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
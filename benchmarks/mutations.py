@@ -0,0 +1,104 @@
+"""
+Physics mutations one sprite at a time and in bulk on the maps with the most
+dynamic bodies: respawning the player, freezing and thawing every dynamic body
+and removing the Lvl Wall layer tile by tile (COLLISION_MERGE=0).
+
+    python -m benchmarks.mutations [--maps N] [--levels 7,10] [--repeat N]
+
+Times are medians of repeat runs in microseconds. Needs no window.
+"""
+import argparse
+import statistics
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.physics_lod import count_dynamic
+from base.batch import get_levels, setup_resources
+from base.simulation import InputScript, Simulation
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+
+def time_median(func: Callable[[], None], repeat: int, setup: Callable[[], None] | None = None) -> float:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(lvl: int, repeat: int) -> dict[str, tuple[float, float]]:
+    engine = Simulation(lvl, InputScript("idle", [])).level.physics_engine
+    player = engine.player_sprite
+    position = player.position
+
+    def respawn_sprite():
+        engine.remove_sprite(player)
+        player.position = position
+        engine.add_player(player)
+
+    dynamic = [sprite for sprite in engine.non_static_sprite_list if sprite is not player]
+
+    def freeze_sprite():
+        for sprite in dynamic:
+            engine.freeze_sprite(sprite)
+        for sprite in dynamic:
+            engine.thaw_sprite(sprite)
+
+    def freeze_sprites():
+        engine.freeze_sprites(dynamic)
+        engine.thaw_sprites(dynamic)
+
+    results = {
+        "respawn": (time_median(respawn_sprite, repeat), time_median(lambda: engine.reset_body(player, position), repeat)),
+        "freeze": (time_median(freeze_sprite, repeat), time_median(freeze_sprites, repeat)),
+    }
+
+    merge = app_config.COLLISION_MERGE
+    app_config.COLLISION_MERGE = 0
+    walls = Simulation(lvl, InputScript("idle", [])).level.physics_engine
+    app_config.COLLISION_MERGE = merge
+    if walls.lvl_walls is not None and len(walls.lvl_walls):
+        def add_walls():
+            for sprite in walls.lvl_walls:
+                if sprite not in walls.sprites:
+                    walls.add_sprite(sprite, body_type=walls.STATIC)
+
+        def remove_sprite():
+            for sprite in walls.lvl_walls:
+                walls.remove_sprite(sprite)
+
+        results["lvl wall"] = (
+            time_median(remove_sprite, repeat, add_walls),
+            time_median(lambda: walls.remove_sprites(walls.lvl_walls), repeat, add_walls),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Physics mutations one sprite at a time and in bulk")
+    parser.add_argument("--maps", type=int, default=5, help="busiest maps to run")
+    parser.add_argument("--levels", help="comma separated level numbers instead of the busiest maps")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_resources()
+    app_config.REPLAY_RECORD = 0
+    app_config.CHUNKS = 0
+    if args.levels:
+        levels = [int(lvl) for lvl in args.levels.split(",")]
+    else:
+        levels = sorted(get_levels(), key=count_dynamic, reverse=True)[:args.maps]
+
+    print(f"{'level':<7}{'mutation':<10}{'one by one, us':>16}{'bulk, us':>10}")
+    for lvl in levels:
+        for mutation, (single, bulk) in run(lvl, args.repeat).items():
+            print(f"{lvl:<7}{mutation:<10}{single * 1e6:>16.1f}{bulk * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Body sleeping and physics level of detail on the maps with the most dynamic
+bodies: physics tick time and bodies simulated, sleeping, coarse and frozen per tick.
+
+    python -m benchmarks.physics_lod [--maps N] [--levels 7,10] [--ticks N]
+                                     [--script benchmarks/scripts/run_jump.json]
+
+Modes: off, sleep (PHYSICS_SLEEP_TIME), lod (PHYSICS_LOD_DISTANCE) and both, on the
+configured CHUNKS setting. "physics" is the tick of the engine plus the chunk and
+level of detail update around the camera. Needs no window.
+"""
+import argparse
+from collections import defaultdict
+from time import perf_counter
+
+from benchmarks.common import percentiles
+from base.batch import get_levels, setup_resources
+from base.simulation import InputScript, Simulation
+from controllers.controller import GameController
+from misc.config import AppConfig
+
+app_config = AppConfig()
+
+DEFAULT_SCRIPT = "benchmarks/scripts/run_jump.json"
+SLEEP_TIME = 0.5
+LOD_DISTANCE = 8
+
+
+def get_modes() -> dict[str, tuple[float, int]]:
+    """(PHYSICS_SLEEP_TIME, PHYSICS_LOD_DISTANCE) of every mode"""
+    sleep_time = app_config.PHYSICS_SLEEP_TIME or SLEEP_TIME
+    lod_distance = app_config.PHYSICS_LOD_DISTANCE or LOD_DISTANCE
+    return {
+        "off": (0, 0),
+        "sleep": (sleep_time, 0),
+        "lod": (0, lod_distance),
+        "sleep+lod": (sleep_time, lod_distance),
+    }
+
+
+def count_dynamic(lvl: int) -> int:
+    level = Simulation(lvl, InputScript("idle", [])).level
+    return len(level.scene["Dynamic Items"]) + len(level.scene["Moving Sprites"])
+
+
+def run(lvl: int, script: InputScript, ticks: int) -> dict:
+    controls = GameController().controls
+    for control in controls:
+        controls[control] = False
+    simulation = Simulation(lvl, script)
+    simulation.script.rewind()
+    level = simulation.level
+
+    times = []
+    counts = defaultdict(int)
+    for _ in range(ticks):
+        simulation.script.apply(simulation.time, controls)
+        level.update(simulation.dt)
+        if simulation.done:
+            break
+        start = perf_counter()
+        level.physics_engine.tick(simulation.dt, app_config.PHYSICS_SUBSTEPS)
+        simulation.ticks += 1
+        simulation.update_chunks()
+        times.append(perf_counter() - start)
+        for name, count in level.physics_engine.count_bodies().items():
+            counts[name] += count
+    return {
+        "ticks": len(times),
+        "physics": percentiles(times),
+        "bodies": {name: count / max(1, len(times)) for name, count in counts.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Body sleeping and physics level of detail")
+    parser.add_argument("--maps", type=int, default=5, help="busiest maps to run")
+    parser.add_argument("--levels", help="comma separated level numbers instead of the busiest maps")
+    parser.add_argument("--ticks", type=int, default=1800)
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    args = parser.parse_args()
+
+    setup_resources()
+    app_config.REPLAY_RECORD = 0
+    settings = app_config.PHYSICS_SLEEP_TIME, app_config.PHYSICS_LOD_DISTANCE
+    modes = get_modes()
+
+    if args.levels:
+        levels = [int(lvl) for lvl in args.levels.split(",")]
+    else:
+        levels = sorted(get_levels(), key=count_dynamic, reverse=True)[:args.maps]
+    script = InputScript.load(args.script)
+
+    print(f"chunks: {app_config.CHUNKS}, script: {script.name}")
+    print(f"{'level':<7}{'mode':<11}{'ticks':>7}{'p50, ms':>9}{'p99, ms':>9}{'active':>8}{'sleeping':>10}{'coarse':>8}{'frozen':>8}")
+    for lvl in levels:
+        for mode, (sleep_time, lod_distance) in modes.items():
+            app_config.PHYSICS_SLEEP_TIME, app_config.PHYSICS_LOD_DISTANCE = sleep_time, lod_distance
+            result = run(lvl, script, args.ticks)
+            physics, bodies = result["physics"], result["bodies"]
+            print(
+                f"{lvl:<7}{mode:<11}{result['ticks']:>7}{physics['p50'] * 1e3:>9.3f}{physics['p99'] * 1e3:>9.3f}"
+                f"{bodies['active']:>8.1f}{bodies['sleeping']:>10.1f}{bodies['coarse']:>8.1f}{bodies['frozen']:>8.1f}"
+            )
+
+    app_config.PHYSICS_SLEEP_TIME, app_config.PHYSICS_LOD_DISTANCE = settings
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Draw cost of the levels rendered into an offscreen framebuffer: the scene layer by
+layer, the minimap pass and the HUD, at several resolutions and MSAA sample counts.
+The camera follows the player of an input script or a replay, played headless first.
+
+    python -m benchmarks.render [--levels 1,2] [--resolutions 1280x720,1920x1080] [--samples 0,4]
+                                [--script benchmarks/scripts/run_right.json | --replay file.rpl]
+                                [--frames N] [--query-every N] [--out results.json]
+                                [--golden-dir benchmarks/golden] [--save-golden | --check-golden]
+
+Every resolution and sample count runs in its own process with a hidden window of
+that size, so the HUD and the minimap are laid out for it. Frame time includes
+glFinish. Draw calls are counted at the GL entry points arcade and pyglet use.
+Every --query-every frames each layer is drawn inside a GL query for its GPU time,
+primitives and samples passed, the pixels it filled without MSAA.
+
+Golden frames are PNGs of every --golden-every frame; --check-golden fails on frames
+whose mean difference from them is over --golden-tolerance. Moving platforms stay
+where the map put them, so golden frames depend on the path only.
+
+Set ARCADE_HEADLESS=1 to render with EGL without a display, or run under a software
+GL (LIBGL_ALWAYS_SOFTWARE=1) for frames that are the same on every machine.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import fmean
+from time import perf_counter
+
+import numpy as np
+import pyglet
+from PIL import Image
+
+from benchmarks.common import percentiles
+from base.batch import get_levels, setup_resources
+from base.camera import follow
+from base.level import Level
+from base.level_cache import LAYER_OPTIONS, load_scene
+from base.prefetch import get_map_path
+from base.replay import Replay, ReplayInput, apply_config
+from base.simulation import InputScript, SilentSoundPlayer, Simulation
+from entities.minimap import MiniMap
+from misc.config import AppConfig
+from views.components.game_ui import GameUI
+
+import arcade
+
+app_config = AppConfig()
+
+DEFAULT_SCRIPT = "benchmarks/scripts/run_right.json"
+DEFAULT_GOLDEN_DIR = "benchmarks/golden"
+PHASES = ("scene", "minimap", "hud", "resolve")
+DRAW_FUNCTIONS = ("glDrawArrays", "glDrawElements", "glDrawArraysInstanced", "glDrawElementsInstanced")
+
+
+class DrawCallCounter:
+    """Counts draw calls while installed, arcade calls them through pyglet.gl and pyglet imports them by name"""
+    def __init__(self):
+        self.calls: int = 0
+        self.originals: list[tuple[object, str, object]] = []
+
+    def install(self) -> None:
+        for module in (pyglet.gl, pyglet.graphics, pyglet.graphics.vertexdomain):
+            for name in DRAW_FUNCTIONS:
+                if hasattr(module, name):
+                    original = getattr(module, name)
+                    self.originals.append((module, name, original))
+                    setattr(module, name, self.counted(original))
+
+    def counted(self, function):
+        def draw(*args):
+            self.calls += 1
+            return function(*args)
+        return draw
+
+    def uninstall(self) -> None:
+        for module, name, original in self.originals:
+            setattr(module, name, original)
+        self.originals = []
+
+
+class OffscreenTarget:
+    """Framebuffer the frame is drawn into, multisampled ones are resolved into a plain one"""
+    def __init__(self, ctx: arcade.ArcadeContext, size: tuple[int, int], samples: int):
+        self.ctx = ctx
+        self.size = size
+        self.samples = samples
+        self.fbo = ctx.framebuffer(color_attachments=[ctx.texture(size, components=4, samples=samples)])
+        self.resolved = ctx.framebuffer(color_attachments=[ctx.texture(size, components=4)]) if samples else self.fbo
+
+    def resolve(self) -> None:
+        if self.samples:
+            self.ctx.copy_framebuffer(self.fbo, self.resolved)
+
+    def read_image(self) -> Image.Image:
+        data = self.resolved.read(components=4)
+        return Image.frombytes("RGBA", self.size, data).transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+
+
+def record_path(lvl: int, script, frames: int, score: int = 0, life_points: int | None = None) -> list[tuple]:
+    """(camera x, camera y, player x, player y) of every tick of a headless run"""
+    simulation = Simulation(lvl, script, score, life_points)
+    simulation.script.rewind()
+    level = simulation.level
+    path = []
+    while len(path) < frames and not simulation.done:
+        simulation.tick()
+        center = follow(
+            level.player_sprite.position,
+            (level.map_width, level.map_height),
+            (app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT)
+        )
+        path.append((*center, *level.player_sprite.position))
+    return path
+
+
+class FrameStats:
+    """CPU time and draw calls of the phases of a frame, GPU queries of the layers"""
+    def __init__(self, counter: DrawCallCounter):
+        self.counter = counter
+        self.times: dict[str, list[float]] = defaultdict(list)
+        self.draw_calls: dict[str, list[int]] = defaultdict(list)
+        self.layers: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+
+    @contextmanager
+    def phase(self, name: str):
+        calls = self.counter.calls
+        start = perf_counter()
+        yield
+        self.times[name].append(perf_counter() - start)
+        self.draw_calls[name].append(self.counter.calls - calls)
+
+    def add_layer(self, name: str, query) -> None:
+        layer = self.layers[name]
+        layer["gpu_ms"].append(query.time_elapsed / 1e6)
+        layer["primitives"].append(query.primitives_generated)
+        layer["samples_passed"].append(query.samples_passed)
+
+    def result(self) -> dict:
+        return {
+            "phases": {
+                name: {"cpu": percentiles(self.times[name]), "draw_calls": fmean(self.draw_calls[name])}
+                for name in PHASES
+            },
+            "layers": {
+                name: {stat: fmean(values) for stat, values in layer.items()}
+                for name, layer in self.layers.items()
+            },
+        }
+
+
+def compare_golden(image: Image.Image, path: Path) -> float:
+    """Mean difference from the golden frame, 0..1"""
+    golden = np.asarray(Image.open(path).convert("RGBA"), dtype=np.int16)
+    frame = np.asarray(image, dtype=np.int16)
+    if golden.shape != frame.shape:
+        return 1.0
+    return float(np.abs(frame - golden).mean() / 255)
+
+
+def render_level(window: arcade.Window, lvl: int, path: list[tuple], samples: int, args) -> dict:
+    ctx = window.ctx
+    size = window.get_framebuffer_size()
+    target = OffscreenTarget(ctx, size, samples)
+
+    level = Level(None, None, None, SilentSoundPlayer())
+    level.lvl = lvl
+    tile_map, scene = load_scene(get_map_path(lvl), app_config.SPRITE_SCALING_TILES, LAYER_OPTIONS)
+    level.build(tile_map, scene)
+
+    minimap = MiniMap()
+    minimap.setup((level.map_width, level.map_height))
+    minimap.set_sprite_lists(
+        tuple(scene[key] for key in app_config.MINIMAP_SPRITE_LISTS if key in scene),
+        tuple(scene[key] for key in app_config.MINIMAP_DYNAMIC_LISTS if key in scene)
+    )
+    minimap.minimap_on = True
+    # Static layers go into their texture once
+    minimap.update(0.0, level.player_sprite, level.layers_version)
+    game_ui = GameUI(level.ui_text_color)
+    game_ui.init(
+        level.score, level.life_points, level.coin_total, level.coin_count,
+        level.lvl, level.timer.left_text(), level.fruit_total, level.fruit_count
+    )
+
+    camera = arcade.Camera2D(render_target=target.fbo)
+    gui_camera = arcade.Camera2D(render_target=target.fbo)
+    queries = {name: ctx.query() for name in level.layers}
+    counter = DrawCallCounter()
+    stats = FrameStats(counter)
+    frame_times = []
+    golden_dir = Path(args.golden_dir) / f"{size[0]}x{size[1]}_msaa{samples}"
+    golden_diffs = {}
+    delta_time = 1 / app_config.PHYSICS_TICK_RATE
+
+    counter.install()
+    try:
+        for index, (camera_x, camera_y, player_x, player_y) in enumerate(path):
+            level.player_sprite.position = player_x, player_y
+            level.update_chunks((camera_x, camera_y))
+            level.animator.update(delta_time)
+            camera.position = camera_x, camera_y
+            query_frame = index % args.query_every == 0
+
+            start = perf_counter()
+            target.fbo.use()
+            target.fbo.clear(color=window.background_color)
+            with stats.phase("scene"), camera.activate():
+                for name, sprite_list in level.layers.items():
+                    if query_frame:
+                        with queries[name]:
+                            level.draw_layer(sprite_list)
+                    else:
+                        level.draw_layer(sprite_list)
+            with stats.phase("minimap"):
+                # The pass the game runs MINIMAP_REFRESH_RATE times a second
+                minimap.render(minimap.minimap_texture, minimap.dynamic_lists, (0, 0, 0, 0), level.player_sprite)
+                target.fbo.use()
+                with gui_camera.activate():
+                    minimap.draw()
+                    minimap.draw_outline()
+            with stats.phase("hud"), gui_camera.activate():
+                game_ui.draw()
+            with stats.phase("resolve"):
+                target.resolve()
+            ctx.finish()
+            frame_times.append(perf_counter() - start)
+
+            if query_frame:
+                for name, query in queries.items():
+                    stats.add_layer(name, query)
+
+            if (args.save_golden or args.check_golden) and index % args.golden_every == 0:
+                image = target.read_image()
+                golden_path = golden_dir / f"level_{lvl}_{index:05d}.png"
+                if args.save_golden:
+                    golden_dir.mkdir(parents=True, exist_ok=True)
+                    image.save(golden_path)
+                elif golden_path.is_file():
+                    golden_diffs[golden_path.name] = compare_golden(image, golden_path)
+    finally:
+        counter.uninstall()
+        window.use()
+
+    result = {"frames": len(path), "frame": percentiles(frame_times), **stats.result()}
+    if args.check_golden:
+        result["golden"] = golden_diffs
+    return result
+
+
+def run_single(args) -> dict:
+    """One resolution and sample count, in this process"""
+    width, height = (int(value) for value in args.resolution.split("x"))
+    app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT = width, height
+    window = arcade.Window(width, height, visible=False)
+    setup_resources()
+
+    paths = {}
+    if args.replay:
+        replay = Replay.load(args.replay)
+        apply_config(replay)
+        app_config.WINDOW_WIDTH, app_config.WINDOW_HEIGHT = width, height
+        header = replay.header
+        paths[replay.lvl] = record_path(replay.lvl, ReplayInput(replay), args.frames, header["score"], header["life_points"])
+    else:
+        script = InputScript.load(args.script)
+        levels = [int(lvl) for lvl in args.levels.split(",")] if args.levels else get_levels()
+        for lvl in levels:
+            paths[lvl] = record_path(lvl, script, args.frames)
+
+    return {
+        "resolution": [width, height],
+        "samples": args.samples_single,
+        "renderer": window.ctx.info.RENDERER,
+        "levels": {str(lvl): render_level(window, lvl, path, args.samples_single, args) for lvl, path in paths.items()},
+    }
+
+
+def print_run(run: dict) -> None:
+    width, height = run["resolution"]
+    print(f"{width}x{height}, MSAA {run['samples']}, {run['renderer']}")
+    print(f"{'level':<7}{'frame p50':>10}{'p99, ms':>9}" + "".join(f"{phase:>10}" for phase in PHASES) + f"{'calls':>7}")
+    for lvl, result in run["levels"].items():
+        phases = result["phases"]
+        calls = sum(phase["draw_calls"] for phase in phases.values())
+        print(
+            f"{lvl:<7}{result['frame']['p50'] * 1e3:>10.2f}{result['frame']['p99'] * 1e3:>9.2f}"
+            + "".join(f"{phases[phase]['cpu']['p50'] * 1e3:>10.2f}" for phase in PHASES)
+            + f"{calls:>7.0f}"
+        )
+        busiest = sorted(result["layers"].items(), key=lambda item: -item[1]["samples_passed"])[:3]
+        print(f"{'':<7}most filled: " + ", ".join(
+            f"{name} {layer['samples_passed'] / 1e3:.0f}k samples {layer['gpu_ms']:.2f} ms" for name, layer in busiest
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen draw cost of the levels")
+    parser.add_argument("--levels", help="comma separated level numbers, all levels by default")
+    parser.add_argument("--resolutions", default="1280x720,1920x1080")
+    parser.add_argument("--samples", default="0,4", help="MSAA sample counts")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    parser.add_argument("--replay", help="follow a recorded level instead of the script")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--query-every", type=int, default=10)
+    parser.add_argument("--out", help="JSON file for the results")
+    parser.add_argument("--golden-dir", default=DEFAULT_GOLDEN_DIR)
+    parser.add_argument("--golden-every", type=int, default=120)
+    parser.add_argument("--golden-tolerance", type=float, default=0.01)
+    golden = parser.add_mutually_exclusive_group()
+    golden.add_argument("--save-golden", action="store_true")
+    golden.add_argument("--check-golden", action="store_true")
+    # A run of one resolution and sample count, started by the parent process
+    parser.add_argument("--resolution", help=argparse.SUPPRESS)
+    parser.add_argument("--samples-single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--part", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.part:
+        Path(args.part).write_text(json.dumps(run_single(args)))
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for resolution in args.resolutions.split(","):
+            for samples in (int(value) for value in args.samples.split(",")):
+                part = Path(tmp) / f"{resolution}_{samples}.json"
+                command = [
+                    sys.executable, "-m", "benchmarks.render", *sys.argv[1:],
+                    "--resolution", resolution, "--samples-single", str(samples), "--part", str(part),
+                ]
+                subprocess.run(command, check=True)
+                run = json.loads(part.read_text())
+                print_run(run)
+                runs.append(run)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"runs": runs}, indent=2))
+
+    if args.check_golden:
+        failed = [
+            (run["resolution"], run["samples"], name, diff)
+            for run in runs for result in run["levels"].values()
+            for name, diff in result["golden"].items() if diff > args.golden_tolerance
+        ]
+        checked = sum(len(result["golden"]) for run in runs for result in run["levels"].values())
+        for resolution, samples, name, diff in failed:
+            print(f"GOLDEN MISMATCH {resolution[0]}x{resolution[1]} MSAA {samples} {name}: {diff:.2%}")
+        print(f"{checked} golden frames checked, {len(failed)} differ")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
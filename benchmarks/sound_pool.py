@@ -0,0 +1,102 @@
+"""
+Stress test of sound effects: thousands of jumps fired a few per frame, through
+arcade.play_sound (a new Player every time) and through the SoundPlayer voice pool.
+Checks that the pool never has more players than voices and that memory stays flat.
+
+    python -m benchmarks.sound_pool [--effects N] [--per-frame N] [--voices N]
+
+Runs with whatever audio driver pyglet finds, the silent one included.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import weakref
+from time import perf_counter
+
+import pyglet
+
+from benchmarks.common import percentiles
+from misc.sound_player import EffectPool
+
+import arcade
+
+# Memory the pool may gain over the whole run, the rest of the growth is a leak
+MEMORY_LIMIT = 256 * 1024
+FRAME = 1 / 60
+
+
+def pump() -> None:
+    """What the event loop does between frames: end of sound events and scheduled calls"""
+    pyglet.app.platform_event_loop.dispatch_posted_events()
+    pyglet.clock.tick()
+
+
+def fire(play, effects: int, per_frame: int) -> dict[str, float]:
+    players = weakref.WeakSet()
+    peak_alive = 0
+    times = []
+
+    gc.collect()
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+
+    fired = 0
+    while fired < effects:
+        frame_start = perf_counter()
+        for _ in range(min(per_frame, effects - fired)):
+            t = perf_counter()
+            players.add(play())
+            times.append(perf_counter() - t)
+            fired += 1
+        pump()
+        peak_alive = max(peak_alive, len(players))
+        time.sleep(max(0.0, FRAME - (perf_counter() - frame_start)))
+
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - start_memory
+    tracemalloc.stop()
+
+    result = percentiles(times)
+    result.update({"players": len(players), "peak_players": peak_alive, "memory": growth})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--effects", type=int, default=3000)
+    parser.add_argument("--per-frame", type=int, default=10)
+    parser.add_argument("--voices", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"audio driver: {type(pyglet.media.get_audio_driver()).__name__}")
+    sound = arcade.load_sound("data/sounds/jump.wav")
+    pool = EffectPool(sound, args.voices)
+
+    results = {
+        "play_sound": fire(lambda: arcade.play_sound(sound), args.effects, args.per_frame),
+        "pool": fire(lambda: pool.play(1.0), args.effects, args.per_frame),
+    }
+
+    print(f"{'':<12}{'p50, us':>10}{'p99, us':>10}{'players':>10}{'peak':>8}{'memory, KB':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<12}{result['p50'] * 1e6:>10.1f}{result['p99'] * 1e6:>10.1f}"
+            f"{result['players']:>10}{result['peak_players']:>8}{result['memory'] / 1024:>12.1f}"
+        )
+    print(f"pool: {pool.plays} plays, {pool.steals} voices stolen")
+
+    result = results["pool"]
+    errors = []
+    if result["peak_players"] > args.voices:
+        errors.append(f"pool had {result['peak_players']} players alive, {args.voices} voices allowed")
+    if result["memory"] > MEMORY_LIMIT:
+        errors.append(f"memory grew by {result['memory'] / 1024:.1f} KB, limit {MEMORY_LIMIT / 1024:.0f} KB")
+    for error in errors:
+        print(f"FAIL: {error}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
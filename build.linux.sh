@@ -1,9 +1,11 @@
+python -m misc.asset_pack data build/data.pack
+
 python -m nuitka app.py \
 --onefile \
 --enable-plugin=numpy \
 --include-package=arcade.gl.backends.opengl \
 --include-data-files=".env"=".env" \
---include-data-dir=data=data \
+--include-data-files=build/data.pack=data.pack \
 --follow-imports \
 --linux-icon=data/misc/paw.png \
 --output-dir=./build \
@@ -1 +1,3 @@
-python -m nuitka app.py --onefile --include-package=arcade.gl.backends.opengl --include-data-files=".env"=".env" --include-data-dir=data=data --follow-imports --windows-icon-from-ico=data/misc/paw.png --output-dir=build-win --remove-output  --mingw64 --windows-console-mode=disable
\ No newline at end of file
+python -m misc.asset_pack data build-win/data.pack
+
+python -m nuitka app.py --onefile --include-package=arcade.gl.backends.opengl --include-data-files=".env"=".env" --include-data-files=build-win/data.pack=data.pack --follow-imports --windows-icon-from-ico=data/misc/paw.png --output-dir=build-win --remove-output  --mingw64 --windows-console-mode=disable
\ No newline at end of file
@@ -1,5 +1,6 @@
 mkdir -p release
 rm ./release/* 2> /dev/null
 cp ./build/app.bin ./app.bin
-tar --exclude='./data/app.tiled-*' -cjvf release/sonya-adventures.linux-x86_64.bz2 ./data ./app.bin
-rm ./app.bin
+cp ./build/data.pack ./data.pack
+tar -cjvf release/sonya-adventures.linux-x86_64.bz2 ./data.pack ./app.bin
+rm ./app.bin ./data.pack
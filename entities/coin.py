@@ -1,29 +1,27 @@
-from itertools import count
-from typing import Any, Tuple
-
-import arcade
 from arcade import SpriteList, Sprite
 
+from base.animation import AnimationGroup, Animator, Clip
 from entities.gatherable import Gatherable
-from misc.app_utils import Counter
+from misc.texture_registry import TextureRegistry
 
 MAIN_PATH = "data/tilesets/coins"
 SPRITE_COUNT = 12
-TICK_SCALING = 20
+# Seconds each frame of the spin is shown
+FRAME_DURATION = 1 / 3
 COIN_SCORE_COEFFICIENT = 50
+TEXTURE_OWNER = "coins"
 
-c = Counter((SPRITE_COUNT-1) * TICK_SCALING)
 
 class CoinList(Gatherable):
-    def __init__(self, obj):
-        super().__init__(obj, COIN_SCORE_COEFFICIENT)
+    def __init__(self, obj, active=None, animator: Animator | None = None):
+        super().__init__(obj, COIN_SCORE_COEFFICIENT, active, "coin")
         self.obj: SpriteList[Sprite]= obj
+        registry = TextureRegistry()
         self.coin_textures = []
-        for i in range(12):
-            texture = arcade.load_texture(f"{MAIN_PATH}/coin_{i}.png")
-            self.coin_textures.append(texture)
+        for i in range(SPRITE_COUNT):
+            self.coin_textures.append(registry.get(f"{MAIN_PATH}/coin_{i}.png", TEXTURE_OWNER))
 
-    def check_or_update_pic(self):
-        n = c.tick()
-        for coin in self.obj:
-            coin.texture = self.coin_textures[n//20]
+        # Only the coins of active chunks spin, the level refreshes the frame of the ones that come in
+        self.animation: AnimationGroup | None = None
+        if animator is not None:
+            self.animation = animator.add(Clip(self.coin_textures, FRAME_DURATION), self.active)
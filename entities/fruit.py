@@ -8,6 +8,6 @@ FRUIT_SCORE_COEFFICIENT = 100
 
 
 class FruitList(Gatherable):
-    def __init__(self, obj):
-        super().__init__(obj, FRUIT_SCORE_COEFFICIENT)
+    def __init__(self, obj, active=None):
+        super().__init__(obj, FRUIT_SCORE_COEFFICIENT, active, "fruit")
         self.obj: arcade.SpriteList = obj
@@ -1,5 +1,5 @@
 import logging
-from typing import Tuple
+from typing import Iterable, Tuple
 
 import arcade
 
@@ -7,20 +7,21 @@ logger = logging.getLogger(__name__)
 
 
 class Gatherable:
-    def __init__(self, obj, score_coef):
+    def __init__(self, obj, score_coef, active=None, collision_type: str = "item"):
         self.obj: arcade.SpriteList[arcade.Sprite] = obj
+        # Part of obj in active chunks of the level
+        self.active: arcade.SpriteList[arcade.Sprite] = obj if active is None else active
         self.score_coef: int = score_coef
+        # Collision type of the sensors the physics engine keeps for the sprites
+        self.collision_type: str = collision_type
 
-    def remove_touched(
+    def collect(
             self,
-            player_sprite: arcade.Sprite
+            items: Iterable[arcade.Sprite]
     ) -> tuple[int, int, int]:
-        hit_list: list[arcade.Sprite] = arcade.check_for_collision_with_list(
-            player_sprite, self.obj
-        )
-
+        """Removes the items the player picked up, returns the score, items left and items picked up"""
         delta_count = 0
-        for item in hit_list:
+        for item in items:
             item.remove_from_sprite_lists()
             logger.debug(f"item {item.properties.get('name')}:{item.properties} removed")
             delta_count += 1
@@ -6,6 +6,6 @@ HEART_SCORE_COEFFICIENT = 0
 
 
 class HeartList(Gatherable):
-    def __init__(self, obj):
-        super().__init__(obj, HEART_SCORE_COEFFICIENT)
+    def __init__(self, obj, active=None):
+        super().__init__(obj, HEART_SCORE_COEFFICIENT, active, "heart")
         self.obj: arcade.SpriteList = obj
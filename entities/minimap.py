@@ -1,3 +1,4 @@
+import math
 import uuid
 import logging
 
@@ -10,12 +11,25 @@ app_config = AppConfig()
 
 
 class MiniMap():
+    """
+    Static layers are rendered into their own texture once and again only when
+    the level says they changed. The player marker, moving platforms and items
+    go into a transparent overlay drawn over it, MINIMAP_REFRESH_RATE times a second.
+    Nothing is rendered while the minimap is hidden.
+    """
     def __init__(self):
         self.sprite_list: arcade.SpriteList | None = None
-        self.sprite_lists: tuple | None = None
+        self.static_lists: tuple[arcade.SpriteList, ...] = ()
+        self.dynamic_lists: tuple[arcade.SpriteList, ...] = ()
+        self.static_texture: arcade.Texture | None = None
         self.minimap_texture: arcade.Texture | None = None
+        self.static_sprite: arcade.Sprite | None = None
         self.sprite: arcade.Sprite | None = None
         self.minimap_on: bool | None = None
+        # Layers version the static texture was rendered for
+        self.static_version: int | None = None
+        self.refresh_interval: float = 1 / app_config.MINIMAP_REFRESH_RATE if app_config.MINIMAP_REFRESH_RATE else 0
+        self.since_refresh: float = math.inf
         self.minimap_size: Size | None = None
         self.map_size: Size | None = None
         self.rect: arcade.Rect | None = None
@@ -31,6 +45,12 @@ class MiniMap():
 
         logger.info(f"minimap {self.minimap_size}")
 
+        self.static_texture = arcade.Texture.create_empty(
+            str(uuid.uuid4()), self.minimap_size.get_tuple
+        )
+        self.static_sprite = arcade.Sprite(self.static_texture)
+        self.static_sprite.position = self.get_coord()
+
         self.minimap_texture = arcade.Texture.create_empty(
             str(uuid.uuid4()), self.minimap_size.get_tuple
         )
@@ -43,6 +63,7 @@ class MiniMap():
         self.sprite.position = self.get_coord()
 
         self.sprite_list = arcade.SpriteList()
+        self.sprite_list.append(self.static_sprite)
         self.sprite_list.append(self.sprite)
 
         self.rect = arcade.shape_list.create_rectangle_outline(
@@ -60,19 +81,45 @@ class MiniMap():
         )
 
 
-    def update(self, player_sprite):
+    def set_sprite_lists(self, static_lists: tuple[arcade.SpriteList, ...], dynamic_lists: tuple[arcade.SpriteList, ...]):
+        self.static_lists = static_lists
+        self.dynamic_lists = dynamic_lists
+        self.static_version = None
+
+    def toggle(self):
+        self.minimap_on = not self.minimap_on
+        # Shown right away, not at the next refresh
+        self.since_refresh = math.inf
+
+    def update(self, delta_time: float, player_sprite, layers_version: int = 0):
+        if not self.minimap_on:
+            return
+
+        if layers_version != self.static_version:
+            self.render(self.static_texture, self.static_lists, app_config.MENU_BACKGROUND_COLOR)
+            self.static_version = layers_version
+
+        self.since_refresh += delta_time
+        if self.since_refresh < self.refresh_interval:
+            return
+        self.since_refresh = 0
+
+        self.render(self.minimap_texture, self.dynamic_lists, (0, 0, 0, 0), player_sprite)
+
+    def render(self, texture: arcade.Texture, sprite_lists: tuple[arcade.SpriteList, ...], color, player_sprite=None):
         proj = 0, self.map_size.x, 0, self.map_size.y
         atlas: arcade.texture_atlas.TextureAtlasBase = self.sprite_list.atlas
-        with atlas.render_into(self.minimap_texture, projection=proj) as fbo:
-            fbo.clear(color=app_config.MENU_BACKGROUND_COLOR)
-            for sprite_list in self.sprite_lists:
+        with atlas.render_into(texture, projection=proj) as fbo:
+            fbo.clear(color=color)
+            for sprite_list in sprite_lists:
                 sprite_list.draw()
-            arcade.draw_point(
-                player_sprite.position[0],
-                player_sprite.position[1] - 32,
-                color=arcade.csscolor.MAGENTA,
-                size=50
-            )
+            if player_sprite is not None:
+                arcade.draw_point(
+                    player_sprite.position[0],
+                    player_sprite.position[1] - 32,
+                    color=arcade.csscolor.MAGENTA,
+                    size=50
+                )
 
     def draw(self):
         self.sprite_list.draw()
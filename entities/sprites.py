@@ -2,7 +2,9 @@ from typing import Tuple
 
 import arcade
 
+from base.animation import Clip
 from misc.config import AppConfig
+from misc.texture_registry import TextureRegistry
 import misc.app_utils as utils
 from controllers.controller import GameController
 
@@ -11,6 +13,9 @@ from controllers.controller import GameController
 LEFT_FACING = 1
 RIGHT_FACING = 0
 
+# Player textures are held for the whole run
+TEXTURE_OWNER = "player"
+
 app_config = AppConfig()
 
 
@@ -23,25 +28,21 @@ class PlayerSprite(arcade.Sprite):
         super().__init__(scale=app_config.SPRITE_SCALING_PLAYER)
 
         main_path = f"data/tilesets/{app_config.PLAYER_SPRITE}/{app_config.PLAYER_SPRITE}"
+        registry = TextureRegistry()
 
-        # Load textures for jump, and fall states
-        jump_texture = arcade.load_texture(f"{main_path}_walk0.png")
-        fall_texture = arcade.load_texture(f"{main_path}_walk1.png")
-        # Make pairs of textures facing left and right
-        self.jump_texture_pair = jump_texture, jump_texture.flip_left_right()
-        self.fall_texture_pair = fall_texture, fall_texture.flip_left_right()
+        # Pairs of textures facing left and right for jump, and fall states
+        self.jump_texture_pair = registry.get_pair(f"{main_path}_walk0.png", TEXTURE_OWNER)
+        self.fall_texture_pair = registry.get_pair(f"{main_path}_walk1.png", TEXTURE_OWNER)
 
         self.idle_textures = []
 
         for i in range(app_config.IDLE_SPRITE_COUNT):
-            texture = arcade.load_texture(f"{main_path}_idle{i}.png")
-            self.idle_textures.append((texture, texture.flip_left_right()))
+            self.idle_textures.append(registry.get_pair(f"{main_path}_idle{i}.png", TEXTURE_OWNER))
 
-        # Load textures for walking and make pairs of textures facing left and right
+        # Textures for walking, pairs facing left and right
         self.walk_textures = []
         for i in range(app_config.WALK_SPRITE_COUNT):
-            texture = arcade.load_texture(f"{main_path}_walk{i}.png")
-            self.walk_textures.append((texture, texture.flip_left_right()))
+            self.walk_textures.append(registry.get_pair(f"{main_path}_walk{i}.png", TEXTURE_OWNER))
 
         # Set the initial texture
         self.texture = self.idle_textures[0][0]
@@ -52,8 +53,9 @@ class PlayerSprite(arcade.Sprite):
         # Index of our current walk texture
         self.cur_walk_texture = 0
 
-        # Index of our current idle texture
-        self.cur_idle_texture = 0
+        # Idle texture pairs by game time
+        self.idle_clip = Clip(self.idle_textures, app_config.IDLE_FRAME_DURATION)
+        self.animation_time: float = 0.0
 
         # How far have we traveled horizontally since changing the texture
         self.x_odometer = 0
@@ -85,12 +87,9 @@ class PlayerSprite(arcade.Sprite):
                 self.texture = self.fall_texture_pair[self.character_face_direction]
                 return
 
-        # Idle animation
+        # Idle animation, the texture setter skips the same texture
         if abs(dx) <= app_config.DEAD_ZONE:
-            self.cur_idle_texture += 1
-            if self.cur_idle_texture >= app_config.IDLE_SPRITE_COUNT * app_config.IDLE_PIC_COUNTER_COEF:
-                self.cur_idle_texture = 0
-            self.texture = self.idle_textures[self.cur_idle_texture // app_config.IDLE_PIC_COUNTER_COEF][self.character_face_direction]
+            self.texture = self.idle_clip.frame_at(self.animation_time)[self.character_face_direction]
             return
 
         # Have we moved far enough to change the texture?
@@ -104,6 +103,10 @@ class PlayerSprite(arcade.Sprite):
                 self.cur_walk_texture = 0
             self.texture = self.walk_textures[self.cur_walk_texture][self.character_face_direction]
 
+    def update_animation(self, delta_time: float = 1 / 60, *args, **kwargs) -> None:
+        """Advances the game time the idle clip is played by, the level calls it every update"""
+        self.animation_time += delta_time
+
     def move_to_default_location(self, default_position: str | None) -> None:
         if default_position is None:
             default_position = app_config.PLAYER_SPRITE_DEFAULT_POSITION
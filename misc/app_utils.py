@@ -1,17 +1,21 @@
+import threading
 from typing import Any, Callable, Iterator, List, Tuple
 
 from PIL import Image
 
 def singleton(cls):
     """
-    Simple Singleton impl
+    Simple Singleton impl, safe to call from background threads
     :param cls: class
     :return: instance of cls
     """
     instances = {}
+    lock = threading.RLock()
     def get_instance(*args, **kwargs):
         if cls not in instances:
-            instances[cls] = cls(*args, **kwargs)
+            with lock:
+                if cls not in instances:
+                    instances[cls] = cls(*args, **kwargs)
         return instances[cls]
     return get_instance
 
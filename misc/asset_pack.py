@@ -0,0 +1,234 @@
+"""
+Game data in a single file: a header with the index of files, then their bytes.
+The pack is memory-mapped and mounted as a resource handle over the directory it
+was packed from: loaders below read from it the files that would be under that
+directory, with or without the handle prefix, and fall back to the file system
+for everything else.
+
+    python -m misc.asset_pack data build/data.pack
+"""
+import argparse
+import io
+import json
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+import arcade
+import pyglet
+from arcade.resources import get_resource_handle_paths
+
+logger = logging.getLogger(__name__)
+
+# Directory of the game's code, a onefile build extracts its data files there
+APP_DIR = Path(__file__).resolve().parent.parent
+
+MAGIC = b"PAWPACK1"
+# Magic and the size of the json index that follows
+HEADER = struct.Struct("<8sI")
+
+
+class AssetPack:
+    """Read only view of a pack file. Index entries are name -> (offset, size, mtime_ns)."""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_size = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError(f"{self.path} is not an asset pack")
+        self.base = HEADER.size + index_size
+        index = json.loads(self.data[HEADER.size:self.base])
+        self.entries: dict[str, tuple[int, int, int]] = {name: tuple(entry) for name, entry in index.items()}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def read(self, name: str) -> memoryview:
+        offset, size, _ = self.entries[name]
+        return memoryview(self.data)[self.base + offset:self.base + offset + size]
+
+    def close(self) -> None:
+        self.data.close()
+
+
+# Directory the pack stands in for -> the pack
+mounts: dict[Path, AssetPack] = {}
+# Resource handle -> directory of its pack, the directory itself doesn't have to exist
+handles: dict[str, Path] = {}
+
+
+def mount(handle: str, root: str | Path, pack_path: str | Path) -> AssetPack:
+    """Serve files under root and under :handle: from the pack"""
+    pack = AssetPack(pack_path)
+    root = Path(os.path.abspath(root))
+    mounts[root] = pack
+    handles[handle] = root
+    logger.info(f"asset pack {pack.path} mounted as :{handle}: at {root}, {len(pack.entries)} files")
+    return pack
+
+
+def get_search_dirs() -> list[Path]:
+    """Where a relative pack path is looked for: the code, the executable of a build, the working directory"""
+    dirs = [APP_DIR]
+    compiled = globals().get("__compiled__")
+    if compiled is not None:
+        dirs.append(Path(compiled.containing_dir))
+    dirs.append(Path(os.getcwd()))
+    return list(dict.fromkeys(dirs))
+
+
+def find_pack(pack_path: str | Path) -> Path | None:
+    pack_path = Path(pack_path)
+    if pack_path.is_absolute():
+        candidates = [pack_path]
+    else:
+        candidates = [directory / pack_path for directory in get_search_dirs()]
+    return next((candidate for candidate in candidates if candidate.is_file()), None)
+
+
+def setup_data(pack_path: str | None, data_dir: str | Path) -> AssetPack | None:
+    """The pack as :data: when one is configured and found, the data directory otherwise"""
+    if pack_path:
+        found = find_pack(pack_path)
+        if found is not None:
+            return mount("data", data_dir, found)
+        searched = ", ".join(str(directory) for directory in get_search_dirs())
+        logger.warning(f"asset pack {pack_path} not found in {searched}, reading files from {data_dir}")
+    arcade.resources.add_resource_handle("data", os.path.abspath(data_dir))
+    return None
+
+
+def unmount_all() -> None:
+    for pack in mounts.values():
+        pack.close()
+    mounts.clear()
+    handles.clear()
+
+
+def find(path: Path) -> tuple[AssetPack, str] | None:
+    for root, pack in mounts.items():
+        if path.is_relative_to(root):
+            name = path.relative_to(root).as_posix()
+            if name in pack:
+                return pack, name
+    return None
+
+
+def resolve(path: str | Path) -> Path:
+    """
+    Absolute path like arcade.resources.resolve gives, except that files
+    in a mounted pack don't have to exist on disk.
+    """
+    if isinstance(path, str) and path.strip().startswith(":"):
+        handle, resource = path.strip()[1:].split(":", 1)
+        resource = resource.lstrip("/\\")
+        # The pack first, then arcade handle paths, later ones override earlier ones as in arcade
+        handle_paths = [handles[handle]] if handle in handles else []
+        if handle in arcade.resources.handles:
+            handle_paths += reversed(get_resource_handle_paths(handle))
+        for handle_path in handle_paths:
+            candidate = Path(os.path.abspath(handle_path / resource))
+            if find(candidate) is not None or candidate.exists():
+                return candidate
+        raise FileNotFoundError(f"Cannot locate resource '{resource}' using handle '{handle}'")
+    return Path(os.path.abspath(path))
+
+
+def exists(path: str | Path) -> bool:
+    try:
+        path = resolve(path)
+    except FileNotFoundError:
+        return False
+    return find(path) is not None or path.exists()
+
+
+def open_binary(path: str | Path) -> BinaryIO:
+    path = resolve(path)
+    found = find(path)
+    if found is None:
+        return open(path, "rb")
+    pack, name = found
+    return io.BytesIO(pack.read(name))
+
+
+def read_bytes(path: str | Path) -> bytes:
+    path = resolve(path)
+    found = find(path)
+    if found is None:
+        return path.read_bytes()
+    pack, name = found
+    return bytes(pack.read(name))
+
+
+def stat(path: str | Path) -> tuple[int, int]:
+    """(mtime_ns, size) of the file, packed files keep the ones they had when packed"""
+    path = resolve(path)
+    found = find(path)
+    if found is None:
+        result = path.stat()
+        return result.st_mtime_ns, result.st_size
+    pack, name = found
+    _, size, mtime_ns = pack.entries[name]
+    return mtime_ns, size
+
+
+def load_font(path: str | Path) -> None:
+    pyglet.font.add_file(read_bytes(path))
+
+
+class PackedSound(arcade.Sound):
+    """arcade.Sound decoded from memory, arcade.Sound itself only reads files from disk"""
+    def __init__(self, file_name: str, data: bytes, streaming: bool = False):
+        self.file_name = file_name
+        self.source = pyglet.media.load(file_name, file=io.BytesIO(data), streaming=streaming)
+        if self.source.duration is None:
+            raise ValueError("Audio duration must be known when loaded, but this audio source returned `None`")
+        # Same as arcade.Sound, for 2D panning with 3D audio
+        self.min_distance = 100000000
+
+
+def load_sound(path: str | Path, streaming: bool = False) -> arcade.Sound:
+    """Decodes only, unlike arcade.load_sound it doesn't open the audio driver: safe off the main thread"""
+    resolved = resolve(path)
+    if find(resolved) is None:
+        return arcade.Sound(resolved, streaming)
+    return PackedSound(str(resolved), read_bytes(resolved), streaming)
+
+
+def write_pack(source_dir: str | Path, pack_path: str | Path) -> dict[str, int]:
+    """Pack every file under source_dir, names are paths relative to it"""
+    source_dir = Path(source_dir)
+    files = sorted(path for path in source_dir.rglob("*") if path.is_file())
+
+    index = {}
+    offset = 0
+    for path in files:
+        result = path.stat()
+        index[path.relative_to(source_dir).as_posix()] = [offset, result.st_size, result.st_mtime_ns]
+        offset += result.st_size
+    index_bytes = json.dumps(index, separators=(",", ":")).encode()
+
+    pack_path = Path(pack_path)
+    pack_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(pack_path, "wb") as pack:
+        pack.write(HEADER.pack(MAGIC, len(index_bytes)))
+        pack.write(index_bytes)
+        for path in files:
+            pack.write(path.read_bytes())
+
+    return {"files": len(files), "index": len(index_bytes), "size": pack_path.stat().st_size}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a data directory into a single asset pack")
+    parser.add_argument("source", help="directory to pack, e.g. data")
+    parser.add_argument("pack", help="pack file to write, e.g. build/data.pack")
+    args = parser.parse_args()
+    stats = write_pack(args.source, args.pack)
+    print(f"{args.pack}: {stats['files']} files, index {stats['index']} bytes, {stats['size']} bytes total")
@@ -1,10 +1,10 @@
 import os
 import misc.app_utils as utils
 
-import arcade.color
 from dotenv import load_dotenv
 load_dotenv()
 
+from . import asset_pack
 from .app_utils import singleton
 
 font_paths = {
@@ -30,6 +30,22 @@ class AppConfig:
         self.VSYNC = os.environ.get("VSYNC").lower().strip() == "true"
         self.ANTIALIASING = os.environ.get("ANTIALIASING").lower().strip() == "true"
         self.SAMPLES = int(os.environ.get("SAMPLES"))
+        self.FRAME_RATE = int(os.environ.get("FRAME_RATE"))
+
+        # Fixed timestep of the game
+        self.PHYSICS_TICK_RATE = int(os.environ.get("PHYSICS_TICK_RATE"))
+        self.PHYSICS_SUBSTEPS = int(os.environ.get("PHYSICS_SUBSTEPS"))
+        self.PHYSICS_MAX_STEPS = int(os.environ.get("PHYSICS_MAX_STEPS"))
+        self.RENDER_INTERPOLATION = int(os.environ.get("RENDER_INTERPOLATION"))
+        self.REPLAY_RECORD = int(os.environ.get("REPLAY_RECORD"))
+        self.REPLAY_DIR = os.path.expanduser(os.environ.get("REPLAY_DIR"))
+        self.REPLAY_KEEP = int(os.environ.get("REPLAY_KEEP"))
+        self.PHYSICS_SLEEP_TIME = float(os.environ.get("PHYSICS_SLEEP_TIME"))
+        self.PHYSICS_IDLE_SPEED = float(os.environ.get("PHYSICS_IDLE_SPEED"))
+        self.PHYSICS_LOD_DISTANCE = int(os.environ.get("PHYSICS_LOD_DISTANCE"))
+        self.PHYSICS_LOD_INTERVAL = int(os.environ.get("PHYSICS_LOD_INTERVAL"))
+        self.PHYSICS_BROADPHASE = os.environ.get("PHYSICS_BROADPHASE")
+        self.COLLISION_IGNORE = os.environ.get("COLLISION_IGNORE")
 
         # Player sprite
         self.PLAYER_SPRITE = os.environ.get("PLAYER_SPRITE")
@@ -46,8 +62,8 @@ class AppConfig:
             self.WALK_SPRITE_COUNT = 32
             self.IDLE_SPRITE_COUNT = 16
 
-        # Change idle pic counter coefficient
-        self.IDLE_PIC_COUNTER_COEF = 50
+        # Seconds each idle frame is shown
+        self.IDLE_FRAME_DURATION = 50 / 60
 
         # --- Physics forces. Higher number, faster accelerating
 
@@ -99,6 +115,14 @@ class AppConfig:
         self.MINIMAP_BACKGROUND_COLOR = utils.str_to_tuple(os.environ.get("MINIMAP_BACKGROUND_COLOR"), int)
         self.MINIMAP_WIDTH_PART = float(os.environ.get("MINIMAP_WIDTH_PART"))
         self.MINIMAP_SPRITE_LISTS: list[str] = utils.str_to_list(os.environ.get("MINIMAP_SPRITE_LISTS"))
+        self.MINIMAP_DYNAMIC_LISTS: list[str] = utils.str_to_list(os.environ.get("MINIMAP_DYNAMIC_LISTS"))
+        self.MINIMAP_REFRESH_RATE = int(os.environ.get("MINIMAP_REFRESH_RATE"))
+
+        self.HUD_CACHE = int(os.environ.get("HUD_CACHE"))
+
+        self.MENU_RENDER_ON_DEMAND = int(os.environ.get("MENU_RENDER_ON_DEMAND"))
+        self.MENU_IDLE_UPDATE_RATE = int(os.environ.get("MENU_IDLE_UPDATE_RATE"))
+        self.UNFOCUSED_FPS = int(os.environ.get("UNFOCUSED_FPS"))
 
         self.MINIMAP_POS_X = int(os.environ.get("MINIMAP_POS_X"))
         self.MINIMAP_POS_Y = int(os.environ.get("MINIMAP_POS_Y"))
@@ -107,17 +131,43 @@ class AppConfig:
 
         self.TIMER_ON = int(os.environ.get("TIMER_ON"))
 
+        self.COLLISION_MERGE = int(os.environ.get("COLLISION_MERGE"))
+
+        self.LEVEL_CACHE = int(os.environ.get("LEVEL_CACHE"))
+        self.LEVEL_CACHE_DIR = os.path.expanduser(os.environ.get("LEVEL_CACHE_DIR"))
+
+        self.GPU_TILEMAP = int(os.environ.get("GPU_TILEMAP"))
+        self.STATIC_LAYERS: list[str] = utils.str_to_list(os.environ.get("STATIC_LAYERS"))
+
+        self.LEVEL_PREFETCH = int(os.environ.get("LEVEL_PREFETCH"))
+        self.LEVEL_PREFETCH_AT = float(os.environ.get("LEVEL_PREFETCH_AT"))
+
+        self.TEXTURE_BUDGET_MB = int(os.environ.get("TEXTURE_BUDGET_MB"))
+
+        self.ASSET_PACK = os.environ.get("ASSET_PACK")
+
+        self.CHUNKS = int(os.environ.get("CHUNKS"))
+        self.CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE"))
+        self.CHUNK_RADIUS = int(os.environ.get("CHUNK_RADIUS"))
+
         self.FONT_NAME = os.environ.get("FONT_NAME")
         self.FONT_COLOR = utils.str_to_tuple(os.environ.get("FONT_COLOR"), int)
         self.MENU_FONT_NAMES = utils.str_to_tuple(os.environ.get("MENU_FONT_NAMES"))
         self.MENU_FONT_SIZE = int(os.environ.get("MENU_FONT_SIZE"))
 
+        self.game_fonts_loaded: bool = False
+
     def load_fonts(self):
         for name in self.MENU_FONT_NAMES:
             if self.FONT_NAME in font_paths:
-                arcade.load_font(font_paths[self.FONT_NAME])
+                asset_pack.load_font(font_paths[self.FONT_NAME])
 
             if name in font_paths and self.FONT_NAME != name:
-                arcade.load_font(font_paths[name])
-
-        arcade.load_font("./data/fonts/seguiemj.ttf")
+                asset_pack.load_font(font_paths[name])
+
+    def load_game_fonts(self):
+        """Fonts only the game screen needs, loaded once after the menu is up"""
+        if self.game_fonts_loaded:
+            return
+        asset_pack.load_font("./data/fonts/seguiemj.ttf")
+        self.game_fonts_loaded = True
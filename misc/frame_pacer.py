@@ -0,0 +1,122 @@
+import logging
+
+from misc.app_utils import singleton
+from misc.config import AppConfig
+
+import arcade
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+# Frames drawn after an input event, the UI changes its look on the frame after the event
+REDRAW_FRAMES = 2
+# A window that doesn't need drawing is still redrawn this often, in seconds
+IDLE_DRAW_INTERVAL = 1.0
+
+
+@singleton
+class FramePacer:
+    """
+    Update and draw rates of the window. Menus in on demand mode draw only for a few
+    frames after an input event and are polled slowly the rest of the time, an
+    unfocused window runs at UNFOCUSED_FPS and a minimized one is barely drawn.
+    Handlers are pushed on the window and never handle the events they see.
+    """
+    def __init__(self, window: arcade.Window | None = None):
+        self.window = window or arcade.get_window()
+        self.on_demand: bool = False
+        self.redraw_frames: int = REDRAW_FRAMES
+        self.focused: bool = True
+        self.minimized: bool = False
+        frame_rate = 1 / app_config.FRAME_RATE
+        self.rates: tuple[float, float] = (frame_rate, frame_rate)
+        self.draws: int = 0
+        self.window.push_handlers(self)
+
+    def set_on_demand(self, on: bool) -> None:
+        """Called by a view when it's shown, after its UI manager is enabled"""
+        self.on_demand = on and bool(app_config.MENU_RENDER_ON_DEMAND)
+        # On top of the UI manager, that handles the events on its widgets
+        self.window.remove_handlers(self)
+        self.window.push_handlers(self)
+        self.request_redraw()
+
+    def request_redraw(self, frames: int = REDRAW_FRAMES) -> None:
+        self.redraw_frames = max(self.redraw_frames, frames)
+        self.apply()
+
+    def frame_drawn(self) -> None:
+        """Called at the end of on_draw of a view in on demand mode"""
+        self.draws += 1
+        if self.redraw_frames > 0:
+            self.redraw_frames -= 1
+            if self.redraw_frames == 0:
+                self.apply()
+
+    def get_rates(self) -> tuple[float, float]:
+        """(update, draw) intervals for the current state of the window"""
+        if not self.focused or self.minimized:
+            update_rate = 1 / app_config.UNFOCUSED_FPS
+            return update_rate, IDLE_DRAW_INTERVAL if self.minimized else update_rate
+        if self.on_demand and self.redraw_frames == 0:
+            return 1 / app_config.MENU_IDLE_UPDATE_RATE, IDLE_DRAW_INTERVAL
+        return 1 / app_config.FRAME_RATE, 1 / app_config.FRAME_RATE
+
+    def apply(self) -> None:
+        rates = self.get_rates()
+        if rates == self.rates:
+            return
+        update_rate, draw_rate = rates
+        logger.debug(f"update rate {1 / update_rate:.1f}/s, draw rate {1 / draw_rate:.1f}/s")
+        self.rates = rates
+        self.window.set_update_rate(update_rate)
+        self.window.set_draw_rate(draw_rate)
+
+    def set_state(self, focused: bool | None = None, minimized: bool | None = None) -> None:
+        if focused is not None:
+            self.focused = focused
+        if minimized is not None:
+            self.minimized = minimized
+        self.request_redraw()
+
+    def on_activate(self):
+        self.set_state(focused=True)
+
+    def on_deactivate(self):
+        self.set_state(focused=False)
+
+    def on_show(self):
+        self.set_state(minimized=False)
+
+    def on_hide(self):
+        self.set_state(minimized=True)
+
+    def on_expose(self):
+        self.request_redraw()
+
+    def on_resize(self, width: int, height: int):
+        self.request_redraw()
+
+    def on_key_press(self, key: int, modifiers: int):
+        self.request_redraw()
+
+    def on_key_release(self, key: int, modifiers: int):
+        self.request_redraw()
+
+    def on_mouse_motion(self, x: int, y: int, dx: int, dy: int):
+        self.request_redraw()
+
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
+        self.request_redraw()
+
+    def on_mouse_release(self, x: int, y: int, button: int, modifiers: int):
+        self.request_redraw()
+
+    def on_mouse_drag(self, x: int, y: int, dx: int, dy: int, buttons: int, modifiers: int):
+        self.request_redraw()
+
+    def on_mouse_scroll(self, x: int, y: int, scroll_x: float, scroll_y: float):
+        self.request_redraw()
+
+    def on_mouse_leave(self, x: int, y: int):
+        self.request_redraw()
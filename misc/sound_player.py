@@ -1,12 +1,68 @@
 import logging
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic
+
+from . import asset_pack
 from .app_utils import singleton
 
 import arcade
-from pyglet.media import Player
+from pyglet.event import EVENT_HANDLED
+from pyglet.media import Player, get_audio_driver
 
 logger = logging.getLogger(__name__)
 
+
+class EffectPool:
+    """
+    Voices of one sound effect. Every voice is a Player created up front with the
+    decoded sound queued for good: at the end of the sound it is rewound instead of
+    dropping the source, so the driver voice it gets on the first play is kept too.
+    When all voices are busy the one that started first is restarted.
+    """
+    def __init__(self, sound: arcade.Sound, voices: int):
+        self.sound = sound
+        self.voices: list[Player] = []
+        self.started: list[float] = [0.0] * voices
+        self.plays: int = 0
+        self.steals: int = 0
+
+        for _ in range(voices):
+            player = Player()
+            player.queue(sound.source)
+            player.push_handlers(on_eos=lambda player=player: self.rewind(player))
+            self.voices.append(player)
+
+    @staticmethod
+    def rewind(player: Player) -> bool:
+        player.pause()
+        player.seek(0.0)
+        # Keeps pyglet from moving on to the next source and deleting the driver voice
+        return EVENT_HANDLED
+
+    def pick(self) -> int:
+        for index, player in enumerate(self.voices):
+            if not player.playing:
+                return index
+        self.steals += 1
+        return min(range(len(self.voices)), key=self.started.__getitem__)
+
+    def play(self, volume: float) -> Player:
+        index = self.pick()
+        player = self.voices[index]
+        player.volume = volume
+        player.seek(0.0)
+        player.play()
+        self.started[index] = monotonic()
+        self.plays += 1
+        return player
+
+    def delete(self) -> None:
+        for player in self.voices:
+            player.delete()
+        self.voices.clear()
+
+
 @singleton
 class SoundPlayer:
     def __init__(self):
@@ -14,13 +70,24 @@ class SoundPlayer:
         self.music_volume = float(os.environ.get("VOLUME_MUSIC"))
         self.sound_volume = float(os.environ.get("VOLUME_SOUND"))
 
-        # load music data
-        self.music = arcade.load_sound("data/sounds/time_for_adventure.mp3")
-        self.jump_sound = arcade.load_sound("data/sounds/jump.wav")
+        # The driver is opened here on the main thread, the loader thread only decodes
+        get_audio_driver()
+        # Music is decoded in the background, the menu doesn't wait for it
+        self.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sound-loader")
+        self.music_future: Future = self.loader.submit(asset_pack.load_sound, "data/sounds/time_for_adventure.mp3")
+        voices = int(os.environ.get("SFX_VOICES"))
+        self.effects: dict[str, EffectPool] = {
+            "jump": EffectPool(asset_pack.load_sound("data/sounds/jump.wav"), voices),
+        }
         self.music_playback: Player | None = None
 
         self.is_playing = False
 
+    @property
+    def music(self) -> arcade.Sound:
+        """Decoded music, waits for the loader if it isn't done yet"""
+        return self.music_future.result()
+
     def play_music(
             self
     ) -> None:
@@ -33,13 +100,13 @@ class SoundPlayer:
             )
             self.is_playing = True
 
+    def play_effect(self, name: str) -> Player:
+        return self.effects[name].play(self.sound_volume)
+
     def sound_jump(
             self
     ) -> Player:
-        return arcade.play_sound(
-            self.jump_sound,
-            volume=self.sound_volume
-        )
+        return self.play_effect("jump")
 
     @property
     def music_vol(self):
@@ -59,6 +126,14 @@ class SoundPlayer:
         logger.debug(f"sound vol set to: {value}")
         self.sound_volume = value
 
+    def pause_music(self):
+        if self.is_playing and self.music_playback is not None:
+            self.music_playback.pause()
+
+    def resume_music(self):
+        if self.is_playing and self.music_playback is not None:
+            self.music_playback.play()
+
     def stop_playing_music(self):
         logger.debug(f"stop playing music")
         self.music_playback.delete()
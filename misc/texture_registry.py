@@ -0,0 +1,213 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Hashable
+
+from PIL import Image
+
+from misc import asset_pack
+from misc.app_utils import singleton
+from misc.config import AppConfig
+
+import arcade
+from arcade.texture import ImageData
+
+app_config = AppConfig()
+logger = logging.getLogger(__name__)
+
+# (path, region, transforms). Region is (x, y, width, height), None for the whole image
+TextureKey = tuple[str, tuple[int, int, int, int] | None, tuple[str, ...]]
+
+
+class TextureEntry:
+    """Registry slot: the texture, who holds it and how much memory it pins"""
+    def __init__(self, key: TextureKey, texture: arcade.Texture, size: int):
+        self.key = key
+        self.texture = texture
+        self.size = size
+        self.owners: set[Hashable] = set()
+        self.uploaded: bool = False
+        # Keys of the transformed textures sharing the image data of this one
+        self.derived: list[TextureKey] = []
+
+
+@singleton
+class TextureRegistry:
+    """
+    Process wide texture store. Textures are loaded once per (path, region, flips)
+    and kept across levels: owners acquire them and release them all at once when
+    they are done. Entries nobody holds stay resident until the byte budget is
+    exceeded, then the least recently used ones are dropped.
+
+    Decoded source images (tilesets) are kept the same way, so a sheet is read
+    from disk once no matter how many tiles or maps use it.
+    """
+    def __init__(self):
+        self.budget: int = app_config.TEXTURE_BUDGET_MB * 1024 * 1024
+        self.entries: OrderedDict[TextureKey, TextureEntry] = OrderedDict()
+        self.images: OrderedDict[str, Image.Image] = OrderedDict()
+        self.pending: list[TextureEntry] = []
+        self.lock = threading.RLock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.disk_reads: int = 0
+        self.evictions: int = 0
+        self.bytes_resident: int = 0
+        self.upload_time: float = 0.0
+
+    def get(
+            self,
+            path: str | Path,
+            owner: Hashable,
+            region: tuple[int, int, int, int] | None = None,
+            transforms: tuple[str, ...] = ()
+    ) -> arcade.Texture:
+        """
+        Texture of the image file, or of its region, with arcade.Texture transform
+        methods (flip_left_right, flip_diagonally, ...) applied in order. The owner
+        of a transformed texture holds the plain one too, it holds the image data.
+        """
+        key = (self.normalize(path), region, transforms)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            else:
+                self.misses += 1
+                entry = self.create(key)
+                self.entries[key] = entry
+                self.bytes_resident += entry.size
+            entry.owners.add(owner)
+            if transforms:
+                base_key = (key[0], region, ())
+                self.entries[base_key].owners.add(owner)
+                self.entries.move_to_end(base_key)
+            # Once held, the new texture can't be the one to go
+            self.evict()
+
+        self.upload(entry)
+        return entry.texture
+
+    def get_pair(self, path: str | Path, owner: Hashable) -> tuple[arcade.Texture, arcade.Texture]:
+        """Texture facing right and its mirror facing left"""
+        return self.get(path, owner), self.get(path, owner, transforms=("flip_left_right",))
+
+    def release(self, owner: Hashable) -> None:
+        """Drop every reference the owner holds. The textures stay until the budget needs the room."""
+        with self.lock:
+            for entry in self.entries.values():
+                entry.owners.discard(owner)
+            self.evict()
+
+    @staticmethod
+    def normalize(path: str | Path) -> str:
+        return str(asset_pack.resolve(path))
+
+    def create(self, key: TextureKey) -> TextureEntry:
+        path, region, transforms = key
+        if transforms:
+            # Transformed textures share the image data of the plain one
+            base = self.entries.get((path, region, ()))
+            if base is None:
+                base = self.create((path, region, ()))
+                self.entries[base.key] = base
+                self.bytes_resident += base.size
+            texture = base.texture
+            for name in transforms:
+                texture = getattr(texture, name)()
+            # The image data is counted in the size of the plain one
+            base.derived.append(key)
+            return TextureEntry(key, texture, 0)
+
+        image = self.get_image(path)
+        if region is not None:
+            x, y, width, height = region
+            image = image.crop((x, y, x + width, y + height))
+        texture = arcade.Texture(ImageData(image))
+        texture.file_path = Path(path)
+        return TextureEntry(key, texture, image.width * image.height * 4)
+
+    def get_image(self, path: str) -> Image.Image:
+        image = self.images.get(path)
+        if image is not None:
+            self.images.move_to_end(path)
+            return image
+
+        image = Image.open(asset_pack.open_binary(path))
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        image.load()
+        self.disk_reads += 1
+        self.images[path] = image
+        self.bytes_resident += image.width * image.height * 4
+        return image
+
+    def evict(self) -> None:
+        """
+        Drop least recently used textures nobody holds, then source images, until under
+        budget. A plain texture goes with the transformed ones made from it, nobody holds
+        those either: their owners hold the plain one too.
+        """
+        if self.bytes_resident <= self.budget:
+            return
+
+        for key in list(self.entries):
+            if self.bytes_resident <= self.budget:
+                break
+            entry = self.entries.get(key)
+            if entry is None or entry.owners:
+                continue
+            # The atlas frees the texture once the last reference to it is gone
+            for derived in [key, *entry.derived]:
+                if derived in self.entries:
+                    self.bytes_resident -= self.entries.pop(derived).size
+                    self.evictions += 1
+            if key[2]:
+                self.entries[(key[0], key[1], ())].derived.remove(key)
+
+        while self.bytes_resident > self.budget and self.images:
+            _, image = self.images.popitem(last=False)
+            self.bytes_resident -= image.width * image.height * 4
+            self.evictions += 1
+
+    def upload(self, entry: TextureEntry) -> None:
+        """Put the texture in the window atlas now instead of on the first draw. Main thread only."""
+        if entry.uploaded:
+            return
+        if threading.current_thread() is not threading.main_thread():
+            with self.lock:
+                self.pending.append(entry)
+            return
+        try:
+            window = arcade.get_window()
+        except RuntimeError:
+            return
+
+        t = perf_counter()
+        window.ctx.default_atlas.add(entry.texture)
+        self.upload_time += perf_counter() - t
+        entry.uploaded = True
+
+    def upload_pending(self) -> None:
+        """Upload textures created off the main thread (level prefetch)"""
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for entry in pending:
+            self.upload(entry)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "images": len(self.images),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_reads": self.disk_reads,
+            "evictions": self.evictions,
+            "bytes_resident": self.bytes_resident,
+            "upload_time": self.upload_time,
+        }
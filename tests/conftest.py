@@ -0,0 +1,19 @@
+import pytest
+
+from base.batch import setup_resources
+from controllers.controller import GameController
+
+
+@pytest.fixture(scope="session", autouse=True)
+def resources():
+    """:data: as the game sets it up, tests run from the repository root"""
+    setup_resources()
+
+
+@pytest.fixture
+def controls() -> dict[str, bool]:
+    """The shared controls, released: they outlive every Simulation"""
+    controls = GameController().controls
+    for control in controls:
+        controls[control] = False
+    return controls
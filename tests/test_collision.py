@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from base.collision import merge_cells
+
+
+def cover(cells: np.ndarray, rects: list[tuple[int, int, int, int]]) -> np.ndarray:
+    """How many rectangles cover every cell"""
+    covered = np.zeros(cells.shape, dtype=int)
+    for col, row, width, height in rects:
+        covered[row:row + height, col:col + width] += 1
+    return covered
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("density", [0.2, 0.5, 0.9])
+def test_merge_cells_covers_solid_cells_once(seed, density):
+    cells = np.random.default_rng(seed).random((17, 23)) < density
+    rects = merge_cells(cells)
+    np.testing.assert_array_equal(cover(cells, rects), cells.astype(int))
+
+
+def test_merge_cells_merges_blocks():
+    cells = np.zeros((4, 6), dtype=bool)
+    cells[0:2, 0:3] = True
+    cells[3, :] = True
+    assert merge_cells(cells) == [(0, 0, 3, 2), (0, 3, 6, 1)]
+
+
+def test_merge_cells_empty_and_full():
+    assert merge_cells(np.zeros((3, 3), dtype=bool)) == []
+    assert merge_cells(np.ones((3, 5), dtype=bool)) == [(0, 0, 5, 3)]
+
+
+def test_merge_cells_keeps_input():
+    cells = np.eye(4, dtype=bool)
+    merge_cells(cells)
+    np.testing.assert_array_equal(cells, np.eye(4, dtype=bool))
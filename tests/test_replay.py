@@ -0,0 +1,91 @@
+import io
+
+import pytest
+
+from base.replay import CHECKPOINT_INTERVAL, Recorder, Replay, read_varint, verify, write_varint
+from base.simulation import InputScript, Simulation
+from misc.config import AppConfig
+
+SCRIPT = "benchmarks/scripts/run_jump.json"
+
+
+class RecordedScript:
+    """Records the controls the script sets, before every tick like GameView does"""
+    def __init__(self, script: InputScript, recorder: Recorder):
+        self.script = script
+        self.recorder = recorder
+
+    def rewind(self) -> None:
+        self.script.rewind()
+
+    def apply(self, time: float, controls: dict[str, bool]) -> None:
+        self.script.apply(time, controls)
+        self.recorder.record(controls)
+
+
+def record(lvl: int, ticks: int) -> Replay:
+    simulation = Simulation(lvl, InputScript.load(SCRIPT))
+    recorder = Recorder(simulation.level)
+    simulation.script = RecordedScript(simulation.script, recorder)
+    simulation.script.rewind()
+    while simulation.ticks < ticks and not simulation.done:
+        simulation.tick()
+        recorder.tick_done(simulation.level)
+    return recorder.get_replay("quit", simulation.level)
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32 + 5])
+def test_varint_round_trip(value):
+    stream = io.BytesIO()
+    write_varint(stream, value)
+    stream.seek(0)
+    assert read_varint(stream) == value
+    assert stream.read() == b""
+
+
+def test_varint_truncated():
+    with pytest.raises(ValueError):
+        read_varint(io.BytesIO(b"\x80"))
+
+
+def test_replay_round_trip(tmp_path):
+    replay = Replay({"level": 3, "ticks": 500, "config": {"GRAVITY": 1500}}, [(0, 0), (10, 2), (300, 6)], [1, 2 ** 32 - 1])
+    path = tmp_path / "level_3.rpl"
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert loaded.header == replay.header
+    assert loaded.changes == replay.changes
+    assert loaded.checksums == replay.checksums
+    assert loaded.lvl == 3 and loaded.ticks == 500
+
+
+def test_replay_rejects_other_files():
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b"not a replay at all")
+
+
+def test_recorded_run_verifies(controls):
+    replay = record(5, 4 * CHECKPOINT_INTERVAL)
+    assert replay.ticks == 4 * CHECKPOINT_INTERVAL
+    assert len(replay.checksums) == 4
+    result = verify(Replay.from_bytes(replay.to_bytes()))
+    assert result["deterministic"], result
+    assert result["played_ticks"] == replay.ticks
+
+
+def test_tampered_replay_diverges(controls):
+    replay = record(5, 4 * CHECKPOINT_INTERVAL)
+    replay.checksums[1] ^= 1
+    result = verify(replay)
+    assert not result["deterministic"]
+    assert result["diverged_at"] == 2 * CHECKPOINT_INTERVAL
+
+
+def test_verify_puts_the_config_back(controls):
+    app_config = AppConfig()
+    replay = record(5, CHECKPOINT_INTERVAL)
+    keep = app_config.REPLAY_KEEP
+    replay.header["config"]["REPLAY_KEEP"] = keep + 1
+    result = verify(replay)
+    assert result["config_changed"] == ["REPLAY_KEEP"]
+    assert app_config.REPLAY_KEEP == keep
@@ -0,0 +1,48 @@
+from base.simulation import InputScript, Simulation
+from misc.config import AppConfig
+
+SCRIPT = "benchmarks/scripts/run_right.json"
+
+
+def test_input_script_applies_events_by_time(controls):
+    script = InputScript("test", [(0.5, "right", True), (0.0, "up", True), (1.0, "right", False)])
+    script.apply(0.0, controls)
+    assert controls["up"] and not controls["right"]
+    script.apply(0.75, controls)
+    assert controls["right"]
+    script.apply(2.0, controls)
+    assert not controls["right"]
+
+
+def test_simulation_runs_a_level(controls):
+    result = Simulation(1, InputScript.load(SCRIPT)).run(2)
+    assert result["level"] == 1
+    assert result["ticks"] == 120
+    assert result["game_time"] == 2.0
+    assert not result["game_over"]
+    # Running right moves the player right
+    start = Simulation(1, InputScript("idle", [])).level.player_sprite.center_x
+    assert result["position"][0] > start
+
+
+def test_simulation_is_deterministic(controls):
+    first = Simulation(1, InputScript.load(SCRIPT)).run(2)
+    second = Simulation(1, InputScript.load(SCRIPT)).run(2)
+    assert first["position"] == second["position"]
+    assert first["score"] == second["score"]
+
+
+def test_simulation_keeps_the_config(controls):
+    app_config = AppConfig()
+    saved = app_config.GPU_TILEMAP, app_config.TIMER_ON
+    Simulation(1, InputScript("idle", []))
+    assert (app_config.GPU_TILEMAP, app_config.TIMER_ON) == saved
+
+
+def test_simulation_stops_at_the_time_limit(controls, monkeypatch):
+    monkeypatch.setattr(AppConfig(), "TIMER_ON", 1)
+    simulation = Simulation(1, InputScript("idle", []))
+    simulation.time_limit = 1.0
+    result = simulation.run(2)
+    assert result["timed_out"]
+    assert result["game_time"] == 1.0
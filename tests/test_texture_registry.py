@@ -0,0 +1,43 @@
+import pytest
+
+from misc.texture_registry import TextureRegistry
+
+COIN = ":data:/tilesets/coins/coin_5.png"
+# A region no level uses, the levels of other tests hold the whole coin
+REGION = (0, 0, 4, 4)
+
+
+def resident(registry: TextureRegistry) -> int:
+    return (
+        sum(entry.size for entry in registry.entries.values())
+        + sum(image.width * image.height * 4 for image in registry.images.values())
+    )
+
+
+@pytest.fixture
+def registry(monkeypatch) -> TextureRegistry:
+    """The shared registry with no room: everything nobody holds is dropped right away"""
+    registry = TextureRegistry()
+    monkeypatch.setattr(registry, "budget", 0)
+    yield registry
+    registry.release("test")
+
+
+def test_transformed_texture_holds_the_plain_one(registry):
+    registry.get(COIN, "test", REGION, ("flip_left_right",))
+    key = registry.normalize(COIN)
+    assert (key, REGION, ("flip_left_right",)) in registry.entries
+    # Kept over the budget, the flipped texture uses its image data
+    assert "test" in registry.entries[key, REGION, ()].owners
+    registry.get(COIN, "other", REGION)
+    registry.release("other")
+    assert (key, REGION, ()) in registry.entries
+    assert registry.bytes_resident == resident(registry)
+
+
+def test_release_drops_the_plain_texture_with_its_transforms(registry):
+    registry.get(COIN, "test", REGION, ("flip_left_right",))
+    registry.release("test")
+    key = registry.normalize(COIN)
+    assert not any(entry_key[:2] == (key, REGION) for entry_key in registry.entries)
+    assert registry.bytes_resident == resident(registry)
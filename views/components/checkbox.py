@@ -1,4 +1,5 @@
 from views.components.labeled import Labeled
+from misc import asset_pack
 from misc.config import AppConfig
 
 from PIL import Image
@@ -26,14 +27,14 @@ class CheckboxGroupBuilder(Labeled):
         return self.on_texture
 
     def set_on_texture(self, path):
-        self.on_texture = arcade.Texture(Image.open(path).convert("RGBA"))
+        self.on_texture = arcade.Texture(Image.open(asset_pack.open_binary(path)).convert("RGBA"))
         return self
 
     def get_off_texture(self):
         return self.off_texture
 
     def set_off_texture(self, path):
-        self.off_texture = arcade.Texture(Image.open(path).convert("RGBA"))
+        self.off_texture = arcade.Texture(Image.open(asset_pack.open_binary(path)).convert("RGBA"))
         return self
 
     def set_value(self, value: bool):
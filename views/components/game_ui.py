@@ -1,6 +1,11 @@
-from typing import Tuple
+from typing import Any, Callable, Tuple
+
+import math
 
 import arcade
+import pyglet
+from arcade.gl import geometry
+from pyglet.math import Mat4
 
 from misc.config import AppConfig
 from views.components.game_ui_text import GameUIText
@@ -9,7 +14,15 @@ app_config = AppConfig()
 
 EMOJI_FONT_NAME = "Segoe UI Emoji"
 
+# Room left under the lowest text in the HUD cache, for descenders of longer values
+CACHE_MARGIN = 8
+
 class GameUI:
+    """
+    HUD texts share one pyglet batch and are only relaid out when the values
+    behind them change. With HUD_CACHE the batch is rendered into an offscreen
+    texture on changes and every frame just draws that texture.
+    """
     def __init__(self, text_color=app_config.FONT_COLOR):
         self.score_text: arcade.Text | None = None
         self.life_text: arcade.Text | None = None
@@ -23,6 +36,16 @@ class GameUI:
         self.text_color = text_color
         self.widgets: Tuple[arcade.Text] | None = None
 
+        self.batch = pyglet.graphics.Batch()
+        # Values each text was last laid out for
+        self.values: dict[arcade.Text, tuple] = {}
+        self.dirty: bool = True
+
+        self.cache: arcade.gl.Framebuffer | None = None
+        self.cache_quad: arcade.gl.Geometry | None = None
+        # Bottom of the strip at the top of the window the cache covers
+        self.cache_bottom: float = 0
+
     def init(
             self,
             score: int,
@@ -38,7 +61,8 @@ class GameUI:
             text=f"Score: {score}",
             x=app_config.WINDOW_WIDTH * 10 // 40,
             y=app_config.WINDOW_HEIGHT * 93 // 100,
-            color=self.text_color
+            color=self.text_color,
+            batch=self.batch
         )
 
         self.life_text = GameUIText(
@@ -49,7 +73,8 @@ class GameUI:
             font_name=EMOJI_FONT_NAME,
             font_size=app_config.WINDOW_HEIGHT // 28,
             align="right",
-            anchor_x="right"
+            anchor_x="right",
+            batch=self.batch
         )
 
         self.coins_to_find = GameUIText(
@@ -58,6 +83,7 @@ class GameUI:
             y=app_config.WINDOW_HEIGHT * 93 // 100,
             color=self.text_color,
             font_name=app_config.FONT_NAME,
+            batch=self.batch
         )
 
         self.coin_symb = GameUIText(
@@ -66,7 +92,8 @@ class GameUI:
             y=app_config.WINDOW_HEIGHT * 93 // 100,
             color=(255, 215, 0),
             font_name=EMOJI_FONT_NAME,
-            font_size=app_config.WINDOW_HEIGHT // 30
+            font_size=app_config.WINDOW_HEIGHT // 30,
+            batch=self.batch
         )
 
         self.fruit_symb = GameUIText(
@@ -74,7 +101,8 @@ class GameUI:
             x=app_config.WINDOW_WIDTH // 66,
             y=app_config.WINDOW_HEIGHT * 85 // 100,
             font_name=EMOJI_FONT_NAME,
-            font_size=app_config.WINDOW_HEIGHT // 25
+            font_size=app_config.WINDOW_HEIGHT // 25,
+            batch=self.batch
         )
 
         self.fruit_to_find = GameUIText(
@@ -83,6 +111,7 @@ class GameUI:
             y=app_config.WINDOW_HEIGHT * 86 // 100,
             color=self.text_color,
             font_name=app_config.FONT_NAME,
+            batch=self.batch
         )
 
         self.timer_text = GameUIText(
@@ -90,7 +119,8 @@ class GameUI:
             x=app_config.WINDOW_WIDTH * 24 // 40,
             y=app_config.WINDOW_HEIGHT * 93 // 100,
             anchor_x="center",
-            color=self.text_color
+            color=self.text_color,
+            batch=self.batch
         )
 
         self.level_text = GameUIText(
@@ -100,7 +130,8 @@ class GameUI:
             anchor_x="center",
             color=self.text_color,
             font_name=app_config.FONT_NAME,
-            font_size=app_config.WINDOW_HEIGHT * 2 // 100
+            font_size=app_config.WINDOW_HEIGHT * 2 // 100,
+            batch=self.batch
         )
 
         self.widgets = (
@@ -125,12 +156,58 @@ class GameUI:
             fruit_total,
             fruit_count
     ):
-        self.score_text.text = f"Score: {score}"
-        self.life_text.text = f"{' ♥' * life_points}"
-        self.coins_to_find.text = f"{coin_count}/{coin_total}"
-        self.level_text.text = f"Lvl: {level}"
-        self.timer_text.text = f"{timer_left}"
-        self.fruit_to_find.text = f"{fruit_count}/{fruit_total}"
+        self.set_text(self.score_text, "Score: {}".format, score)
+        self.set_text(self.life_text, " ♥".__mul__, life_points)
+        self.set_text(self.coins_to_find, "{}/{}".format, coin_count, coin_total)
+        self.set_text(self.level_text, "Lvl: {}".format, level)
+        self.set_text(self.timer_text, str, timer_left)
+        self.set_text(self.fruit_to_find, "{}/{}".format, fruit_count, fruit_total)
+
+    def set_text(self, widget: arcade.Text, template: Callable[..., str], *values: Any):
+        """The text is only formatted and laid out again when its values changed"""
+        if self.values.get(widget) == values:
+            return
+        self.values[widget] = values
+        widget.text = template(*values)
+        self.dirty = True
+
+    def draw(self):
+        if not app_config.HUD_CACHE:
+            self.batch.draw()
+            return
+
+        window = arcade.get_window()
+        ctx = window.ctx
+        if self.cache is None:
+            self.create_cache(window)
+        if self.dirty:
+            projection, view = ctx.projection_matrix, ctx.view_matrix
+            ctx.projection_matrix = Mat4.orthogonal_projection(0, window.width, self.cache_bottom, window.height, -100, 100)
+            ctx.view_matrix = Mat4()
+            with self.cache.activate():
+                self.cache.clear()
+                self.batch.draw()
+            ctx.projection_matrix, ctx.view_matrix = projection, view
+            self.dirty = False
+
+        # Color in the cache is already multiplied by alpha
+        blend_func = ctx.blend_func
+        with ctx.enabled_only(ctx.BLEND):
+            ctx.blend_func = ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA
+            self.cache.color_attachments[0].use(0)
+            self.cache_quad.render(ctx.utility_textured_quad_program)
+        ctx.blend_func = blend_func
+
+    def create_cache(self, window: arcade.Window):
+        """Texture for the strip of the window the texts are in, the rest of the screen isn't touched"""
+        ctx = window.ctx
+        self.cache_bottom = max(0, math.floor(min(widget.bottom for widget in self.widgets)) - CACHE_MARGIN)
+        part = (window.height - self.cache_bottom) / window.height
+        self.cache = ctx.framebuffer(color_attachments=[
+            ctx.texture((ctx.screen.width, math.ceil(ctx.screen.height * part)), components=4)
+        ])
+        # The quad is in normalized device coordinates, -1..1 across the screen
+        self.cache_quad = geometry.quad_2d(size=(2.0, 2.0 * part), pos=(0.0, 1.0 - part))
 
     def get_widgets(self):
         return self.widgets
@@ -21,7 +21,8 @@ class InteractiveComponentTuple:
         self.components_list[0][0].focused = True
         self.focused = 0
 
-    def update(self):
+    def update(self) -> bool:
+        """Moves the focus or calls the focused component, True if a control was handled"""
         if self.main_controller.controls["up"] and self.focused > 0:
             self.components_list[self.focused][0].focused = False
             self.focused -= 1
@@ -50,3 +51,6 @@ class InteractiveComponentTuple:
                 slider.value += slider.step
             self.main_controller.controls["right"] = False
             self.components_list[self.focused][1]()
+        else:
+            return False
+        return True
@@ -0,0 +1,18 @@
+from misc.config import AppConfig
+
+import arcade
+import arcade.csscolor
+
+app_config = AppConfig()
+
+
+def get_title(y: float) -> arcade.Text:
+    """Game title of the menus, built once per show of the view"""
+    return arcade.Text(
+        app_config.SCREEN_TITLE,
+        x=app_config.WINDOW_WIDTH / 2,
+        y=y,
+        color=arcade.csscolor.WHITE,
+        font_size=app_config.WINDOW_HEIGHT // 20,
+        anchor_x="center"
+    )
@@ -2,6 +2,7 @@ import logging
 from typing import Callable
 
 from misc.config import AppConfig
+from misc.frame_pacer import FramePacer
 from .components.interactive import InteractiveComponentTuple
 from controllers.controller import GameController
 
@@ -96,13 +97,15 @@ class GameOverView(arcade.View):
         )
 
         self.manager.enable()
+        FramePacer().set_on_demand(True)
 
     def on_hide_view(self) -> None:
         logger.debug(f"Выполнение метода on_hide_view")
         self.manager.disable()
 
     def on_update(self, delta_time: float) -> bool | None:
-        self.interactive_components.update()
+        if self.interactive_components.update():
+            FramePacer().request_redraw()
 
     def on_draw(self) -> bool | None:
         self.clear()
@@ -112,6 +115,7 @@ class GameOverView(arcade.View):
 
         # Draw the manager.
         self.manager.draw()
+        FramePacer().frame_drawn()
 
     def set_result(self, value: int):
         self.result = value
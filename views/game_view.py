@@ -3,9 +3,12 @@ import logging
 from arcade import Camera2D
 
 from base.camera import PlayerCamera
+from base.replay import Recorder
+from base.timestep import FixedTimestep, RenderInterpolation
 from entities.minimap import MiniMap
 from views.components.game_ui import GameUI
 from misc.config import AppConfig
+from misc.frame_pacer import FramePacer
 from controllers.controller import GameController
 from controllers.keyboard import Keyboard
 from base.level import Level
@@ -43,19 +46,36 @@ class GameView(arcade.View):
 
         self.game_ui: GameUI | None = None
 
+        # Paused while the window is unfocused
+        self.paused: bool = False
+
+        # The level is simulated in fixed ticks, frames are drawn between the last two
+        self.timestep = FixedTimestep(app_config.PHYSICS_TICK_RATE, app_config.PHYSICS_MAX_STEPS)
+        self.interpolation = RenderInterpolation()
+
+        # Controls of the level attempt, by tick
+        self.recorder: Recorder | None = None
 
     def setup(self):
+        # The level calls it when the player gets past the end of the map
+        if self.recorder is not None:
+            self.save_recording("finished")
+
+        app_config.load_game_fonts()
         self.level.setup()
+        self.reset_timestep()
+        self.recorder = Recorder(self.level) if app_config.REPLAY_RECORD else None
 
         logger.debug(f"!self.level={self.level}")
 
-        self.minimap = MiniMap()
-        self.minimap.setup((self.level.map_width, self.level.map_height))
+        self.setup_minimap()
         self.main_controller = GameController()
         self.keyboard = Keyboard()
 
         self.camera = PlayerCamera(self.level.map_width, self.level.map_height, self.level.player_sprite)
         self.gui_camera = Camera2D()
+        self.camera.set_position()
+        self.level.update_chunks(self.camera.position)
 
         self.game_ui = GameUI(self.level.ui_text_color)
         self.game_ui.init(
@@ -70,13 +90,15 @@ class GameView(arcade.View):
         )
 
     def restore(self):
-        self.minimap = MiniMap()
-        self.minimap.setup((self.level.map_width, self.level.map_height))
+        self.reset_timestep()
+        self.setup_minimap()
         self.main_controller = GameController()
         self.keyboard = Keyboard()
 
         self.camera = PlayerCamera(self.level.map_width, self.level.map_height, self.level.player_sprite)
         self.gui_camera = Camera2D()
+        self.camera.set_position()
+        self.level.update_chunks(self.camera.position)
 
         self.game_ui = GameUI(self.level.ui_text_color)
         self.game_ui.init(
@@ -90,6 +112,19 @@ class GameView(arcade.View):
             self.level.fruit_count
         )
 
+    def reset_timestep(self):
+        """A new or restored level starts from a whole tick"""
+        self.timestep.reset()
+        self.interpolation.reset()
+
+    def setup_minimap(self):
+        self.minimap = MiniMap()
+        self.minimap.setup((self.level.map_width, self.level.map_height))
+        self.minimap.set_sprite_lists(
+            tuple(self.level.scene[key] for key in app_config.MINIMAP_SPRITE_LISTS if key in self.level.scene),
+            tuple(self.level.scene[key] for key in app_config.MINIMAP_DYNAMIC_LISTS if key in self.level.scene)
+        )
+
     def on_key_press(self, key, modifiers):
         self.keyboard.on_key_press(key, modifiers)
 
@@ -97,16 +132,21 @@ class GameView(arcade.View):
         self.keyboard.on_key_release(key, modifiers)
 
     def on_update(self, delta_time):
+        if self.paused:
+            return
 
         if self.main_controller.controls["map"]:
-            self.minimap.minimap_on = not self.minimap.minimap_on
+            self.minimap.toggle()
             self.main_controller.controls["map"] = False
 
         if self.main_controller.controls["select"]:
             logger.info(f"select control's state is true. return to menu!")
             self._return_to_menu()
+            return
 
-        self.level.update(delta_time)
+        for _ in range(self.timestep.advance(delta_time)):
+            if not self.tick():
+                break
 
         self.game_ui.update(
             self.level.score,
@@ -119,47 +159,105 @@ class GameView(arcade.View):
             self.level.fruit_count
         )
 
-        self.minimap.sprite_lists = tuple(self.level.scene[key] for key in app_config.MINIMAP_SPRITE_LISTS if key in self.level.scene)
-        self.minimap.update(self.level.player_sprite)
+        self.minimap.update(delta_time, self.level.player_sprite, self.level.layers_version)
+
+    def tick(self) -> bool:
+        """One fixed step of the level, False when the level ended on it"""
+        lvl = self.level.lvl
+        if self.recorder is not None:
+            self.recorder.record(self.main_controller.controls)
 
-        self.level.physics_engine.move_player()
+        self.level.update(self.timestep.dt)
+        if self.level.lvl != lvl:
+            return False
+        if self.window.current_view is not self:
+            self.save_recording("game_over")
+            return False
 
-        self.level.physics_engine.step()
-        self.level.physics_engine.rotate_moving(delta_time)
+        physics_engine = self.level.physics_engine
+        if app_config.RENDER_INTERPOLATION:
+            self.interpolation.save(physics_engine.non_static_sprite_list)
+        physics_engine.tick(self.timestep.dt, app_config.PHYSICS_SUBSTEPS)
 
         self.camera.set_position()
+        self.level.update_chunks(self.camera.position)
 
+        if self.recorder is not None:
+            self.recorder.tick_done(self.level)
+        return True
+
+    def save_recording(self, outcome: str):
+        if self.recorder is None or not self.recorder.ticks:
+            return
+        try:
+            self.recorder.save(outcome, self.level)
+        except OSError as e:
+            logger.error(f"replay not saved: {e}")
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> EVENT_HANDLE_STATE:
         """ Called whenever the mouse button is clicked. """
         pass
 
     def on_show_view(self) -> None:
+        FramePacer().set_on_demand(False)
+        self.paused = False
         self.level.sound_player.play_music()
         if app_config.TIMER_ON and self.level.timer:
             self.level.timer.start()
 
     def on_hide_view(self) -> None:
         self.level.sound_player.stop_playing_music()
-        if app_config.TIMER_ON and self.level.timer:
+        if app_config.TIMER_ON and self.level.timer and not self.paused:
             self.level.timer.pause()
         self.main_controller.controls["select"] = False
 
+    def on_deactivate(self) -> None:
+        self.pause()
+
+    def on_activate(self) -> None:
+        self.resume()
+
+    def pause(self):
+        """Stops the level, the music and the timer, the window keeps drawing the last frame slowly"""
+        if self.paused:
+            return
+        logger.info("game paused")
+        self.paused = True
+        # Key releases go to the other window meanwhile
+        for name in ("left", "right", "up", "down", "middle_up"):
+            self.main_controller.controls[name] = False
+        self.level.sound_player.pause_music()
+        if app_config.TIMER_ON and self.level.timer:
+            self.level.timer.pause()
+
+    def resume(self):
+        if not self.paused:
+            return
+        logger.info("game resumed")
+        self.paused = False
+        self.level.sound_player.resume_music()
+        if app_config.TIMER_ON and self.level.timer:
+            self.level.timer.start()
+
     def on_draw(self):
         """Draw everything"""
         self.clear()
 
-        with self.camera.activate():
-            self.level.scene.draw()
+        with self.interpolation.apply(self.timestep.alpha):
+            # Follows the drawn player, the camera is put back with it on the next update
+            self.camera.set_position()
+            with self.camera.activate():
+                self.level.draw()
 
         with self.gui_camera.activate():
             if self.minimap.minimap_on:
                 self.minimap.draw()
                 self.minimap.draw_outline()
-            for widget in self.game_ui.widgets:
-                widget.draw()
+            self.game_ui.draw()
 
     def _return_to_menu(self):
+        # Written again with the rest of the attempt if the game is continued
+        self.save_recording("quit")
         self.level.sound_player.music_playback.delete()
         self.__from.continue_enabled = True
         self.__from.save_game_state(self)
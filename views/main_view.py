@@ -1,12 +1,18 @@
+import importlib
 import logging
 import pprint
+import threading
+from typing import TYPE_CHECKING
 
 from controllers.gamepad import Gamepad
 from controllers.keyboard import Keyboard
-from .game_view import GameView
 from .pref_view import PreferencesView
 from misc.config import AppConfig
+from misc.frame_pacer import FramePacer
+from misc.sound_player import SoundPlayer
+from views.components.game_ui import GameUI
 from views.components.interactive import InteractiveComponentTuple
+from views.components.title import get_title
 
 import arcade
 import arcade.gui
@@ -19,9 +25,13 @@ BUTTON_HEIGHT = app_config.WINDOW_HEIGHT//15
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    # Imported lazily, it pulls in the level, physics and entities
+    from .game_view import GameView
+
 
 class MainView(arcade.View):
-    def __init__(self, _from: GameView = None, w: arcade.Window = None):
+    def __init__(self, _from: "GameView" = None, w: arcade.Window = None):
         self.continue_enabled = False
         logger.debug(f"Выполнение метода __init__. __from: {_from}")
         super().__init__()
@@ -29,12 +39,16 @@ class MainView(arcade.View):
         self.manager: arcade.gui.UIManager | None = None
         self.grid: arcade.gui.UIGridLayout | None = None
         self.anchor: arcade.gui.UIAnchorLayout | None = None
-        self.game_state: GameView | None = None
+        self.game_state: "GameView | None" = None
         self.gamepad: Gamepad | None = None
         self.keyboard: Keyboard | None = None
         self.interactive_components: InteractiveComponentTuple | None = None
         self.button_focused: int = 0
         self.window = w
+        self.warm_up_started: bool = False
+        # Keeps the HUD fonts and their rendered glyphs alive until the game has its own
+        self.hud_warm_up: GameUI | None = None
+        self.title: arcade.Text | None = None
 
     def on_show_view(self):
         self.manager = arcade.gui.UIManager()
@@ -102,11 +116,14 @@ class MainView(arcade.View):
 
         self.grid.center_on_screen()
 
+        self.title = get_title(app_config.WINDOW_HEIGHT / 3 * 2)
+
         self.manager.enable()
+        FramePacer().set_on_demand(True)
 
     def on_update(self, delta_time: float) -> bool | None:
-        self.interactive_components.update()
-
+        if self.interactive_components.update():
+            FramePacer().request_redraw()
 
     def on_hide_view(self):
         # Disable the UIManager when the view is hidden.
@@ -119,22 +136,36 @@ class MainView(arcade.View):
         # logger.debug(f"Выполнение метода on_draw")
         self.clear()
 
-        text_list = [arcade.Text(
-            "Приключения кошки Сони",
-            x=app_config.WINDOW_WIDTH / 2,
-            y=app_config.WINDOW_HEIGHT / 3 * 2,
-            color=arcade.csscolor.WHITE,
-            font_size=app_config.WINDOW_HEIGHT // 20,
-            anchor_x="center"
-        ),]
-
-        for text in text_list:
-            text.draw()
+        self.title.draw()
 
         # Draw the manager.
         self.manager.draw()
-
-    def save_game_state(self, state:   GameView):
+        FramePacer().frame_drawn()
+
+        if not self.warm_up_started:
+            self.warm_up_started = True
+            arcade.schedule_once(self.warm_up, 0)
+
+    def warm_up(self, delta_time: float = 0):
+        """Load what the game needs while the menu is already on screen"""
+        logger.info("warm up started")
+        # Starts decoding the music
+        SoundPlayer()
+        app_config.load_game_fonts()
+        # Glyphs get rendered into the font atlas on the first text that uses them
+        self.hud_warm_up = GameUI()
+        self.hud_warm_up.init(1234567890, 3, 10, 0, 1, "--:--", 10, 0)
+        threading.Thread(target=self.preload_game, name="warm-up", daemon=True).start()
+
+    @staticmethod
+    def preload_game():
+        # Importing is the point: the level, physics and entity modules get loaded
+        importlib.import_module(".game_view", __package__)
+        from base.prefetch import LevelPrefetcher
+        LevelPrefetcher().request(app_config.BASE_LVL)
+        logger.info("game modules imported")
+
+    def save_game_state(self, state: "GameView"):
         self.game_state = state
         logger.debug("Game state saved")
 
@@ -149,9 +180,13 @@ class MainView(arcade.View):
 
     def on_click_new_game(self):
         """On click handler"""
+        if self.game_state is not None:
+            self.game_state.level.release_textures()
         self.game_state = None
+        from .game_view import GameView
         game_view = GameView(self.window, self)
         game_view.setup()
+        self.hud_warm_up = None
         self.window.show_view(game_view)
 
     def on_click_continue(self):
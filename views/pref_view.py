@@ -3,11 +3,12 @@ import os
 
 from .components.checkbox import CheckboxGroupBuilder
 from misc.config import AppConfig
+from misc.frame_pacer import FramePacer
 from .components.interactive import InteractiveComponentTuple
-from .game_view import GameView
 from misc.sound_player import SoundPlayer
 from misc.app_utils import singleton
 from views.components.slider import SliderGroupBuilder
+from views.components.title import get_title
 from controllers.controller import GameController
 from controllers.keyboard import Keyboard
 
@@ -168,11 +169,19 @@ class PreferencesView(arcade.View):
 
         self.main_view = main_view
 
+        self.title: arcade.Text | None = None
+
 
     def on_show_view(self) -> None:
         logger.debug("Выполнение функции on_show_view")
         self.window.background_color = app_config.MENU_BACKGROUND_COLOR
+        self.title = get_title(app_config.WINDOW_HEIGHT / 4 * 3)
         self.manager.enable()
+        FramePacer().set_on_demand(True)
+
+    def on_resize(self, width: int, height: int) -> bool | None:
+        # The full screen switch changes the window size the title is placed by
+        self.title = get_title(app_config.WINDOW_HEIGHT / 4 * 3)
 
     def on_hide_view(self) -> None:
         logger.debug("Выполнение функции on_hide_view")
@@ -182,22 +191,14 @@ class PreferencesView(arcade.View):
         """Render the screen."""
         # Clear the screen
         self.clear()
-        text_list = [arcade.Text(
-            "Приключения кошки Сони",
-            x=app_config.WINDOW_WIDTH / 2,
-            y=app_config.WINDOW_HEIGHT / 4 * 3,
-            color=arcade.csscolor.WHITE,
-            font_size=app_config.WINDOW_HEIGHT//20,
-            anchor_x="center"
-        ),]
-
-        for text in text_list:
-            text.draw()
+        self.title.draw()
         # Draw the manager.
         self.manager.draw()
+        FramePacer().frame_drawn()
 
     def on_key_press(self, key: int, modifiers: int) -> bool | None:
         self.keyboard.on_key_press(key, modifiers)
 
     def on_update(self, delta_time: float) -> bool | None:
-        self.interactive_components.update()
+        if self.interactive_components.update():
+            FramePacer().request_redraw()